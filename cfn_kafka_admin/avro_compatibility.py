@@ -0,0 +1,312 @@
+#  SPDX-License-Identifier: MPL-2.0
+#  Copyright 2020-2024 John Mille <john@compose-x.io>
+
+"""
+Offline AVRO schemas compatibility checks, following the AVRO schema resolution rules, with the same
+compatibility modes as the Schema Registry.
+
+- BACKWARD: the new schema can read the data written with the latest schema
+- FORWARD: the latest schema can read the data written with the new schema
+- FULL: both
+- The TRANSITIVE variants check against all the previous schemas instead of only the latest.
+
+The results are cached by pair of schemas fingerprints.
+"""
+
+from __future__ import annotations
+
+import json
+
+from cfn_kafka_admin.schema_registry import get_schema_fingerprint
+
+PRIMITIVE_TYPES = (
+    "null",
+    "boolean",
+    "int",
+    "long",
+    "float",
+    "double",
+    "bytes",
+    "string",
+)
+NAMED_TYPES = ("record", "error", "enum", "fixed")
+# Writer type: reader types it is promoted to
+PROMOTIONS: dict[str, tuple] = {
+    "int": ("long", "float", "double"),
+    "long": ("float", "double"),
+    "float": ("double",),
+    "string": ("bytes",),
+    "bytes": ("string",),
+}
+COMPATIBILITY_MODES = (
+    "BACKWARD",
+    "BACKWARD_TRANSITIVE",
+    "FORWARD",
+    "FORWARD_TRANSITIVE",
+    "FULL",
+    "FULL_TRANSITIVE",
+    "NONE",
+)
+
+PARSED_SCHEMAS: dict[str, AvroSchema] = {}
+READING_ERRORS: dict[tuple[str, str], list[str]] = {}
+
+
+class AvroSchemaError(ValueError):
+    """The definition is not a valid AVRO schema"""
+
+
+def get_full_name(name: str, namespace: str | None) -> str:
+    if "." in name or not namespace:
+        return name
+    return f"{namespace}.{name}"
+
+
+def get_short_name(full_name: str) -> str:
+    return full_name.rpartition(".")[2]
+
+
+class AvroSchema:
+    """
+    AVRO schema parsed into nodes with the full names of the named types, which references are resolved from.
+    """
+
+    def __init__(self, definition: str | dict | list):
+        self.names: dict[str, dict] = {}
+        try:
+            if isinstance(definition, str):
+                definition = json.loads(definition)
+        except json.JSONDecodeError as error:
+            raise AvroSchemaError(f"Schema is not valid JSON: {error}")
+        self.root: dict = self.parse(definition, None)
+
+    def parse(self, schema, namespace: str | None) -> dict:
+        if isinstance(schema, str):
+            if schema in PRIMITIVE_TYPES:
+                return {"type": schema}
+            return {"type": "reference", "name": get_full_name(schema, namespace)}
+        if isinstance(schema, list):
+            return {
+                "type": "union",
+                "types": [self.parse(branch, namespace) for branch in schema],
+            }
+        if not isinstance(schema, dict) or "type" not in schema:
+            raise AvroSchemaError(f"Invalid schema {schema}")
+        schema_type = schema["type"]
+        if isinstance(schema_type, (dict, list)):
+            return self.parse(schema_type, namespace)
+        if schema_type in PRIMITIVE_TYPES:
+            return {"type": schema_type}
+        if schema_type in NAMED_TYPES:
+            return self.parse_named_type(schema, namespace)
+        if schema_type == "array":
+            return {"type": "array", "items": self.parse(schema["items"], namespace)}
+        if schema_type == "map":
+            return {"type": "map", "values": self.parse(schema["values"], namespace)}
+        if isinstance(schema_type, str):
+            return {"type": "reference", "name": get_full_name(schema_type, namespace)}
+        raise AvroSchemaError(f"Invalid type {schema_type}")
+
+    def parse_named_type(self, schema: dict, namespace: str | None) -> dict:
+        if "name" not in schema:
+            raise AvroSchemaError(f"Named type without name {schema}")
+        full_name = get_full_name(schema["name"], schema.get("namespace", namespace))
+        namespace = full_name.rpartition(".")[0] or None
+        node: dict = {
+            "type": "record" if schema["type"] == "error" else schema["type"],
+            "name": full_name,
+            "aliases": [
+                get_full_name(alias, namespace) for alias in schema.get("aliases", [])
+            ],
+        }
+        # Registered before parsing the fields, for the recursive types
+        self.names[full_name] = node
+        if node["type"] == "record":
+            node["fields"] = [
+                {
+                    "name": field["name"],
+                    "type": self.parse(field["type"], namespace),
+                    "has_default": "default" in field,
+                    "aliases": field.get("aliases", []),
+                }
+                for field in schema.get("fields", [])
+            ]
+        elif node["type"] == "enum":
+            node["symbols"] = list(schema.get("symbols", []))
+            node["default"] = schema.get("default")
+        else:
+            node["size"] = schema.get("size")
+        return node
+
+    def resolve(self, node: dict) -> dict:
+        if node["type"] != "reference":
+            return node
+        if node["name"] not in self.names:
+            raise AvroSchemaError(f"Unknown type {node['name']}")
+        return self.names[node["name"]]
+
+
+def describe(node: dict) -> str:
+    return node.get("name", node["type"])
+
+
+def names_match(reader: dict, writer: dict) -> bool:
+    return (
+        get_short_name(reader["name"]) == get_short_name(writer["name"])
+        or writer["name"] in reader["aliases"]
+    )
+
+
+def get_writer_field(reader_field: dict, writer_fields: dict[str, dict]) -> dict | None:
+    for name in [reader_field["name"], *reader_field["aliases"]]:
+        if name in writer_fields:
+            return writer_fields[name]
+    return None
+
+
+class ReadingCheck:
+    """Checks that the data written with the writer schema can be read with the reader schema"""
+
+    def __init__(self, reader: AvroSchema, writer: AvroSchema):
+        self.reader = reader
+        self.writer = writer
+        self.checking: set[tuple[str, str]] = set()
+
+    def check(self, reader_node: dict, writer_node: dict, path: str) -> list[str]:
+        reader_node = self.reader.resolve(reader_node)
+        writer_node = self.writer.resolve(writer_node)
+        if writer_node["type"] == "union":
+            return [
+                error
+                for index, branch in enumerate(writer_node["types"])
+                for error in self.check(reader_node, branch, f"{path}[{index}]")
+            ]
+        if reader_node["type"] == "union":
+            if any(
+                not self.check(branch, writer_node, path)
+                for branch in reader_node["types"]
+            ):
+                return []
+            return [
+                f"{path or '/'}: the reader union has no type to read the writer {describe(writer_node)}"
+            ]
+        if reader_node["type"] != writer_node["type"]:
+            if reader_node["type"] in PROMOTIONS.get(writer_node["type"], ()):
+                return []
+            return [
+                f"{path or '/'}: the reader {describe(reader_node)} cannot read the writer {describe(writer_node)}"
+            ]
+        if reader_node["type"] == "array":
+            return self.check(
+                reader_node["items"], writer_node["items"], f"{path}/items"
+            )
+        if reader_node["type"] == "map":
+            return self.check(
+                reader_node["values"], writer_node["values"], f"{path}/values"
+            )
+        if reader_node["type"] in PRIMITIVE_TYPES:
+            return []
+        if not names_match(reader_node, writer_node):
+            return [
+                f"{path or '/'}: the reader {reader_node['name']} does not match the writer {writer_node['name']}"
+            ]
+        if reader_node["type"] == "fixed":
+            if reader_node["size"] != writer_node["size"]:
+                return [
+                    f"{path or '/'}: the reader size {reader_node['size']} is not the writer size {writer_node['size']}"
+                ]
+            return []
+        if reader_node["type"] == "enum":
+            missing = [
+                symbol
+                for symbol in writer_node["symbols"]
+                if symbol not in reader_node["symbols"]
+            ]
+            if missing and reader_node["default"] is None:
+                return [
+                    f"{path or '/'}: the reader enum has no default and is missing the writer symbols {', '.join(missing)}"
+                ]
+            return []
+        return self.check_record(reader_node, writer_node, path)
+
+    def check_record(
+        self, reader_node: dict, writer_node: dict, path: str
+    ) -> list[str]:
+        key = (reader_node["name"], writer_node["name"])
+        if key in self.checking:
+            return []
+        self.checking.add(key)
+        writer_fields = {field["name"]: field for field in writer_node["fields"]}
+        errors: list[str] = []
+        for field in reader_node["fields"]:
+            writer_field = get_writer_field(field, writer_fields)
+            if writer_field:
+                errors += self.check(
+                    field["type"], writer_field["type"], f"{path}/{field['name']}"
+                )
+            elif not field["has_default"]:
+                errors.append(
+                    f"{path}/{field['name']}: the reader field has no default and is not in the writer"
+                )
+        self.checking.discard(key)
+        return errors
+
+
+def get_parsed_schema(fingerprint: str, definition: str) -> AvroSchema:
+    if fingerprint not in PARSED_SCHEMAS:
+        PARSED_SCHEMAS[fingerprint] = AvroSchema(definition)
+    return PARSED_SCHEMAS[fingerprint]
+
+
+def get_reading_errors(reader_definition: str, writer_definition: str) -> list[str]:
+    """
+    The errors reading the data written with the writer schema using the reader schema, cached by fingerprints.
+    """
+    reader_fingerprint = get_schema_fingerprint(reader_definition, "AVRO")
+    writer_fingerprint = get_schema_fingerprint(writer_definition, "AVRO")
+    key = (reader_fingerprint, writer_fingerprint)
+    if key not in READING_ERRORS:
+        if reader_fingerprint == writer_fingerprint:
+            READING_ERRORS[key] = []
+        else:
+            reader = get_parsed_schema(reader_fingerprint, reader_definition)
+            writer = get_parsed_schema(writer_fingerprint, writer_definition)
+            READING_ERRORS[key] = ReadingCheck(reader, writer).check(
+                reader.root, writer.root, ""
+            )
+    return READING_ERRORS[key]
+
+
+def check_compatibility(
+    definition: str, previous_definitions: list[str], compatibility: str
+) -> list[str]:
+    """
+    Checks the compatibility of the new definition with the previous ones, oldest first, for the compatibility mode.
+
+    :return: The compatibility errors. Empty when compatible.
+    :raises AvroSchemaError: When a definition is not a valid AVRO schema
+    """
+    if compatibility not in COMPATIBILITY_MODES:
+        raise ValueError(
+            f"Compatibility {compatibility} must be one of {COMPATIBILITY_MODES}"
+        )
+    if compatibility == "NONE" or not previous_definitions:
+        return []
+    if not compatibility.endswith("_TRANSITIVE"):
+        previous_definitions = previous_definitions[-1:]
+    mode = compatibility.removesuffix("_TRANSITIVE")
+    errors: list[str] = []
+    versions_count = len(previous_definitions)
+    for index, previous_definition in enumerate(previous_definitions):
+        version = f"previous version {index - versions_count}"
+        if mode in ("BACKWARD", "FULL"):
+            errors += [
+                f"BACKWARD with {version}: {error}"
+                for error in get_reading_errors(definition, previous_definition)
+            ]
+        if mode in ("FORWARD", "FULL"):
+            errors += [
+                f"FORWARD with {version}: {error}"
+                for error in get_reading_errors(previous_definition, definition)
+            ]
+    return errors
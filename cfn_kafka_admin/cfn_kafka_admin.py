@@ -4,13 +4,17 @@
 
 """Main module."""
 
+import hashlib
 import json
+import os
 import re
+from concurrent.futures import ProcessPoolExecutor
 from copy import deepcopy
 from datetime import datetime as dt
+from enum import Enum
+from functools import partial
 from uuid import uuid4
 
-import boto3
 import yaml
 from compose_x_common.compose_x_common import keyisset, keypresent, set_else_none
 from pydantic.error_wrappers import ValidationError
@@ -47,19 +51,134 @@ except ImportError:
             tmp_admin_fd.write(model)
     from cfn_kafka_admin.models.admin import *
 
-from .cfn_resources_definitions import KafkaAclPolicy
+from .cfn_resources_definitions import KafkaAclPolicy, KafkaTopicSetTopic
 from .cfn_resources_definitions.custom import KafkaAcl as CACLs
 from .cfn_resources_definitions.custom import KafkaTopic as CTopic
 from .cfn_resources_definitions.custom import KafkaTopicSchema as CTopicSchema
+from .cfn_resources_definitions.custom import KafkaTopicSet as CTopicSet
 from .cfn_resources_definitions.resource import KafkaAcl as RACLs
 from .cfn_resources_definitions.resource import KafkaTopic as RTopic
 from .cfn_resources_definitions.resource import KafkaTopicSchema as RTopicSchema
+from .common import recursive_merge
+from .definitions_cache import DefinitionsCache
+from .schemas_uploads import (
+    DEFAULT_UPLOAD_WORKERS,
+    SchemasUploader,
+    upload_schema_definition,
+)
+from .template_shards import (
+    DEFAULT_SHARD_MAX_BYTES,
+    DEFAULT_SHARD_MAX_RESOURCES,
+    ShardableTemplate,
+    ShardedTemplate,
+    shard_template,
+)
+from .template_stream import TemplateStreamWriter
 
+TEMPLATE_DESCRIPTION = "Kafka topics-acls-schemas root"
 NONALPHANUM = re.compile(r"([^a-zA-Z0-9]+)")
+RESOURCE_PREFIX = re.compile(r"^[^._-]*")
 DATE = dt.utcnow().isoformat()
 FILE_PREFIX = f'{dt.utcnow().strftime("%Y/%m/%d/%H%M")}/{str(uuid4().hex)[:6]}/'
 
 
+def canonical_schema_definition(definition: str) -> str:
+    """
+    Returns the canonical form of the schema definition, independent of keys order and whitespaces.
+    Definitions that are not valid JSON are returned as-is.
+    """
+    try:
+        return json.dumps(json.loads(definition), sort_keys=True, separators=(",", ":"))
+    except json.JSONDecodeError:
+        return definition
+
+
+def get_content_addressed_key(prefix_path: str, definition: str) -> str:
+    """Returns the S3 key for the definition, from the sha256 of its canonical form"""
+    digest = hashlib.sha256(
+        canonical_schema_definition(definition).encode("utf-8")
+    ).hexdigest()
+    return f"{prefix_path or ''}{digest}.json"
+
+
+def get_enum_value(enum_class: type[Enum], value: Enum | str) -> str:
+    """
+    The models defaults are not validated, so the fields left unset hold the raw default value instead of
+    the Enum member. Returns the value of the enum_class member with the same name in either case.
+    """
+    if isinstance(value, Enum):
+        return enum_class[value.name].value
+    return enum_class(value).value
+
+
+def get_topic_name(topic: EwsKafkaTopic | dict) -> str:
+    """Topics are validated models once loaded, but can still be given as dict"""
+    if isinstance(topic, EwsKafkaTopic):
+        return topic.Name.__root__
+    return topic["Name"]
+
+
+def get_topic_settings(topic: EwsKafkaTopic) -> dict:
+    """
+    Returns the topic settings set in the definition and which are not the default value, without re-validating
+    or serializing the topic model.
+    """
+    if not topic.Settings:
+        return {}
+    return {
+        key: value.value if isinstance(value, Enum) else value
+        for key, value in topic.Settings.dict(
+            by_alias=True,
+            exclude_none=True,
+            exclude_unset=True,
+            exclude_defaults=True,
+        ).items()
+    }
+
+
+def get_file_mtime(file_path: str) -> int | None:
+    try:
+        return os.stat(file_path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def get_topic_set_index(topic_name: str, topic_sets_count: int) -> int:
+    """The index of the set of the topic, by hash of its name, independent of the other topics"""
+    return (
+        int(hashlib.sha256(topic_name.encode("utf-8")).hexdigest()[:8], 16)
+        % topic_sets_count
+    )
+
+
+def get_policy_key(policy: PolicyDef | dict) -> tuple:
+    """
+    Key to identify duplicate policies. The models defaults are not validated, so the enums are compared
+    by value to match the policies where the default value is set explicitly.
+    """
+    return tuple(
+        (name, value.value if isinstance(value, Enum) else value)
+        for name, value in (policy.items() if isinstance(policy, dict) else policy)
+    )
+
+
+def get_acl_split_key(policy: PolicyDef, split_by: str) -> tuple:
+    """The principal, and the resource name prefix when split_by is PrincipalResourcePrefix"""
+    if split_by == SplitBy.PrincipalResourcePrefix.value:
+        return policy.Principal, RESOURCE_PREFIX.match(policy.Resource).group(0)
+    return (policy.Principal,)
+
+
+def get_acl_title(split_key: tuple) -> str:
+    """
+    Logical ID of the ACL resource of the split key, readable and unique. As the principal and the resource
+    are part of the policy, a policy never moves from an ACL resource to another.
+    """
+    readable = NONALPHANUM.sub("", "-".join(split_key).title())[:64]
+    key_hash = hashlib.sha256("\0".join(split_key).encode("utf-8")).hexdigest()[:8]
+    return f"ACLs{readable}{key_hash}"
+
+
 def merge_topics(final, override, extend_config_only=False):
     """
     Function to override and update new_settings from override to primary
@@ -71,9 +190,7 @@ def merge_topics(final, override, extend_config_only=False):
     :rtype: dict
     """
     if keyisset("Topics", override):
-        override_top_topics = Topics.parse_obj(override["Topics"]).dict(
-            by_alias=True,
-        )
+        override_top_topics = override["Topics"]
         if extend_config_only:
             # Allows to add the config and ensure that we do not import topics from config
             if keypresent("Topics", override_top_topics):
@@ -86,13 +203,13 @@ def merge_topics(final, override, extend_config_only=False):
                 merged_lists = override_topics + existing_topics
                 del final["Topics"]["Topics"]
                 del override_top_topics["Topics"]
-                topics = list({v["Name"]: v for v in merged_lists}.values())
+                topics = list({get_topic_name(v): v for v in merged_lists}.values())
                 final["Topics"].update(override_top_topics)
                 final["Topics"]["Topics"] = topics
             elif not keypresent("Topics", final["Topics"]):
                 override_topics = deepcopy(override_top_topics["Topics"])
                 del override_top_topics["Topics"]
-                topics = list({v["Name"]: v for v in override_topics}.values())
+                topics = list({get_topic_name(v): v for v in override_topics}.values())
                 final["Topics"].update(override_top_topics)
                 final["Topics"]["Topics"] = topics
 
@@ -131,117 +248,501 @@ def merge_acls(final, override, extend_all=False):
     :rtype: dict
     """
     if keyisset("ACLs", override):
-        override_acls_dict = override["ACLs"]
-        try:
-            override_acls = ACLs.parse_obj(override_acls_dict).dict(by_alias=True)
-        except ValidationError as error:
-            handle_duplicate_policies_detection(error, override_acls_dict)
-            raise
-
+        override_acls = override["ACLs"]
         if keypresent("Policies", override_acls) and not extend_all:
             del override_acls["Policies"]
             final["ACLs"].update(override_acls)
         elif keyisset("Policies", override_acls) and extend_all:
             if keyisset("Policies", final["ACLs"]):
-                merged_lists = override_acls["Policies"] + final["ACLs"]["Policies"]
+                merged_lists = final["ACLs"]["Policies"] + override_acls["Policies"]
             else:
                 merged_lists = override_acls["Policies"]
-            acls = [dict(y) for y in {tuple(x.items()) for x in merged_lists}]
+            # dict keeps the first-seen order, so the rendered policies do not depend on the hash seed
+            unique_policies: dict = {}
+            for policy in merged_lists:
+                unique_policies.setdefault(get_policy_key(policy), policy)
+            acls = list(unique_policies.values())
             final["ACLs"].update(override_acls)
             final["ACLs"]["Policies"] = acls
 
 
-def merge_contents(primary, override, extend_all=False):
+def validate_definition_content(content: dict) -> dict:
+    """
+    Validates each section of a definition file content with its model, and returns the content
+    with the validated sections.
+
+    :param dict content: The definition file content
+    :return: The validated content, which can be merged with validated=True
+    :rtype: dict
+    """
+    if not isinstance(content, dict):
+        raise TypeError(
+            "The content of the override file does not match the expected content pattern."
+        )
+    validated = dict(content)
+    for section, section_model in (
+        ("Globals", EwsKafkaParameters),
+        ("Schemas", Schemas),
+    ):
+        if keyisset(section, content) and isinstance(content[section], dict):
+            validated[section] = section_model.parse_obj(content[section]).dict(
+                by_alias=True
+            )
+    if keyisset("ACLs", content):
+        try:
+            acls = ACLs.parse_obj(content["ACLs"])
+        except ValidationError as error:
+            handle_duplicate_policies_detection(error, content["ACLs"])
+            raise
+        validated["ACLs"] = acls.dict(by_alias=True, exclude={"Policies"})
+        validated["ACLs"]["Policies"] = (
+            acls.Policies.__root__ if acls.Policies else None
+        )
+    if keyisset("Topics", content):
+        # The topics are kept as validated models, through the merge and until rendering.
+        topics = Topics.parse_obj(content["Topics"])
+        validated["Topics"] = topics.dict(by_alias=True, exclude={"Topics"})
+        validated["Topics"]["Topics"] = topics.Topics
+    return validated
+
+
+def load_definition_file(file_path: str, cache: DefinitionsCache = None) -> dict | None:
+    """
+    Reads, parses and validates a definition file. Used as-is in the worker processes.
+
+    :param str file_path:
+    :param DefinitionsCache cache: When set, the validated content is read from and stored into the cache.
+    :return: The validated content, None if the file is not a YAML file.
+    """
+    if not (file_path.endswith(".yaml") or file_path.endswith(".yml")):
+        return None
+    with open(file_path) as file_fd:
+        file_content = file_fd.read()
+    if not cache:
+        return validate_definition_content(yaml.load(file_content, Loader=Loader))
+    cache_key = cache.get_key(file_content)
+    content = cache.get(cache_key)
+    if content is None:
+        content = validate_definition_content(yaml.load(file_content, Loader=Loader))
+        cache.set(cache_key, content)
+    return content
+
+
+def load_definition_files(
+    files_paths: list[str], jobs: int = 1, cache: DefinitionsCache = None
+) -> list[dict | None]:
+    """
+    Loads all the definition files, in a pool of processes when jobs is greater than 1.
+    The contents are returned in the same order as the files paths.
+
+    :param list[str] files_paths:
+    :param int jobs: Number of processes to use
+    :param DefinitionsCache cache: Optional cache of the validated files content
+    """
+    if jobs <= 1 or len(files_paths) <= 1:
+        contents = [load_definition_file(file_path, cache) for file_path in files_paths]
+    else:
+        with ProcessPoolExecutor(max_workers=min(jobs, len(files_paths))) as executor:
+            contents = list(
+                executor.map(
+                    partial(load_definition_file, cache=cache),
+                    files_paths,
+                    chunksize=max(1, len(files_paths) // (jobs * 4)),
+                )
+            )
+    if cache:
+        cache.evict()
+    return contents
+
+
+def merge_contents(primary, override, extend_all=False, validated=False):
     """
     Function to override and update new_settings from override to primary
     :param primary:
     :param override:
     :param extend_all: Whether the policies or ACLs can be merged.
+    :param validated: Whether override was already validated with validate_definition_content
     :return: The final merged dict
     :rtype: dict
     """
-    if not isinstance(override, dict):
-        raise TypeError(
-            "The content of the override file does not match the expected content pattern."
-        )
+    if not validated:
+        override = validate_definition_content(override)
     final = dict(deepcopy(primary))
     if (
         keypresent("Globals", final)
         and keyisset("Globals", override)
         and isinstance(override["Globals"], dict)
     ):
-        override_globals = EwsKafkaParameters.parse_obj(override["Globals"])
-        final["Globals"].update(override_globals.dict(by_alias=True))
+        final["Globals"].update(override["Globals"])
 
     if (
         keypresent("Schemas", final)
         and keyisset("Schemas", override)
         and isinstance(override["Schemas"], dict)
     ):
-        override_globals = Schemas.parse_obj(override["Schemas"])
-        final["Schemas"].update(override_globals.dict(by_alias=True))
+        final["Schemas"].update(override["Schemas"])
     elif (
         not keypresent("Schemas", final)
         and keyisset("Schemas", override)
         and isinstance(override["Schemas"], dict)
     ):
-        override_globals = Schemas.parse_obj(override["Schemas"])
-        final["Schemas"] = override_globals.dict(by_alias=True)
+        final["Schemas"] = override["Schemas"]
 
     merge_acls(final, override, extend_all)
     merge_topics(final, override, not extend_all)
     return final
 
 
+class DefinitionsMerger:
+    """
+    Incremental, in-place merge of the definition files contents, same as merge_contents with extend_all=True,
+    without copying the content merged so far for each new file.
+
+    Topics are indexed by name. As with merge_contents, a topic keeps the definition of the first file which
+    defined it, and is ordered with the topics of the last file which defined it, most recent files first.
+    ACLs policies are indexed by their items, in the first-seen order.
+    """
+
+    def __init__(self):
+        self.globals: dict = {}
+        self.schemas: dict | None = None
+        self.topics_config: dict = {}
+        self.topics: dict[str, dict] = {}
+        self.topics_positions: dict[str, tuple[int, int]] = {}
+        self.acls_config: dict = {}
+        self.policies: dict[tuple, dict] = {}
+        self.files_count: int = 0
+
+    def merge_topics(self, override_topics: dict) -> None:
+        if not keyisset("Topics", override_topics):
+            return
+        self.files_count += 1
+        file_topics: dict[str, dict] = {}
+        for position, topic in enumerate(override_topics["Topics"]):
+            topic_name = get_topic_name(topic)
+            if topic_name not in file_topics:
+                self.topics_positions[topic_name] = (-self.files_count, position)
+            file_topics[topic_name] = topic
+        for topic_name, topic in file_topics.items():
+            self.topics.setdefault(topic_name, topic)
+        self.topics_config.update(
+            {key: value for key, value in override_topics.items() if key != "Topics"}
+        )
+
+    def merge_acls(self, override_acls: dict) -> None:
+        if not keyisset("Policies", override_acls):
+            return
+        for policy in override_acls["Policies"]:
+            self.policies.setdefault(get_policy_key(policy), policy)
+        self.acls_config.update(
+            {key: value for key, value in override_acls.items() if key != "Policies"}
+        )
+
+    def merge(self, override: dict, validated: bool = False) -> None:
+        """
+        Merges the definition file content into the current state.
+
+        :param dict override: The definition file content
+        :param bool validated: Whether override was already validated with validate_definition_content
+        """
+        if not validated:
+            override = validate_definition_content(override)
+        if keyisset("Globals", override) and isinstance(override["Globals"], dict):
+            self.globals.update(override["Globals"])
+        if keyisset("Schemas", override) and isinstance(override["Schemas"], dict):
+            if self.schemas is None:
+                self.schemas = dict(override["Schemas"])
+            else:
+                self.schemas.update(override["Schemas"])
+        if keyisset("ACLs", override):
+            self.merge_acls(override["ACLs"])
+        if keyisset("Topics", override):
+            self.merge_topics(override["Topics"])
+
+    @property
+    def content(self) -> dict:
+        """The merged content, as returned by merge_contents"""
+        content: dict = {
+            "Globals": self.globals,
+            "Topics": dict(self.topics_config),
+            "ACLs": dict(self.acls_config),
+        }
+        if self.topics:
+            content["Topics"]["Topics"] = [
+                self.topics[topic_name]
+                for topic_name in sorted(
+                    self.topics, key=lambda _name: self.topics_positions[_name]
+                )
+            ]
+        if self.policies:
+            content["ACLs"]["Policies"] = list(self.policies.values())
+        if self.schemas is not None:
+            content["Schemas"] = self.schemas
+        return content
+
+
 class KafkaStack:
     """
     Class to represent the Kafka topics / acls / schemas in CloudFormation.
     """
 
-    def __init__(self, files_paths, config_file_path=None):
+    def __init__(
+        self,
+        files_paths,
+        config_file_path=None,
+        jobs: int = 1,
+        cache: DefinitionsCache = None,
+        upload_workers: int = DEFAULT_UPLOAD_WORKERS,
+    ):
         self.model = None
-        self.template = Template("Kafka topics-acls-schemas root")
+        self.template = Template(TEMPLATE_DESCRIPTION)
         self.stack = None
         self.topic_class = RTopic
         self.acl_class = RACLs
         self.schemas_r = {}
         self.topics_r = {}
+        self.topic_sets_r = {}
         self.globals_config = {}
-        final_content = {"Globals": {}, "Topics": {}, "ACLs": {}}
-        for file_path in files_paths:
-            if file_path.endswith(".yaml") or file_path.endswith(".yml"):
-                with open(file_path) as file_fd:
-                    file_content = file_fd.read()
-                yaml_content = yaml.load(file_content, Loader=Loader)
-                final_content = merge_contents(
-                    final_content, yaml_content, extend_all=True
-                )
-        if config_file_path:
-            with open(config_file_path) as override_fd:
+        self.files_paths = list(files_paths)
+        self.config_file_path = config_file_path
+        self.cache = cache
+        self.files_contents: list[dict | None] = load_definition_files(
+            self.files_paths, jobs, cache
+        )
+        self.render_context = None
+        self.rendered_topics: dict[str, dict] = {}
+        self.stream_writer: TemplateStreamWriter | None = None
+        self.sharded: bool = False
+        self.schemas_uploader = SchemasUploader(upload_workers)
+        self.schemas_files: dict[str, tuple[int, str]] = {}
+        self.read_schemas_files: dict[str, int] = {}
+        self.schemas_metadata: dict[tuple[str, str], dict] = {}
+        self.schemas_definitions: dict[tuple[str, tuple[str, str]], str] = {}
+        self.s3_definitions: dict[str, str] = {}
+        self.waves_sizes: dict[str, int] = {}
+        self.waves_titles: dict[str, list[str]] = {}
+        self.set_model()
+
+    def set_model(self):
+        """
+        Merges the files contents loaded, and the config file if any, into the model.
+        """
+        merger = DefinitionsMerger()
+        for file_content in self.files_contents:
+            if file_content is not None:
+                merger.merge(file_content, validated=True)
+        final_content = merger.content
+        if self.config_file_path:
+            with open(self.config_file_path) as override_fd:
                 override_content = override_fd.read()
             override_content = yaml.load(override_content, Loader=Loader)
             final_content = merge_contents(final_content, override_content)
-        if keyisset("Topics", final_content) and keyisset(
-            "Topics", final_content["Topics"]
-        ):
-            for topic in final_content["Topics"]["Topics"]:
-                if keyisset("Settings", topic):
-                    topic["Settings"] = (
-                        TopicsSettings()
-                        .parse_obj(topic["Settings"])
-                        .dict(
-                            by_alias=True,
-                            exclude_none=True,
-                            exclude_unset=True,
-                            exclude_defaults=True,
-                        )
-                    )
-
+        topics = final_content["Topics"].pop("Topics", None)
+        policies = final_content["ACLs"].pop("Policies", None)
         self.model = Model.parse_obj(final_content)
+        # Topics and policies are validated per file, and unique once merged. Setting them as-is
+        # avoids copying the topics and the quadratic unique items check of the policies.
+        if topics:
+            self.model.Topics.Topics = topics
+        if policies:
+            self.model.ACLs.Policies = Policies.construct(__root__=policies)
         if not self.model.Topics and not self.model.ACLs:
             raise KeyError("You must define at least one of ACLs or Topics")
         self.set_globals()
 
+    def reload_files(self, changed_paths: list[str]):
+        """
+        Loads again only the definition files which changed, and merges all the files contents into the model.
+        Renders into a new template, reusing the resources of the topics which did not change.
+        Changed schemas files only need the new template: the topics using them are rendered again.
+
+        :param list[str] changed_paths: Paths of the files which changed
+        """
+        for index, file_path in enumerate(self.files_paths):
+            if file_path in changed_paths:
+                self.files_contents[index] = load_definition_file(file_path, self.cache)
+        self.set_model()
+        self.template = self.new_template()
+        self.schemas_r = {}
+        self.topics_r = {}
+        self.topic_sets_r = {}
+
+    def new_template(self) -> Template:
+        if self.sharded:
+            return ShardableTemplate(TEMPLATE_DESCRIPTION)
+        return Template(TEMPLATE_DESCRIPTION)
+
+    def enable_sharding(self):
+        """
+        Renders without the template resources count limit, which applies to each nested stack instead,
+        and with the policies referencing the topics by name, for the ACLs to be in their own nested stacks.
+        """
+        self.sharded = True
+        self.template = self.new_template()
+
+    def add_resource(self, resource_class, title: str, **properties):
+        """
+        Adds the resource to the template or, when streaming, writes it to the output.
+
+        :return: The resource, or the reference to the resource written when streaming
+        """
+        if self.stream_writer:
+            return self.stream_writer.write_resource(resource_class, title, properties)
+        return self.template.add_resource(resource_class(title, **properties))
+
+    def new_property(self, property_class, **properties):
+        """The property object or, when streaming, the properties validated for the property class"""
+        if self.stream_writer:
+            self.stream_writer.validate_properties(property_class, properties)
+            return properties
+        return property_class(**properties)
+
+    def stream_template(
+        self,
+        output_fd,
+        topic_sets_count: int = None,
+        acls_split_by: str = None,
+        wave_size: int = None,
+        schemas_wave_size: int = None,
+    ) -> None:
+        """
+        Renders the topics and ACLs, writing the resources to output_fd as they are rendered,
+        without keeping the template resources in memory.
+
+        :param output_fd: The file to write the JSON template to
+        :param int topic_sets_count: When set, overrides Topics.TopicSetsCount.
+        :param str acls_split_by: When set, overrides ACLs.SplitBy.
+        :param int wave_size: When set, overrides Topics.WaveSize.
+        :param int schemas_wave_size: When set, overrides Schemas.WaveSize.
+        """
+        self.stream_writer = TemplateStreamWriter(output_fd, self.template.description)
+        try:
+            self.render_topics(topic_sets_count, wave_size, schemas_wave_size)
+            self.render_acls(acls_split_by)
+            self.stream_writer.close()
+        finally:
+            self.stream_writer = None
+
+    def get_render_context(self, topic_sets_count: int | None) -> tuple:
+        """All the properties, other than the topics definitions, that the rendered topics depend on"""
+        return (
+            topic_sets_count,
+            self.waves_sizes,
+            self.model.Globals,
+            self.model.Schemas,
+            self.model.Topics.dict(exclude={"Topics"}) if self.model.Topics else None,
+        )
+
+    def add_rendered_resources(self, rendered_key: str, models: list) -> bool:
+        """
+        Adds to the template the resources previously rendered for the same topics definitions,
+        and the same schemas files, if any. Otherwise, starts recording the schemas files read to render them.
+
+        :param str rendered_key: The topic name, or the topics set title
+        :param list models: The topics definitions rendered into these resources
+        :return: Whether the rendered resources could be reused
+        """
+        rendered = self.rendered_topics.get(rendered_key)
+        if (
+            self.stream_writer
+            or any(self.waves_sizes.values())
+            or not rendered
+            or len(rendered["models"]) != len(models)
+            or any(
+                _previous is not _model and _previous != _model
+                for _previous, _model in zip(rendered["models"], models)
+            )
+            or any(
+                get_file_mtime(file_path) != mtime
+                for file_path, mtime in rendered["schemas_files"].items()
+            )
+        ):
+            self.read_schemas_files = {}
+            return False
+        for resource in rendered["resources"]:
+            self.template.add_resource(resource)
+        self.topics_r.update(rendered["topics_r"])
+        self.topic_sets_r.update(rendered["topic_sets_r"])
+        self.schemas_r.update(rendered["schemas_r"])
+        return True
+
+    def set_rendered_resources(
+        self,
+        rendered_key: str,
+        models: list,
+        resources_count: int,
+        topics_names: list[str],
+        topics_titles: list[str],
+    ):
+        """
+        Keeps the resources added to the template since resources_count, for the given topics definitions,
+        to reuse them in the next render if these did not change.
+        """
+        if self.stream_writer or any(self.waves_sizes.values()):
+            return
+        self.rendered_topics[rendered_key] = {
+            "models": models,
+            "schemas_files": dict(self.read_schemas_files),
+            "resources": list(self.template.resources.values())[resources_count:],
+            "topics_r": {
+                name: self.topics_r[name]
+                for name in topics_names
+                if name in self.topics_r
+            },
+            "topic_sets_r": {
+                name: self.topic_sets_r[name]
+                for name in topics_names
+                if name in self.topic_sets_r
+            },
+            "schemas_r": {
+                title: self.schemas_r[title]
+                for title in topics_titles
+                if title in self.schemas_r
+            },
+        }
+
+    def set_waves(self, wave_size: int | None, schemas_wave_size: int | None):
+        """
+        Sets the waves sizes of the topics and schemas resources, and starts new waves.
+
+        :param int wave_size: When set, overrides Topics.WaveSize.
+        :param int schemas_wave_size: When set, overrides Schemas.WaveSize.
+        """
+        if wave_size is None:
+            wave_size = self.model.Topics.WaveSize or 0
+        if schemas_wave_size is None:
+            schemas_wave_size = (
+                self.model.Schemas.WaveSize or 0 if self.model.Schemas else 0
+            )
+        if self.sharded and (wave_size or schemas_wave_size):
+            raise ValueError(
+                "The waves cannot be rendered with sharding, as the resources of a wave would all be in the same shard"
+            )
+        self.waves_sizes = {"Topics": wave_size, "Schemas": schemas_wave_size}
+        self.waves_titles = {}
+
+    def add_to_wave(
+        self, wave: str, title: str, depends_on: str | None = None
+    ) -> str | list[str] | None:
+        """
+        Adds the resource to the wave. When the wave has a size, the resource depends on the resource
+        wave size before it, so that at most wave size resources are created or updated at once.
+
+        :param str wave: Topics or Schemas
+        :param str title: Title of the resource
+        :param str depends_on: Title of the resource it otherwise depends on
+        :return: The DependsOn of the resource
+        """
+        wave_size = self.waves_sizes.get(wave)
+        if not wave_size:
+            return depends_on
+        titles = self.waves_titles.setdefault(wave, [])
+        titles.append(title)
+        if len(titles) <= wave_size:
+            return depends_on
+        previous = titles[-wave_size - 1]
+        return [depends_on, previous] if depends_on else previous
+
     def set_globals(self):
         """
         Method to set the global new_settings
@@ -284,15 +785,78 @@ class KafkaStack:
             }
         )
 
+    def get_schema_file_definition(self, file_path: str) -> str:
+        """
+        The definition in the schema file, as JSON. The file is only read and parsed again when it changed.
+
+        :raises FileNotFoundError: When file_path is not a file
+        """
+        mtime = os.stat(file_path).st_mtime_ns
+        self.read_schemas_files[file_path] = mtime
+        cached = self.schemas_files.get(file_path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        with open(file_path) as definition_fd:
+            definition = json.dumps(json.loads(definition_fd.read()))
+        self.schemas_files[file_path] = (mtime, definition)
+        return definition
+
+    def get_schema_metadata(self, attribute_metadata: dict | None) -> tuple:
+        """
+        The metadata to add to the schema, from Schemas.Metadata and the schema Metadata,
+        merged once per pair of metadata.
+
+        :return: The key of the pair of metadata, and the merged metadata
+        """
+        global_metadata = self.model.Schemas.Metadata
+        metadata_key = (
+            json.dumps(global_metadata, sort_keys=True, default=str),
+            json.dumps(attribute_metadata, sort_keys=True, default=str),
+        )
+        if metadata_key not in self.schemas_metadata:
+            if global_metadata and attribute_metadata:
+                metadata = recursive_merge(
+                    deepcopy(global_metadata), attribute_metadata
+                )
+            else:
+                metadata = deepcopy(global_metadata or attribute_metadata or {})
+            self.schemas_metadata[metadata_key] = metadata
+        return metadata_key, self.schemas_metadata[metadata_key]
+
+    def add_schema_metadata(
+        self, definition: str, attribute_metadata: dict | None, file_name: str
+    ) -> str:
+        """
+        Adds the metadata keys not already defined to the AVRO schema definition.
+        This is done once per definition and pair of metadata.
+        """
+        metadata_key, metadata = self.get_schema_metadata(attribute_metadata)
+        definition_key = (definition, metadata_key)
+        if definition_key in self.schemas_definitions:
+            return self.schemas_definitions[definition_key]
+        try:
+            definition_dict = json.loads(definition)
+        except json.JSONDecodeError:
+            print(f"Schema {file_name} is not a valid JSON. Not adding metadata.")
+            self.schemas_definitions[definition_key] = definition
+            return definition
+        for key, value in metadata.items():
+            if key in definition_dict:
+                print(f"Metadata {key} already defined in source schema.")
+            else:
+                definition_dict[key] = value
+                print(f"Updated {file_name} with {key} metadata")
+        self.schemas_definitions[definition_key] = json.dumps(definition_dict)
+        return self.schemas_definitions[definition_key]
+
     def define_schema_definition_path(
         self, topic_name: str, subject_suffix: str, attribute: TopicSchemaDef
     ):
         file_name = None
         if isinstance(attribute.Definition, str):
             try:
-                with open(attribute.Definition) as definition_fd:
-                    file_name = attribute.Definition
-                    definition = json.dumps(json.loads(definition_fd.read()))
+                definition = self.get_schema_file_definition(attribute.Definition)
+                file_name = attribute.Definition
             except FileNotFoundError:
                 print("Failed to load file, using string literal as definition")
                 definition = attribute.Definition
@@ -304,42 +868,25 @@ class KafkaStack:
         # This avoids having to edit all schemas one by one to edit properties.
         # Only doing this for AVRO.
         if attribute.Serializer == SerializerDef.AVRO:
-            try:
-                definition_dict = json.loads(definition)
-                if self.model.Schemas.Metadata and not attribute.Metadata:
-                    to_add_metadata: dict = deepcopy(self.model.Schemas.Metadata)
-                elif not self.model.Schemas.Metadata and attribute.Metadata:
-                    to_add_metadata: dict = deepcopy(attribute.Metadata)
-                elif self.model.Schemas.Metadata and attribute.Metadata:
-                    from .common import recursive_merge
-
-                    to_add_metadata = recursive_merge(
-                        self.model.Schemas.Metadata, attribute.Metadata
-                    )
-                else:
-                    to_add_metadata: dict = {}
-                for key in to_add_metadata.keys():
-                    if key not in definition_dict:
-                        definition_dict.update(self.model.Schemas.Metadata)
-                        print(f"Updated {file_name} with {key} metadata")
-                    else:
-                        print(f"Metadata {key} already defined in source schema.")
-                definition: str = json.dumps(definition_dict)
-            except json.JSONDecodeError:
-                print(f"Schema {file_name} is not a valid JSON. Not adding metadata.")
-                pass
+            definition = self.add_schema_metadata(
+                definition, attribute.Metadata, file_name
+            )
 
         if self.model.Schemas.S3Store and file_name:
-            s3_file_path = (
-                f"{self.model.Schemas.S3Store.PrefixPath}{FILE_PREFIX}{file_name}"
+            s3_store = self.model.Schemas.S3Store
+            if s3_store.ContentAddressed:
+                s3_file_path = get_content_addressed_key(
+                    s3_store.PrefixPath, definition
+                )
+            else:
+                s3_file_path = f"{s3_store.PrefixPath}{FILE_PREFIX}{file_name}"
+            s3_uri = self.schemas_uploader.add(
+                s3_store.BucketName,
+                s3_file_path,
+                definition,
+                skip_if_exists=s3_store.ContentAddressed,
             )
-            session = boto3.session.Session()
-            resource = session.resource("s3")
-            bucket = resource.Bucket(self.model.Schemas.S3Store.BucketName)
-            s3_file = bucket.Object(key=s3_file_path)
-            s3_file.put(Body=definition, ContentType="application/json")
-            s3_uri = f"s3://{s3_file.bucket_name}/{s3_file.key}"
-            print(f"Uploaded schema {file_name} to {s3_uri}")
+            self.s3_definitions[s3_uri] = definition
             return s3_uri
         else:
             return definition
@@ -355,17 +902,22 @@ class KafkaStack:
         attribute: TopicSchemaDef,
         subject_suffix: str,
         deletion_policy,
+        subject_topic_name: str = None,
+        depends_on: str = None,
     ):
         definition = self.define_schema_definition_path(
             topic_name, subject_suffix, attribute
         )
-        topic_schema_r = schema_class(
-            f"{topic_name}{SerializerDef[attribute.Serializer.name].value}{subject_suffix}Schema",
+        schema_props: dict = dict(
             DeletionPolicy=deletion_policy,
             SerializeAttribute=subject_suffix,
             Serializer=SerializerDef[attribute.Serializer.name].value,
             Definition=definition,
-            Subject=Sub(f"${{{topic_name}.Name}}-{subject_suffix}"),
+            Subject=(
+                f"{subject_topic_name}-{subject_suffix}"
+                if subject_topic_name
+                else Sub(f"${{{topic_name}.Name}}-{subject_suffix}")
+            ),
             RegistryUrl=registry_url,
             RegistryUsername=(
                 registry_username
@@ -378,7 +930,9 @@ class KafkaStack:
                 else registry_password.__root__
             ),
             RegistryUserInfo=registry_userinfo.__root__,
-            CompatibilityMode=CompatibilityMode[attribute.CompatibilityMode.name].value,
+            CompatibilityMode=get_enum_value(
+                CompatibilityMode, attribute.CompatibilityMode
+            ),
         )
         if schema_class is CTopicSchema:
             function_name = (
@@ -389,16 +943,29 @@ class KafkaStack:
                     f"{self.model.Schemas.FunctionName}"
                 )
             )
-            setattr(topic_schema_r, "ServiceToken", function_name)
-        self.schemas_r[topic_name] = topic_schema_r
-        self.template.add_resource(topic_schema_r)
+            schema_props["ServiceToken"] = function_name
+        schema_title = f"{topic_name}{SerializerDef[attribute.Serializer.name].value}{subject_suffix}Schema"
+        depends_on = self.add_to_wave("Schemas", schema_title, depends_on)
+        if depends_on:
+            schema_props["DependsOn"] = depends_on
+        self.schemas_r[topic_name] = self.add_resource(
+            schema_class, schema_title, **schema_props
+        )
 
-    def add_topic_schema(self, topic_name, schema_definition):
+    def add_topic_schema(
+        self,
+        topic_name,
+        schema_definition,
+        subject_topic_name: str = None,
+        depends_on: str = None,
+    ):
         """
         Method to create a new schema for the given topic
 
         :param str topic_name:
         :param Schema schema_definition:
+        :param str subject_topic_name: When set, the subject uses the topic name literal instead of GetAtt
+        :param str depends_on: Title of the resource the schema must depend on
         """
         schema_class = RTopicSchema
         if self.model.Schemas and self.model.Schemas.FunctionName:
@@ -436,7 +1003,9 @@ class KafkaStack:
             registry_userinfo = Ref(AWS_NO_VALUE)
 
         if keyisset("DeletionPolicy", schema_config):
-            deletion_policy = DeletionPolicy[schema_config["DeletionPolicy"].name].value
+            deletion_policy = get_enum_value(
+                DeletionPolicy, schema_config["DeletionPolicy"]
+            )
             if (
                 self.model.Schemas
                 and self.model.Schemas.DeletionPolicy
@@ -469,6 +1038,8 @@ class KafkaStack:
                 schema_definition.Key,
                 "key",
                 deletion_policy,
+                subject_topic_name,
+                depends_on,
             )
         if schema_definition.Value:
             self.add_attribute_schema(
@@ -481,23 +1052,141 @@ class KafkaStack:
                 schema_definition.Value,
                 "value",
                 deletion_policy,
+                subject_topic_name,
+                depends_on,
+            )
+
+    @staticmethod
+    def get_topic_title(topic) -> str:
+        topic_title = topic.Name.__root__.replace("-", "").title()
+        return NONALPHANUM.sub("", topic_title)
+
+    @staticmethod
+    def get_topic_settings(topic) -> dict:
+        return get_topic_settings(topic)
+
+    def render_topic_sets(self, topic_sets_count: int, function_name) -> None:
+        """
+        Groups the topics into up to topic_sets_count Custom::KafkaTopicSet resources, by hash of the topic name,
+        so that adding or removing topics does not move the other topics to another set.
+        Each set creates, updates and deletes its topics with batched requests.
+
+        :param int topic_sets_count: Number of sets to spread the topics over
+        :param function_name: The ServiceToken of the topics function
+        """
+        if not function_name:
+            raise ValueError(
+                "Topics.FunctionName must be set to render Custom::KafkaTopicSet resources"
+            )
+        topic_sets: dict[int, list] = {}
+        for topic in sorted(self.model.Topics.Topics, key=lambda _t: _t.Name.__root__):
+            topic_sets.setdefault(
+                get_topic_set_index(topic.Name.__root__, topic_sets_count), []
+            ).append(topic)
+        for set_index, set_topics_defs in sorted(topic_sets.items()):
+            set_title = f"TopicSet{set_index:04d}"
+            set_topics: list = []
+            if self.add_rendered_resources(set_title, set_topics_defs):
+                continue
+            resources_count = len(self.template.resources)
+            for topic in set_topics_defs:
+                set_topic_props: dict = {
+                    "Name": topic.Name.__root__,
+                    "PartitionsCount": topic.PartitionsCount.__root__,
+                    "ReplicationFactor": (
+                        self.model.Topics.ReplicationFactor.__root__
+                        if not topic.ReplicationFactor
+                        else topic.ReplicationFactor.__root__
+                    ),
+                }
+                topic_settings = self.get_topic_settings(topic)
+                if topic_settings:
+                    set_topic_props["Settings"] = topic_settings
+                set_topics.append(
+                    self.new_property(KafkaTopicSetTopic, **set_topic_props)
+                )
+            set_cfg: dict = {
+                "ServiceToken": function_name,
+                "RemovedTopicsPolicy": DeletionPolicy[
+                    self.model.Topics.DeletionPolicy.name
+                ].value,
+            }
+            set_cfg.update(self.globals_config)
+            depends_on = self.add_to_wave("Topics", set_title)
+            if depends_on:
+                set_cfg["DependsOn"] = depends_on
+            topic_set_r = self.add_resource(
+                CTopicSet,
+                set_title,
+                DeletionPolicy=DeletionPolicy[
+                    self.model.Topics.DeletionPolicy.name
+                ].value,
+                Topics=set_topics,
+                **set_cfg,
+            )
+            for topic in set_topics_defs:
+                self.topic_sets_r[topic.Name.__root__] = topic_set_r
+                if topic.Schema:
+                    self.add_topic_schema(
+                        self.get_topic_title(topic),
+                        topic.Schema,
+                        subject_topic_name=topic.Name.__root__,
+                        depends_on=set_title,
+                    )
+            self.set_rendered_resources(
+                set_title,
+                set_topics_defs,
+                resources_count,
+                [topic.Name.__root__ for topic in set_topics_defs],
+                [self.get_topic_title(topic) for topic in set_topics_defs],
             )
 
-    def render_topics(self):
+    def render_topics(
+        self,
+        topic_sets_count: int = None,
+        wave_size: int = None,
+        schemas_wave_size: int = None,
+        upload_schemas: bool = True,
+    ):
+        """
+        Renders the topics resources, one per topic, or grouped into topics sets,
+        and uploads the schemas definitions to S3 once rendered.
+
+        :param int topic_sets_count: When set, overrides Topics.TopicSetsCount.
+        :param int wave_size: When set, overrides Topics.WaveSize.
+        :param int schemas_wave_size: When set, overrides Schemas.WaveSize.
+        :param bool upload_schemas: When False, the definitions are only uploaded by schemas_uploader.upload(),
+          i.e. once the schemas are checked.
+        """
         if not self.model or not self.model.Topics or not self.model.Topics.Topics:
             return
+        self.set_waves(wave_size, schemas_wave_size)
         function_name = None
         if self.model.Topics.FunctionName:
             self.topic_class = CTopic
             function_name = (
-                function_name
+                self.model.Topics.FunctionName
                 if self.model.Topics.FunctionName.startswith("arn:aws")
                 else Sub(
                     "arn:${AWS::Partition}:lambda:${AWS::Region}:${AWS::AccountId}:function:"
                     f"{self.model.Topics.FunctionName}"
                 )
             )
+        if topic_sets_count is None:
+            topic_sets_count = self.model.Topics.TopicSetsCount or 0
+        render_context = self.get_render_context(topic_sets_count)
+        if render_context != self.render_context:
+            self.rendered_topics = {}
+            self.render_context = render_context
+        if topic_sets_count:
+            self.render_topic_sets(topic_sets_count, function_name)
+            if upload_schemas:
+                self.schemas_uploader.upload()
+            return
         for topic in self.model.Topics.Topics:
+            if self.add_rendered_resources(topic.Name.__root__, [topic]):
+                continue
+            resources_count = len(self.template.resources)
             topic_cfg = topic.dict()
             if function_name:
                 topic_cfg.update({"ServiceToken": function_name})
@@ -516,14 +1205,7 @@ class KafkaStack:
             ):
                 del topic_cfg["Settings"]
             else:
-                topic_cfg["Settings"] = json.loads(
-                    topic.Settings.json(
-                        by_alias=True,
-                        exclude_none=True,
-                        exclude_unset=True,
-                        exclude_defaults=True,
-                    )
-                )
+                topic_cfg["Settings"] = get_topic_settings(topic)
             topic_title_raw = topic.Name.__root__
             topic_title = topic_title_raw.replace("-", "").title()
             topic_title = NONALPHANUM.sub("", topic_title)
@@ -533,16 +1215,27 @@ class KafkaStack:
                 del topic_cfg["Schema"]
             if keypresent("Schema", topic_cfg):
                 del topic_cfg["Schema"]
-            topic_r = self.template.add_resource(
-                self.topic_class(
-                    topic_title,
-                    DeletionPolicy=DeletionPolicy[
-                        self.model.Topics.DeletionPolicy.name
-                    ].value,
-                    **topic_cfg,
-                )
+            depends_on = self.add_to_wave("Topics", topic_title)
+            if depends_on:
+                topic_cfg["DependsOn"] = depends_on
+            topic_r = self.add_resource(
+                self.topic_class,
+                topic_title,
+                DeletionPolicy=DeletionPolicy[
+                    self.model.Topics.DeletionPolicy.name
+                ].value,
+                **topic_cfg,
             )
             self.topics_r[topic.Name.__root__] = topic_r
+            self.set_rendered_resources(
+                topic.Name.__root__,
+                [topic],
+                resources_count,
+                [topic.Name.__root__],
+                [topic_title],
+            )
+        if upload_schemas:
+            self.schemas_uploader.upload()
 
     def import_topic_name(self, policy):
         """
@@ -553,11 +1246,89 @@ class KafkaStack:
         """
         if policy.ResourceType.value == ResourceType.TOPIC.name:
             topic_name = policy.Resource
-            if topic_name in self.topics_r.keys():
-                return GetAtt(self.topics_r[policy.Resource], "Name")
+            # Sharded, the topic can be in another nested stack than the ACLs
+            if topic_name in self.topics_r.keys() and not self.sharded:
+                return GetAtt(self.topics_r[policy.Resource].title, "Name")
         return policy.Resource
 
-    def render_acls(self):
+    def get_acls_topic_sets_dependencies(self, policies: list = None) -> list[str]:
+        """
+        Topics in sets are referenced by name in the policies, so the ACLs depend on the sets instead.
+        Same for the topics resources, when sharded.
+
+        :param list policies: The policies of the ACL resource. Defaults to all the policies
+        """
+        sets_titles: set = set()
+        if policies is None:
+            policies = self.model.ACLs.Policies.__root__
+        for policy in policies:
+            if policy.ResourceType.value != ResourceType.TOPIC.name:
+                continue
+            if policy.Resource in self.topic_sets_r:
+                sets_titles.add(self.topic_sets_r[policy.Resource].title)
+            elif self.sharded and policy.Resource in self.topics_r:
+                sets_titles.add(self.topics_r[policy.Resource].title)
+        return sorted(sets_titles)
+
+    def get_sharded_template(
+        self,
+        max_resources: int = DEFAULT_SHARD_MAX_RESOURCES,
+        max_bytes: int = DEFAULT_SHARD_MAX_BYTES,
+        shards_count: int = None,
+        template_format: str = "json",
+        template_url_prefix: str = "",
+    ) -> ShardedTemplate:
+        """
+        Splits the rendered template into nested stacks templates. Call enable_sharding() before rendering.
+        """
+        return shard_template(
+            self.template,
+            (CACLs.resource_type, RACLs.resource_type),
+            max_resources,
+            max_bytes,
+            shards_count,
+            template_format,
+            template_url_prefix,
+        )
+
+    def get_acl_policy_properties(self, policy) -> dict:
+        if isinstance(policy.PatternType, str):
+            pattern_key = policy.PatternType
+        else:
+            pattern_key = policy.PatternType.name
+        return {
+            "Resource": self.import_topic_name(policy),
+            "ResourceType": ResourceType[policy.ResourceType.name].value,
+            "Principal": policy.Principal,
+            "PatternType": PatternType[pattern_key].value,
+            "Action": Action[policy.Action.name].value,
+            "Effect": Effect[policy.Effect.name].value,
+            "Host": policy.Host if policy.Host else r"*",
+        }
+
+    def get_acls_policies_groups(self, split_by: str = None) -> dict[str, list]:
+        """
+        Groups the policies per ACL resource title. A single ACLs resource, unless split_by is set.
+
+        :param str split_by: Principal or PrincipalResourcePrefix
+        """
+        if not split_by:
+            return {"ACLs": self.model.ACLs.Policies.__root__}
+        titles: dict[tuple, str] = {}
+        policies_groups: dict[str, list] = {}
+        for policy in self.model.ACLs.Policies.__root__:
+            split_key = get_acl_split_key(policy, split_by)
+            if split_key not in titles:
+                titles[split_key] = get_acl_title(split_key)
+            policies_groups.setdefault(titles[split_key], []).append(policy)
+        return policies_groups
+
+    def render_acls(self, split_by: str = None):
+        """
+        Renders the ACL resources, one for all the policies, or one per principal / resource prefix.
+
+        :param str split_by: When set, overrides ACLs.SplitBy.
+        """
         if not self.model.ACLs or not self.model.ACLs.Policies:
             return
         function_name = None
@@ -576,23 +1347,25 @@ class KafkaStack:
         if function_name:
             acl.update({"ServiceToken": function_name})
 
-        policies = []
-        for policy in self.model.ACLs.Policies.__root__:
-            if isinstance(policy.PatternType, str):
-                pattern_key = policy.PatternType
-            else:
-                pattern_key = policy.PatternType.name
-            policies.append(
-                KafkaAclPolicy(
-                    Resource=self.import_topic_name(policy),
-                    ResourceType=ResourceType[policy.ResourceType.name].value,
-                    Principal=policy.Principal,
-                    PatternType=PatternType[pattern_key].value,
-                    Action=Action[policy.Action.name].value,
-                    Effect=Effect[policy.Effect.name].value,
-                    Host=policy.Host if policy.Host else r"*",
+        if split_by is None and self.model.ACLs.SplitBy:
+            split_by = get_enum_value(SplitBy, self.model.ACLs.SplitBy)
+        for acl_title, acl_policies in self.get_acls_policies_groups(split_by).items():
+            acl_props: dict = dict(acl)
+            policies = (
+                self.new_property(
+                    KafkaAclPolicy, **self.get_acl_policy_properties(policy)
                 )
+                for policy in acl_policies
+            )
+            if not self.stream_writer:
+                policies = list(policies)
+            depends_on = self.get_acls_topic_sets_dependencies(acl_policies)
+            if depends_on:
+                acl_props["DependsOn"] = depends_on
+            self.add_resource(
+                self.acl_class,
+                acl_title,
+                DeletionPolicy="Delete" if split_by else "Retain",
+                Policies=policies,
+                **acl_props,
             )
-        self.template.add_resource(
-            self.acl_class("ACLs", DeletionPolicy="Retain", Policies=policies, **acl)
-        )
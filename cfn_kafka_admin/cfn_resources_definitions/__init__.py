@@ -4,6 +4,7 @@
 """Top-level package for Kafka::Topic."""
 
 from troposphere import AWSProperty
+from troposphere.validators import positive_integer
 
 __author__ = """John Mille"""
 __email__ = "john@ews-network.net"
@@ -24,3 +25,16 @@ class KafkaAclPolicy(AWSProperty):
         "Effect": (str, True),
         "Host": (str, False),
     }
+
+
+class KafkaTopicSetTopic(AWSProperty):
+    """
+    Class to represent a topic for Custom::KafkaTopicSet.Topics
+    """
+
+    props = {
+        "Name": (str, True),
+        "PartitionsCount": (positive_integer, True),
+        "ReplicationFactor": (positive_integer, False),
+        "Settings": (dict, False),
+    }
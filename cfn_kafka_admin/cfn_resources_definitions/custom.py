@@ -6,7 +6,10 @@
 from troposphere.cloudformation import CustomResource
 from troposphere.validators import positive_integer
 
-from cfn_kafka_admin.cfn_resources_definitions import KafkaAclPolicy
+from cfn_kafka_admin.cfn_resources_definitions import (
+    KafkaAclPolicy,
+    KafkaTopicSetTopic,
+)
 
 
 class KafkaTopic(CustomResource):
@@ -31,6 +34,27 @@ class KafkaTopic(CustomResource):
     }
 
 
+class KafkaTopicSet(CustomResource):
+    """
+    Class to represent Custom::KafkaTopicSet
+    """
+
+    resource_type = "Custom::KafkaTopicSet"
+
+    props = {
+        "Topics": ([KafkaTopicSetTopic], True),
+        "DefaultSettings": (dict, False),
+        "RemovedTopicsPolicy": (str, False),
+        "BootstrapServers": (str, True),
+        "SecurityProtocol": (str, False),
+        "SASLMechanism": (str, False),
+        "SASLUsername": (str, False),
+        "SASLPassword": (str, False),
+        "ServiceToken": (str, True),
+        "ClientConfig": (dict, False),
+    }
+
+
 class KafkaAcl(CustomResource):
     """
     Class to represent Custom::KafkaACL
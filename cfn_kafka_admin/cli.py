@@ -4,10 +4,197 @@
 """Console script for aws_cfn_kafka_admin_provider."""
 
 import argparse
+import os
 import pprint
 import sys
+from time import perf_counter, sleep
 
-from cfn_kafka_admin.cfn_kafka_admin import KafkaStack
+from cfn_flip import to_yaml
+
+from cfn_kafka_admin.cfn_kafka_admin import KafkaStack, get_file_mtime
+from cfn_kafka_admin.definitions_cache import DEFAULT_CACHE_MAX_SIZE, DefinitionsCache
+from cfn_kafka_admin.schemas_compatibility import (
+    check_schemas_compatibility,
+    get_template_schemas,
+    load_previous_versions,
+)
+from cfn_kafka_admin.schemas_uploads import DEFAULT_UPLOAD_WORKERS
+from cfn_kafka_admin.template_compact import compact_template, dump_template
+from cfn_kafka_admin.template_shards import (
+    DEFAULT_SHARD_MAX_BYTES,
+    DEFAULT_SHARD_MAX_RESOURCES,
+    get_shard_file_name,
+)
+
+
+def write_template(stack: KafkaStack, output_file: str, template_format: str):
+    if output_file:
+        with open(output_file, "w") as output_fd:
+            if template_format == "yaml":
+                output_fd.write(stack.template.to_yaml())
+            else:
+                output_fd.write(stack.template.to_json())
+    else:
+        if template_format == "yaml":
+            print(stack.template.to_yaml())
+        else:
+            try:
+                print(stack.template.to_json())
+            except TypeError:
+                pprint.pprint(stack.template.to_dict())
+
+
+def write_sharded_template(stack: KafkaStack, args):
+    """
+    Writes the parent template to the output file, and the shards templates in the same directory.
+    """
+    sharded = stack.get_sharded_template(
+        args.shard_max_resources,
+        args.shard_max_bytes,
+        args.shards_count,
+        args.format,
+        args.shard_template_url_prefix,
+    )
+    output_dir = os.path.dirname(os.path.abspath(args.output_file))
+    report = None
+    for shard_title, shard_template in sharded.shards.items():
+        if args.compact:
+            shard_report = compact_template(shard_template)
+            report = shard_report if report is None else report + shard_report
+        shard_json = dump_template(shard_template, minified=args.compact)
+        with open(
+            os.path.join(output_dir, get_shard_file_name(shard_title, args.format)),
+            "w",
+        ) as shard_fd:
+            shard_fd.write(to_yaml(shard_json) if args.format == "yaml" else shard_json)
+    with open(args.output_file, "w") as output_fd:
+        if args.format == "yaml":
+            output_fd.write(sharded.parent.to_yaml())
+        else:
+            output_fd.write(
+                dump_template(sharded.parent.to_dict(), minified=args.compact)
+            )
+    print(f"Rendered {len(sharded.shards)} nested stacks templates in {output_dir}")
+    if report:
+        print(report, file=sys.stderr)
+
+
+def write_compact_template(stack: KafkaStack, output_file: str):
+    """Writes the compacted and minified JSON template, and reports the bytes saved per category"""
+    template = stack.template.to_dict()
+    report = compact_template(template)
+    if output_file:
+        with open(output_file, "w") as output_fd:
+            output_fd.write(dump_template(template, minified=True))
+    else:
+        print(dump_template(template, minified=True))
+    print(report, file=sys.stderr)
+
+
+def check_schemas(stack: KafkaStack, previous_versions: dict | None) -> bool:
+    """
+    Checks the compatibility of the rendered schemas with their previous versions, if any given.
+    The rendered definitions are read from the stack, as they are not uploaded to S3 yet.
+
+    :param previous_versions: The previous definitions by subject, loaded before rendering and uploading,
+      as the previous template S3 objects can be overwritten by the upload when their keys are not content-addressed.
+    :return: Whether all the schemas are compatible
+    """
+    if not previous_versions:
+        return True
+    start = perf_counter()
+    results = check_schemas_compatibility(
+        get_template_schemas(
+            stack.template.to_dict(), s3_definitions=stack.s3_definitions
+        ),
+        previous_versions,
+    )
+    incompatible = [result for result in results if result.errors]
+    for result in incompatible:
+        print(
+            f"Schema {result.subject} is not {result.compatibility} compatible:",
+            file=sys.stderr,
+        )
+        for error in result.errors:
+            print(f"  {error}", file=sys.stderr)
+    print(
+        f"Checked {len(results)} schemas compatibility in {perf_counter() - start:.3f}s: "
+        f"{len(incompatible)} incompatible",
+        file=sys.stderr,
+    )
+    return not incompatible
+
+
+def write_output(stack: KafkaStack, args):
+    if args.shard:
+        write_sharded_template(stack, args)
+    elif args.compact:
+        write_compact_template(stack, args.output_file)
+    else:
+        write_template(stack, args.output_file, args.format)
+
+
+def get_files_mtimes(files_paths: list[str]) -> dict[str, int]:
+    return {file_path: get_file_mtime(file_path) for file_path in files_paths}
+
+
+def render_output(stack: KafkaStack, args, previous_versions: dict | None) -> bool:
+    """
+    Renders the template, and only once the schemas are compatible, uploads the schemas definitions
+    and writes the template.
+
+    :return: Whether the template was written
+    """
+    stack.render_topics(
+        args.topic_sets_count,
+        args.wave_size,
+        args.schemas_wave_size,
+        upload_schemas=False,
+    )
+    stack.render_acls(args.acls_split_by)
+    if not check_schemas(stack, previous_versions):
+        return False
+    stack.schemas_uploader.upload()
+    write_output(stack, args)
+    return True
+
+
+def watch_files(stack: KafkaStack, args, previous_versions: dict | None):
+    """
+    Polls the definition files, and the schemas files they reference, and on change, reloads only the files
+    which changed, renders again only the topics which changed, and writes the template again.
+    """
+    definitions_paths = list(stack.files_paths)
+    if args.config_path:
+        definitions_paths.append(args.config_path)
+    mtimes = get_files_mtimes(definitions_paths + list(stack.schemas_files))
+    print(f"Watching {len(mtimes)} files for changes. Ctrl+C to stop.")
+    try:
+        while True:
+            sleep(args.watch_interval)
+            files_paths = definitions_paths + [
+                path for path in stack.schemas_files if path not in definitions_paths
+            ]
+            new_mtimes = get_files_mtimes(files_paths)
+            changed = [
+                path
+                for path in files_paths
+                if path in mtimes and new_mtimes[path] != mtimes[path]
+            ]
+            mtimes = new_mtimes
+            if not changed:
+                continue
+            start = perf_counter()
+            try:
+                stack.reload_files(changed)
+                if not render_output(stack, args, previous_versions):
+                    continue
+            except Exception as error:
+                print(f"Failed to render after changes in {changed}: {error}")
+                continue
+            print(f"Rendered {args.output_file} in {perf_counter() - start:.3f}s")
+    except KeyboardInterrupt:
+        return
 
 
 def main():
@@ -39,26 +226,180 @@ def main():
         default="json",
         choices=["json", "yaml"],
     )
+    parser.add_argument(
+        "--topic-sets-count",
+        dest="topic_sets_count",
+        type=int,
+        help="Group topics into N Custom::KafkaTopicSet resources, by hash of the topic name. Overrides Topics.TopicSetsCount",
+        default=None,
+    )
+    parser.add_argument(
+        "--wave-size",
+        dest="wave_size",
+        type=int,
+        help="Create or update at most N topics, or topics sets, resources at once. Overrides Topics.WaveSize",
+        default=None,
+    )
+    parser.add_argument(
+        "--schemas-wave-size",
+        dest="schemas_wave_size",
+        type=int,
+        help="Create or update at most N schemas resources at once. Overrides Schemas.WaveSize",
+        default=None,
+    )
+    parser.add_argument(
+        "--check-compatibility",
+        dest="previous_schemas",
+        help="Previously rendered template, or directory of exported schemas versions as <subject>/<version>.json, "
+        "to check the AVRO schemas compatibility against. Repeat for more versions, oldest first. "
+        "Nothing is uploaded or written if a schema is not compatible",
+        action="append",
+        default=[],
+    )
+    parser.add_argument(
+        "--acls-split-by",
+        dest="acls_split_by",
+        help="Render one ACL resource per principal, or per principal and resource name prefix. "
+        "Overrides ACLs.SplitBy",
+        default=None,
+        choices=["Principal", "PrincipalResourcePrefix"],
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        dest="jobs",
+        type=int,
+        help="Number of processes to load and validate the definition files with",
+        default=1,
+    )
+    parser.add_argument(
+        "--upload-workers",
+        dest="upload_workers",
+        type=int,
+        help="Number of threads to upload the schemas definitions to S3 with",
+        default=DEFAULT_UPLOAD_WORKERS,
+    )
+    parser.add_argument(
+        "--cache-dir",
+        dest="cache_dir",
+        help="Directory to cache the validated definition files in. Disabled if not set",
+        default=None,
+    )
+    parser.add_argument(
+        "--cache-max-size",
+        dest="cache_max_size",
+        type=int,
+        help="Maximum size of the cache directory, in MiB",
+        default=DEFAULT_CACHE_MAX_SIZE // (1024 * 1024),
+    )
+    parser.add_argument(
+        "--watch",
+        dest="watch",
+        action="store_true",
+        help="Watch the definition files and render the template again on change",
+    )
+    parser.add_argument(
+        "--watch-interval",
+        dest="watch_interval",
+        type=float,
+        help="Interval, in seconds, to check the definition files for changes",
+        default=0.5,
+    )
+    parser.add_argument(
+        "--stream",
+        dest="stream",
+        action="store_true",
+        help="Write the JSON template resources to the output file as they are rendered, using less memory",
+    )
+    parser.add_argument(
+        "--compact",
+        dest="compact",
+        action="store_true",
+        help="Reference the shared connection values with parameters, set the settings common to the topics "
+        "of a set as its DefaultSettings, and minify the JSON template",
+    )
+    parser.add_argument(
+        "--shard",
+        dest="shard",
+        action="store_true",
+        help="Split the resources into nested stacks. Writes the parent template to the output file, "
+        "and the nested stacks templates in the same directory",
+    )
+    parser.add_argument(
+        "--shard-max-resources",
+        dest="shard_max_resources",
+        type=int,
+        help="Maximum number of resources per nested stack",
+        default=DEFAULT_SHARD_MAX_RESOURCES,
+    )
+    parser.add_argument(
+        "--shard-max-bytes",
+        dest="shard_max_bytes",
+        type=int,
+        help="Maximum size, in bytes, of a nested stack template",
+        default=DEFAULT_SHARD_MAX_BYTES,
+    )
+    parser.add_argument(
+        "--shards-count",
+        dest="shards_count",
+        type=int,
+        help="Fixed number of nested stacks for the topics, and for the ACLs. Computed from the limits if not set. "
+        "Required when resources have the Delete DeletionPolicy. Changing it moves resources between nested stacks",
+        default=None,
+    )
+    parser.add_argument(
+        "--shard-template-url-prefix",
+        dest="shard_template_url_prefix",
+        help="Prefix of the nested stacks TemplateURL, i.e. https://bucket.s3.amazonaws.com/path/. "
+        "Defaults to the files names, to upload with aws cloudformation package",
+        default="",
+    )
     parser.add_argument("_", nargs="*")
     args = parser.parse_args()
+    if args.watch and not args.output_file:
+        parser.error("--watch requires --output-file")
+    if args.stream and (not args.output_file or args.format != "json" or args.watch):
+        parser.error("--stream requires --output-file, the json format, and no --watch")
+    if args.compact and (args.format != "json" or args.stream):
+        parser.error("--compact requires the json format, and no --stream")
+    if args.shard and (not args.output_file or args.stream):
+        parser.error("--shard requires --output-file, and no --stream")
+    if args.stream and args.previous_schemas:
+        parser.error("--check-compatibility cannot be used with --stream")
+    if args.shard and (args.wave_size or args.schemas_wave_size):
+        parser.error("--shard cannot be used with --wave-size or --schemas-wave-size")
 
-    stack = KafkaStack(args.files_paths, args.config_path)
-    stack.render_topics()
-    stack.render_acls()
-    if args.output_file:
+    previous_versions = (
+        load_previous_versions(args.previous_schemas) if args.previous_schemas else None
+    )
+    cache = (
+        DefinitionsCache(args.cache_dir, args.cache_max_size * 1024 * 1024)
+        if args.cache_dir
+        else None
+    )
+    stack = KafkaStack(
+        args.files_paths,
+        args.config_path,
+        jobs=args.jobs,
+        cache=cache,
+        upload_workers=args.upload_workers,
+    )
+    if args.shard:
+        stack.enable_sharding()
+    if args.stream:
         with open(args.output_file, "w") as output_fd:
-            if args.format == "yaml":
-                output_fd.write(stack.template.to_yaml())
-            else:
-                output_fd.write(stack.template.to_json())
-    else:
-        if args.format == "yaml":
-            print(stack.template.to_yaml())
-        else:
-            try:
-                print(stack.template.to_json())
-            except TypeError:
-                pprint.pprint(stack.template.to_dict())
+            stack.stream_template(
+                output_fd,
+                args.topic_sets_count,
+                args.acls_split_by,
+                args.wave_size,
+                args.schemas_wave_size,
+            )
+        return 0
+    if not render_output(stack, args, previous_versions):
+        return 1
+    if args.watch:
+        watch_files(stack, args, previous_versions)
     return 0
 
 
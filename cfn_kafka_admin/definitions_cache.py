@@ -0,0 +1,116 @@
+#  SPDX-License-Identifier: MPL-2.0
+#  Copyright 2020-2024 John Mille <john@compose-x.io>
+
+"""
+On-disk cache of the validated definition files content.
+
+Entries are keyed by the file content hash, the model schema version and the package version, so that
+editing a file, the specs or upgrading the package never returns a stale entry.
+Entries are stored as zlib-compressed pickles, and evicted least recently used first once the cache
+is over its maximum size. Only point the cache to a directory you trust, as the entries are unpickled.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import pickle
+import zlib
+from functools import lru_cache
+from pathlib import Path
+from tempfile import NamedTemporaryFile
+
+from cfn_kafka_admin import __version__
+
+SPECS_DIR = Path(__file__).parent / "specs"
+MODELS_PATH = Path(__file__).parent / "models/admin.py"
+CACHE_ENTRY_SUFFIX = ".bin"
+# Increment when the validated content structure changes
+CACHE_FORMAT_VERSION = "2"
+DEFAULT_CACHE_MAX_SIZE = 256 * 1024 * 1024
+
+
+@lru_cache
+def get_schema_version() -> str:
+    """
+    The model schema version, from the hash of all the JSON schema files, including the $ref'd ones,
+    and of the models generated from these.
+    """
+    schema_hash = hashlib.sha256()
+    for file_path in sorted(SPECS_DIR.glob("*.json")) + [MODELS_PATH]:
+        schema_hash.update(file_path.name.encode("utf-8") + b"\0")
+        schema_hash.update(file_path.read_bytes() + b"\0")
+    return schema_hash.hexdigest()
+
+
+class DefinitionsCache:
+    """
+    Cache directory for the validated definition files content. Picklable, so it can be used
+    in the worker processes which load the files.
+    """
+
+    def __init__(self, cache_dir: str, max_size: int = DEFAULT_CACHE_MAX_SIZE):
+        self.cache_dir = Path(cache_dir)
+        self.max_size = max_size
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def get_key(file_content: str) -> str:
+        return hashlib.sha256(
+            "\0".join(
+                (CACHE_FORMAT_VERSION, __version__, get_schema_version(), file_content)
+            ).encode("utf-8")
+        ).hexdigest()
+
+    def get_entry_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}{CACHE_ENTRY_SUFFIX}"
+
+    def get(self, key: str) -> dict | None:
+        """Returns the cached content, None if not cached or if the entry cannot be read"""
+        entry_path = self.get_entry_path(key)
+        try:
+            content = pickle.loads(zlib.decompress(entry_path.read_bytes()))
+        except FileNotFoundError:
+            return None
+        except Exception as error:
+            print(f"Ignoring invalid cache entry {entry_path}: {error}")
+            return None
+        try:
+            os.utime(entry_path)
+        except OSError:
+            pass
+        return content
+
+    def set(self, key: str, content: dict) -> None:
+        """Writes the entry to a temporary file first, so that concurrent readers never see partial entries"""
+        with NamedTemporaryFile(
+            dir=self.cache_dir, prefix=".tmp-", delete=False
+        ) as entry_fd:
+            entry_fd.write(
+                zlib.compress(pickle.dumps(content, protocol=pickle.HIGHEST_PROTOCOL))
+            )
+        os.replace(entry_fd.name, self.get_entry_path(key))
+
+    def evict(self) -> int:
+        """
+        Removes the least recently used entries until the cache size is under max_size.
+
+        :return: The number of entries removed
+        """
+        entries: list = []
+        total_size: int = 0
+        for entry_path in self.cache_dir.glob(f"*{CACHE_ENTRY_SUFFIX}"):
+            try:
+                entry_stat = entry_path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((entry_stat.st_mtime, entry_stat.st_size, entry_path))
+            total_size += entry_stat.st_size
+        removed: int = 0
+        for _, entry_size, entry_path in sorted(entries, key=lambda _e: _e[0]):
+            if total_size <= self.max_size:
+                break
+            entry_path.unlink(missing_ok=True)
+            total_size -= entry_size
+            removed += 1
+        return removed
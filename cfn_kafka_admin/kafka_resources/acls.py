@@ -3,9 +3,13 @@
 """
 Module to handle Kafka topics management.
 """
+
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
+from concurrent.futures import FIRST_COMPLETED, wait
+from os import environ
+from time import monotonic
+from typing import TYPE_CHECKING, Callable, NamedTuple
 
 if TYPE_CHECKING:
     from confluent_kafka.admin import AdminClient
@@ -16,9 +20,18 @@ from confluent_kafka.admin import (
     AclBindingFilter,
     AclOperation,
     AclPermissionType,
+    ResourcePatternType,
+    ResourceType,
 )
 
-from cfn_kafka_admin.kafka_resources import get_admin_client
+from cfn_kafka_admin.common import setup_logging
+from cfn_kafka_admin.kafka_resources.client_pool import get_pooled_admin_client
+
+LOG = setup_logging(__name__)
+
+ACLS_CHUNK_SIZE = int(environ.get("ACLS_CHUNK_SIZE", 1000))
+ACLS_MAX_IN_FLIGHT = int(environ.get("ACLS_MAX_IN_FLIGHT", 4))
+ACLS_REQUEST_TIMEOUT = int(environ.get("ACLS_REQUEST_TIMEOUT_SECONDS", 60))
 
 
 def get_acls_admin_client(
@@ -30,12 +43,80 @@ def get_acls_admin_client(
         )
     else:
         resource_name = "unspecified"
-    admin_client: AdminClient = get_admin_client(
+    admin_client: AdminClient = get_pooled_admin_client(
         cluster_info, "ACLs", operation, resource_name
     )
     return admin_client
 
 
+class AclKey(NamedTuple):
+    """
+    Canonical, hashable representation of an ACL policy.
+    Defaults are applied and values normalized, so that equivalent policies have the same key regardless
+    of the keys order, missing Host or PatternType, or CLUSTER/BROKER resource type naming.
+    """
+
+    resource_type: str
+    resource: str
+    pattern_type: str
+    principal: str
+    host: str
+    action: str
+    effect: str
+
+    def as_policy(self) -> dict:
+        return {
+            "Resource": self.resource,
+            "PatternType": self.pattern_type,
+            "Principal": self.principal,
+            "ResourceType": self.resource_type,
+            "Action": self.action,
+            "Effect": self.effect,
+            "Host": self.host,
+        }
+
+
+class AclsDiff(NamedTuple):
+    """Result of the ACLs diff"""
+
+    add: set[AclKey]
+    remove: set[AclKey]
+    unchanged: set[AclKey]
+
+
+def acl_key_from_dict(policy: dict) -> AclKey:
+    """Builds the canonical key of the ACL policy"""
+    res_type: str = str(policy["ResourceType"]).upper()
+    if res_type == "CLUSTER":
+        res_type = "BROKER"
+    return AclKey(
+        resource_type=res_type,
+        resource=policy["Resource"],
+        pattern_type=str(policy.get("PatternType") or "LITERAL").upper(),
+        principal=policy["Principal"],
+        host=policy.get("Host") or "*",
+        action=str(policy["Action"]).upper(),
+        effect=str(policy["Effect"]).upper(),
+    )
+
+
+def diff_acls(new_policies: list[dict], old_policies: list[dict]) -> AclsDiff:
+    """
+    Hashed diff of the ACL policies, in linear time.
+
+    :param list[dict] new_policies:
+    :param list[dict] old_policies:
+    :return: The ACLs to add, to remove, and unchanged.
+    """
+    new_keys: set[AclKey] = {acl_key_from_dict(policy) for policy in new_policies or []}
+    old_keys: set[AclKey] = {acl_key_from_dict(policy) for policy in old_policies or []}
+    return AclsDiff(
+        add=new_keys - old_keys,
+        remove=old_keys - new_keys,
+        unchanged=new_keys & old_keys,
+    )
+
+
 def differentiate_old_new_acls(new_policies, old_policies):
     """
     Function to differentiate with ACLs are common and shall be kept, which ones are to be added and then removed.
@@ -45,88 +126,381 @@ def differentiate_old_new_acls(new_policies, old_policies):
     :return: the new acls and old acls
     :rtype: tuple
     """
-
-    common_policies = [d for d in new_policies if d in old_policies]
-    common_policies_set = set()
-    for policy in common_policies:
-        common_policies_set.add(tuple(policy.items()))
-    new_policies_set = set()
-    old_policies_set = set()
-    for policy in new_policies:
-        t_policy = tuple(policy.items())
-        if t_policy not in new_policies_set or t_policy in common_policies:
-            new_policies_set.add(t_policy)
-    for policy in old_policies:
-        t_policy = tuple(policy.items())
-        if (
-            t_policy not in old_policies_set
-            and t_policy not in common_policies
-            and t_policy not in new_policies_set
-        ):
-            old_policies_set.add(t_policy)
-    final_delete_acls = [dict(k) for k in old_policies_set]
-    final_new_acls = [dict(k) for k in new_policies_set]
+    acls_diff = diff_acls(new_policies, old_policies)
+    final_new_acls = [acl_key.as_policy() for acl_key in sorted(acls_diff.add)]
+    final_delete_acls = [acl_key.as_policy() for acl_key in sorted(acls_diff.remove)]
     return final_new_acls, final_delete_acls
 
 
 def set_binding_from_dict(policy: dict) -> AclBinding:
-    res_type: str = policy["ResourceType"]
-    if res_type == "CLUSTER":
-        res_type = "BROKER"
+    acl_key = acl_key_from_dict(policy)
     new_acl: AclBinding = AclBinding(
-        restype=res_type,
-        name=policy["Resource"],
-        principal=policy["Principal"],
-        host=policy["Host"] if "Host" in policy else "*",
-        operation=AclOperation[policy["Action"]],
-        permission_type=AclPermissionType[policy["Effect"]],
-        resource_pattern_type=policy["PatternType"],
+        restype=acl_key.resource_type,
+        name=acl_key.resource,
+        principal=acl_key.principal,
+        host=acl_key.host,
+        operation=AclOperation[acl_key.action],
+        permission_type=AclPermissionType[acl_key.effect],
+        resource_pattern_type=acl_key.pattern_type,
     )
     return new_acl
 
 
 def set_binding_filter_from_dict(policy: dict) -> AclBindingFilter:
+    acl_key = acl_key_from_dict(policy)
     acl_filter: AclBindingFilter = AclBindingFilter(
-        restype=policy["ResourceType"],
-        name=policy["Resource"],
-        principal=policy["Principal"],
-        host=policy["Host"] if "Host" in policy else "*",
-        operation=AclOperation[policy["Action"]],
-        permission_type=AclPermissionType[policy["Effect"]],
-        resource_pattern_type=policy["PatternType"],
+        restype=acl_key.resource_type,
+        name=acl_key.resource,
+        principal=acl_key.principal,
+        host=acl_key.host,
+        operation=AclOperation[acl_key.action],
+        permission_type=AclPermissionType[acl_key.effect],
+        resource_pattern_type=acl_key.pattern_type,
     )
     return acl_filter
 
 
-def create_new_acls(acls, cluster_info):
+class AclsReport:
+    """
+    Aggregated result of a chunked ACLs operation, per binding.
+    For CREATE, already_present are the bindings that were known to exist and not sent.
+    For DELETE, already_present are the filters which did not match any binding.
+    """
+
+    def __init__(self, operation: str):
+        self.operation = operation
+        self.succeeded: list[AclKey] = []
+        self.failed: dict[AclKey, Exception] = {}
+        self.already_present: list[AclKey] = []
+        self.futures: dict = {}
+
+    def __repr__(self):
+        return (
+            f"{self.operation} ACLs: {len(self.succeeded)} succeeded, {len(self.failed)} failed, "
+            f"{len(self.already_present)} already present"
+        )
+
+    def raise_for_failures(self):
+        if not self.failed:
+            return
+        errors = "; ".join(
+            f"{acl_key.principal} {acl_key.action} {acl_key.resource_type}:{acl_key.resource} - {error}"
+            for acl_key, error in list(self.failed.items())[:10]
+        )
+        raise AclsOperationFailed(f"{self} - {errors}", self)
+
+
+class AclsOperationFailed(Exception):
+    """Raised when at least one binding of a chunked ACLs operation failed"""
+
+    def __init__(self, message: str, report: AclsReport):
+        super().__init__(message)
+        self.report = report
+
+
+def wait_for_chunks(in_flight: list[dict], deadline: float) -> list[dict]:
+    """
+    Blocks until at least one of the in-flight requests futures completes, or the deadline expires.
+    On expiry, none of the requests is waited for anymore, and their pending futures are reported as failed.
+
+    :param list[dict] in_flight: The futures of each in-flight request
+    :param float deadline: The monotonic time at which to stop waiting
+    :return: The requests with futures still pending
+    """
+    pending = [
+        _future
+        for chunk in in_flight
+        for _future in chunk.values()
+        if not _future.done()
+    ]
+    if pending:
+        done, not_done = wait(
+            pending,
+            timeout=max(deadline - monotonic(), 0),
+            return_when=FIRST_COMPLETED,
+        )
+    pending_chunks: list[dict] = [
+        chunk
+        for chunk in in_flight
+        if not all(_future.done() for _future in chunk.values())
+    ]
+    if pending and not done:
+        LOG.error(
+            f"ACLs requests timed out. {len(not_done)} bindings not confirmed "
+            f"in {len(pending_chunks)} request(s)"
+        )
+        return []
+    return pending_chunks
+
+
+def run_chunked_acls_requests(
+    operation: Callable[[list], dict],
+    items: list,
+    chunk_size: int = ACLS_CHUNK_SIZE,
+    max_in_flight: int = ACLS_MAX_IN_FLIGHT,
+    timeout: int = ACLS_REQUEST_TIMEOUT,
+) -> dict:
+    """
+    Sends the items in chunks of chunk_size, with at most max_in_flight requests pending at once.
+    The timeout bounds the whole call: once expired, the remaining chunks are not sent.
+
+    :param operation: Admin client call taking the list of bindings/filters and returning the futures.
+    :param list items: The bindings or filters
+    :param int timeout: Maximum time, in seconds, to send all the requests and wait for their results
+    :return: The future of each item sent
+    """
+    deadline: float = monotonic() + timeout
+    futures: dict = {}
+    in_flight: list[dict] = []
+    for chunk_start in range(0, len(items), max(chunk_size, 1)):
+        while len(in_flight) >= max(max_in_flight, 1):
+            in_flight = wait_for_chunks(in_flight, deadline)
+        if monotonic() >= deadline:
+            LOG.error(
+                f"ACLs requests timed out. {len(items) - chunk_start} bindings not sent"
+            )
+            break
+        chunk_futures: dict = operation(items[chunk_start : chunk_start + chunk_size])
+        futures.update(chunk_futures)
+        in_flight.append(chunk_futures)
+    while in_flight:
+        in_flight = wait_for_chunks(in_flight, deadline)
+    return futures
+
+
+def get_future_error(_future: Future | None) -> Exception | None:
+    if _future is None:
+        return TimeoutError("The request was not sent in time")
+    if not _future.done():
+        return TimeoutError("The request did not complete in time")
+    return _future.exception()
+
+
+def create_acls_chunked(
+    acls: list[dict],
+    cluster_info: dict,
+    live_keys: set[AclKey] = None,
+    chunk_size: int = ACLS_CHUNK_SIZE,
+    max_in_flight: int = ACLS_MAX_IN_FLIGHT,
+    timeout: int = ACLS_REQUEST_TIMEOUT,
+) -> AclsReport:
+    """
+    Creates the ACLs in chunks, with bounded concurrency, and reports the result per binding.
+
+    :param list[dict] acls: The ACL policies
+    :param dict cluster_info:
+    :param set[AclKey] live_keys: ACLs known to exist. These are not sent again.
+    :return: The report of the ACLs creation
+    """
+    report = AclsReport("CREATE")
+    bindings: dict[AclBinding, AclKey] = {}
+    for acl_key in {
+        acl_key_from_dict(policy) for policy in acls if isinstance(policy, dict)
+    }:
+        if live_keys and acl_key in live_keys:
+            report.already_present.append(acl_key)
+        else:
+            bindings[set_binding_from_dict(acl_key.as_policy())] = acl_key
+    if not bindings:
+        return report
+    admin_client: AdminClient = get_acls_admin_client(acls, "CREATE", cluster_info)
+    report.futures = run_chunked_acls_requests(
+        admin_client.create_acls,
+        list(bindings.keys()),
+        chunk_size,
+        max_in_flight,
+        timeout,
+    )
+    for binding, acl_key in bindings.items():
+        error = get_future_error(report.futures.get(binding))
+        if error:
+            report.failed[acl_key] = error
+        else:
+            report.succeeded.append(acl_key)
+    LOG.info(report)
+    return report
+
+
+def delete_acls_chunked(
+    acls: list[dict],
+    cluster_info: dict,
+    chunk_size: int = ACLS_CHUNK_SIZE,
+    max_in_flight: int = ACLS_MAX_IN_FLIGHT,
+    timeout: int = ACLS_REQUEST_TIMEOUT,
+) -> AclsReport:
+    """
+    Deletes the ACLs in chunks, with bounded concurrency, and reports the result per binding.
+
+    :param list[dict] acls: The ACL policies
+    :param dict cluster_info:
+    :return: The report of the ACLs deletion
+    """
+    report = AclsReport("DELETE")
+    filters: dict[AclBindingFilter, AclKey] = {}
+    for acl_key in {acl_key_from_dict(policy) for policy in acls}:
+        filters[set_binding_filter_from_dict(acl_key.as_policy())] = acl_key
+    if not filters:
+        return report
+    admin_client: AdminClient = get_acls_admin_client(acls, "DELETE", cluster_info)
+    report.futures = run_chunked_acls_requests(
+        admin_client.delete_acls,
+        list(filters.keys()),
+        chunk_size,
+        max_in_flight,
+        timeout,
+    )
+    for _filter, acl_key in filters.items():
+        _future = report.futures.get(_filter)
+        error = get_future_error(_future)
+        if error:
+            report.failed[acl_key] = error
+        elif not _future.result():
+            report.already_present.append(acl_key)
+        else:
+            report.succeeded.append(acl_key)
+    LOG.info(report)
+    return report
+
+
+def create_new_acls(acls, cluster_info, live_keys: set[AclKey] = None) -> AclsReport:
     """
     Function to iterate over the given ACL policies and apply them
 
     :param list acls:
     :param cluster_info:
-    :return:
+    :param set[AclKey] live_keys: ACLs known to exist. These are not sent again.
+    :return: The report of the ACLs creation
+    :raises AclsOperationFailed: if any of the ACLs failed to be created
     """
-    admin_client: AdminClient = get_acls_admin_client(acls, "CREATE", cluster_info)
-    kafka_acls = []
-    for policy in acls:
-        if isinstance(policy, dict):
-            new_acl: AclBinding = set_binding_from_dict(policy)
-            kafka_acls.append(new_acl)
-    return_vals = admin_client.create_acls(kafka_acls)
-    for acl_binding, _future in return_vals.items():
-        if _future.exception():
-            raise _future.exception()
+    report = create_acls_chunked(acls, cluster_info, live_keys)
+    report.raise_for_failures()
+    return report
 
 
 def delete_acls(acls: list[dict], cluster_info: dict) -> dict[AclBindingFilter, Future]:
-    """Function to delete the ACLs."""
-    admin_client: AdminClient = get_acls_admin_client(acls, "DELETE", cluster_info)
-    policies = []
-    for policy in acls:
-        new_filter = set_binding_filter_from_dict(policy)
-        policies.append(new_filter)
-    deleted: dict[AclBindingFilter, Future] = admin_client.delete_acls(policies)
-    for _filter, _future in deleted.items():
-        while not _future.done():
-            pass
-    return deleted
+    """
+    Function to delete the ACLs.
+
+    :raises AclsOperationFailed: if any of the ACLs failed to be deleted
+    """
+    report = delete_acls_chunked(acls, cluster_info)
+    for acl_key, error in report.failed.items():
+        LOG.error(f"Failed to delete {acl_key}: {error}")
+    report.raise_for_failures()
+    return report.futures
+
+
+def acl_key_from_binding(binding: AclBinding) -> AclKey:
+    """Builds the canonical key of an ACL binding described from the cluster"""
+    return AclKey(
+        resource_type=binding.restype.name,
+        resource=binding.name,
+        pattern_type=binding.resource_pattern_type.name,
+        principal=binding.principal,
+        host=binding.host or "*",
+        action=binding.operation.name,
+        effect=binding.permission_type.name,
+    )
+
+
+def set_shard_filter(acl_key: AclKey, shard_by: str) -> AclBindingFilter:
+    """
+    Filter matching all the bindings of the principal, or all the bindings of the resource pattern.
+    """
+    if shard_by == "resource":
+        return AclBindingFilter(
+            restype=acl_key.resource_type,
+            name=acl_key.resource,
+            resource_pattern_type=acl_key.pattern_type,
+            principal=None,
+            host=None,
+            operation=AclOperation.ANY,
+            permission_type=AclPermissionType.ANY,
+        )
+    return AclBindingFilter(
+        restype=ResourceType.ANY,
+        name=None,
+        resource_pattern_type=ResourcePatternType.ANY,
+        principal=acl_key.principal,
+        host=None,
+        operation=AclOperation.ANY,
+        permission_type=AclPermissionType.ANY,
+    )
+
+
+def describe_live_acls(
+    admin_client: AdminClient, acl_keys: set[AclKey], shard_by: str = "principal"
+) -> set[AclKey]:
+    """
+    Describes the ACLs currently set in the cluster, with one DescribeAcls filter per shard.
+
+    :param AdminClient admin_client:
+    :param set[AclKey] acl_keys: The ACLs to identify the shards from
+    :param str shard_by: principal or resource
+    :return: The live ACLs of all the shards
+    """
+    shards_filters: dict[tuple, AclBindingFilter] = {}
+    for acl_key in acl_keys:
+        shard = (
+            (acl_key.resource_type, acl_key.resource, acl_key.pattern_type)
+            if shard_by == "resource"
+            else (acl_key.principal,)
+        )
+        if shard not in shards_filters:
+            shards_filters[shard] = set_shard_filter(acl_key, shard_by)
+    futures: list[Future] = [
+        admin_client.describe_acls(_filter) for _filter in shards_filters.values()
+    ]
+    live_keys: set[AclKey] = set()
+    for _future in futures:
+        live_keys.update(acl_key_from_binding(binding) for binding in _future.result())
+    return live_keys
+
+
+def reconcile_acls(
+    new_policies: list[dict],
+    old_policies: list[dict],
+    cluster_info: dict,
+    shard_by: str = "principal",
+    prune_unmanaged: bool = False,
+) -> AclsDiff:
+    """
+    Compares the desired ACLs to the live ones in the cluster, and only creates/deletes the actual delta.
+    Without prune_unmanaged, only the live ACLs that were previously managed (old policies) get deleted,
+    so the ACLs set outside of this resource for the same principals are left untouched.
+
+    :param list[dict] new_policies: The desired ACLs
+    :param list[dict] old_policies: The ACLs previously managed
+    :param dict cluster_info:
+    :param str shard_by: Whether to describe the ACLs per principal or per resource.
+    :param bool prune_unmanaged: Delete all live ACLs of the shards that are not desired.
+    :return: The ACLs created, deleted and unchanged
+    :raises AclsOperationFailed: if any of the ACLs failed to be deleted or created
+    """
+    desired_keys: set[AclKey] = {acl_key_from_dict(policy) for policy in new_policies}
+    managed_keys: set[AclKey] = {
+        acl_key_from_dict(policy) for policy in old_policies or []
+    }
+    admin_client: AdminClient = get_acls_admin_client(
+        new_policies or old_policies, "RECONCILE", cluster_info
+    )
+    live_keys = describe_live_acls(admin_client, desired_keys | managed_keys, shard_by)
+    to_add = desired_keys - live_keys
+    to_remove = live_keys - desired_keys
+    if not prune_unmanaged:
+        to_remove &= managed_keys
+    acls_diff = AclsDiff(
+        add=to_add, remove=to_remove, unchanged=desired_keys & live_keys
+    )
+    if acls_diff.remove:
+        delete_acls_chunked(
+            [acl_key.as_policy() for acl_key in sorted(acls_diff.remove)],
+            cluster_info,
+        ).raise_for_failures()
+    if acls_diff.add:
+        create_new_acls(
+            [acl_key.as_policy() for acl_key in sorted(desired_keys)],
+            cluster_info,
+            live_keys,
+        )
+    return acls_diff
@@ -0,0 +1,215 @@
+#  SPDX-License-Identifier: MPL-2.0
+#  Copyright 2020-2024 John Mille <john@compose-x.io>
+
+"""
+Module-level pool of AdminClient, kept across warm Lambda invocations.
+
+Building a new AdminClient means new TCP/TLS/SASL handshakes and a bootstrap metadata fetch.
+Pooled clients are keyed by a hash of the redacted cluster config, health-checked on reuse when
+they have been idle for a while, and evicted (and closed) once idle for longer than the TTL.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from time import monotonic
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from confluent_kafka.admin import AdminClient
+
+from cfn_kafka_admin.common import setup_logging
+from cfn_kafka_admin.kafka_resources import get_admin_client
+
+LOG = setup_logging(__name__)
+
+ADMIN_CLIENT_POOL_TTL = int(os.environ.get("ADMIN_CLIENT_POOL_TTL_SECONDS", 600))
+ADMIN_CLIENT_HEALTH_CHECK_AFTER = int(
+    os.environ.get("ADMIN_CLIENT_HEALTH_CHECK_AFTER_SECONDS", 30)
+)
+ADMIN_CLIENT_HEALTH_CHECK_TIMEOUT = int(
+    os.environ.get("ADMIN_CLIENT_HEALTH_CHECK_TIMEOUT_SECONDS", 10)
+)
+SECRET_KEYS_MARKERS: tuple = ("password", "secret", "token", "key")
+POOL_IGNORED_KEYS: tuple = ("client.id",)
+
+
+def redact_cluster_config(cluster_info: dict) -> dict:
+    """
+    Returns a copy of the cluster config where the secret values are replaced with their sha256 digest.
+    The client.id is removed as it only identifies the operation, not the connection.
+    """
+    redacted: dict = {}
+    for key, value in cluster_info.items():
+        if key in POOL_IGNORED_KEYS:
+            continue
+        if isinstance(value, str) and any(
+            marker in key.lower() for marker in SECRET_KEYS_MARKERS
+        ):
+            value = hashlib.sha256(value.encode("utf-8")).hexdigest()
+        redacted[key] = value
+    return redacted
+
+
+def cluster_config_key(cluster_info: dict) -> str:
+    """Hash of the redacted cluster config, used as the pool key"""
+    return hashlib.sha256(
+        json.dumps(
+            redact_cluster_config(cluster_info), sort_keys=True, default=str
+        ).encode("utf-8")
+    ).hexdigest()
+
+
+class PooledAdminClient:
+    """
+    Wrapper around an AdminClient to track when it was last used.
+    """
+
+    def __init__(self, client: AdminClient, pool_key: str):
+        self.client = client
+        self.pool_key = pool_key
+        self.created_at = monotonic()
+        self.last_used = self.created_at
+
+    @property
+    def idle_for(self) -> float:
+        return monotonic() - self.last_used
+
+    def is_healthy(self, timeout: int = ADMIN_CLIENT_HEALTH_CHECK_TIMEOUT) -> bool:
+        """Uses DescribeCluster, which does not list all topics metadata, to validate the connection"""
+        try:
+            self.client.describe_cluster(request_timeout=timeout).result(
+                timeout=timeout
+            )
+            return True
+        except Exception as error:
+            LOG.warning(f"AdminClient {self.pool_key[:8]} failed health check")
+            LOG.exception(error)
+            return False
+
+    def close(self) -> None:
+        """
+        AdminClient does not always expose close(). Serves pending callbacks, and drops the reference
+        so that the librdkafka handle is destroyed.
+        """
+        _close = getattr(self.client, "close", None)
+        try:
+            if callable(_close):
+                _close()
+            else:
+                self.client.poll(0)
+        except Exception as error:
+            LOG.debug(f"AdminClient {self.pool_key[:8]} close error: {error}")
+        self.client = None
+
+
+class AdminClientPool:
+    """
+    Pool of AdminClient keyed by the redacted cluster config hash.
+    """
+
+    def __init__(
+        self,
+        ttl: int = ADMIN_CLIENT_POOL_TTL,
+        health_check_after: int = ADMIN_CLIENT_HEALTH_CHECK_AFTER,
+    ):
+        self.ttl = ttl
+        self.health_check_after = health_check_after
+        self.clients: dict[str, PooledAdminClient] = {}
+        self._lock = threading.Lock()
+
+    def evict(self, pool_key: str) -> None:
+        pooled = self.clients.pop(pool_key, None)
+        if pooled:
+            LOG.info(f"Evicting AdminClient {pool_key[:8]}")
+            pooled.close()
+
+    def evict_idle(self) -> None:
+        """Closes all the clients that have been idle for longer than the TTL"""
+        for pool_key, pooled in list(self.clients.items()):
+            if pooled.idle_for > self.ttl:
+                self.evict(pool_key)
+
+    def clear(self) -> None:
+        with self._lock:
+            for pool_key in list(self.clients.keys()):
+                self.evict(pool_key)
+
+    def get(
+        self,
+        cluster_info: dict,
+        resource: str,
+        operation: str,
+        resource_dest: str = None,
+    ) -> AdminClient:
+        """
+        Returns a healthy pooled client for the cluster, or creates and pools a new one.
+        The client.id of a new client does not include the resource name, as it is shared.
+        """
+        pool_key = cluster_config_key(cluster_info)
+        with self._lock:
+            self.evict_idle()
+            pooled = self.clients.get(pool_key)
+            if (
+                pooled
+                and pooled.idle_for > self.health_check_after
+                and not pooled.is_healthy()
+            ):
+                self.evict(pool_key)
+                pooled = None
+            if not pooled:
+                client_settings = dict(cluster_info)
+                if "client.id" not in cluster_info:
+                    client_settings["client.id"] = f"LAMBDA_{resource}_POOLED"
+                pooled = PooledAdminClient(
+                    get_admin_client(client_settings, resource, operation),
+                    pool_key,
+                )
+                self.clients[pool_key] = pooled
+                LOG.info(f"New pooled AdminClient {pool_key[:8]}")
+            else:
+                LOG.debug(
+                    f"Reusing AdminClient {pool_key[:8]} for {operation} {resource_dest}"
+                )
+            pooled.last_used = monotonic()
+            return pooled.client
+
+
+ADMIN_CLIENTS_POOL = AdminClientPool()
+
+
+def get_pooled_admin_client(
+    settings: dict, resource: str, operation: str, resource_dest: str = None
+) -> AdminClient:
+    """Same signature as get_admin_client, but returns a client from the module-level pool"""
+    return ADMIN_CLIENTS_POOL.get(settings, resource, operation, resource_dest)
+
+
+def preconnect_admin_client() -> AdminClient | None:
+    """
+    When ADMIN_CLIENT_PRECONNECT_CONFIG is set to a JSON librdkafka configuration, creates and pools the client
+    during the Lambda init phase, and fetches the cluster metadata to establish the connections.
+    The configuration must be the same as the one built from the resource properties to be reused.
+    """
+    preconnect_config = os.environ.get("ADMIN_CLIENT_PRECONNECT_CONFIG", None)
+    if not preconnect_config:
+        return None
+    try:
+        from aws_cfn_custom_resource_resolve_parser import handle
+
+        cluster_info: dict = json.loads(preconnect_config)
+        for key, value in cluster_info.items():
+            if isinstance(value, str) and value.find("resolve:secretsmanager") >= 0:
+                cluster_info[key] = handle(value)
+        client = get_pooled_admin_client(cluster_info, "INIT", "PRECONNECT")
+        client.describe_cluster(
+            request_timeout=ADMIN_CLIENT_HEALTH_CHECK_TIMEOUT
+        ).result(timeout=ADMIN_CLIENT_HEALTH_CHECK_TIMEOUT)
+        return client
+    except Exception as error:
+        LOG.error("Failed to pre-connect AdminClient during init. Moving on.")
+        LOG.exception(error)
+        return None
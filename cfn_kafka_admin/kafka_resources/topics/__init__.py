@@ -10,8 +10,10 @@ from __future__ import annotations
 import logging
 from os import environ
 from random import randint
+from time import sleep
+from typing import Callable
 
-from confluent_kafka import TopicCollection
+from confluent_kafka import KafkaError, KafkaException, TopicCollection
 from confluent_kafka.admin import ConfigResource, ResourceType
 
 from cfn_kafka_admin.common import KAFKA_LOG, setup_logging
@@ -35,6 +37,77 @@ def wait_for_result(result_container: dict) -> dict:
     return result_container
 
 
+def get_futures_errors(
+    futures: dict, ignore_codes: tuple = ()
+) -> dict[str, Exception | None]:
+    """
+    Waits on all the futures and maps the result back to the topic name.
+    Keys of the futures are either the topic name or the ConfigResource.
+
+    :param dict futures:
+    :param tuple ignore_codes: KafkaError codes to consider as a success
+    :return: The error, if any, for each topic
+    """
+    results: dict = {}
+    for key, _future in futures.items():
+        topic_name = key.name if isinstance(key, ConfigResource) else key
+        try:
+            _future.result()
+            results[topic_name] = None
+        except KafkaException as error:
+            if error.args and error.args[0].code() in ignore_codes:
+                results[topic_name] = None
+            else:
+                results[topic_name] = error
+        except Exception as error:
+            results[topic_name] = error
+    return results
+
+
+def is_retriable(error: Exception | None) -> bool:
+    return (
+        isinstance(error, KafkaException)
+        and bool(error.args)
+        and isinstance(error.args[0], KafkaError)
+        and error.args[0].retriable()
+    )
+
+
+def run_batched(
+    operation: Callable[[list], dict],
+    items: dict,
+    ignore_codes: tuple = (),
+    attempts: int = RETRY_ATTEMPTS,
+) -> dict[str, Exception | None]:
+    """
+    Sends all the items in one request, then re-sends only the ones which failed with a retriable error.
+
+    :param operation: Admin client call taking the list of items and returning the futures.
+    :param dict items: The request items, indexed by topic name
+    :param tuple ignore_codes: KafkaError codes to consider as a success
+    :param int attempts: Maximum number of requests to send
+    :return: The error, if any, for each topic
+    """
+    results: dict = {}
+    pending: dict = dict(items)
+    for attempt in range(1, attempts + 1):
+        if not pending:
+            break
+        errors = get_futures_errors(operation(list(pending.values())), ignore_codes)
+        results.update(errors)
+        pending = {
+            name: pending[name]
+            for name, error in errors.items()
+            if is_retriable(error) and name in pending
+        }
+        if pending and attempt < attempts:
+            LOG.warning(
+                f"Attempt {attempt}/{attempts} - retrying {len(pending)} topic(s): {list(pending.keys())}"
+            )
+            sleep(RETRY_JITTER)
+    return results
+
+
 def describe_topic_configs(admin_client, topic_name, result_only: bool = False) -> dict:
     """
     Function to describe a topic
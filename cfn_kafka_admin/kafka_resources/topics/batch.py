@@ -0,0 +1,168 @@
+# SPDX-License-Identifier: MPL-2.0
+# Copyright 2021-2024 John Mille<john@ews-network.net>
+
+"""
+Batched topics operations, sending one request for N topics, and mapping the results back per topic.
+Only the topics that failed with a retriable error are sent again.
+"""
+
+from __future__ import annotations
+
+from os import environ
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from confluent_kafka.admin import AdminClient
+
+from confluent_kafka import KafkaError, KafkaException, TopicCollection
+from confluent_kafka.admin import ConfigResource, ResourceType
+from confluent_kafka.cimpl import NewPartitions, NewTopic
+
+from cfn_kafka_admin.kafka_resources.client_pool import get_pooled_admin_client
+from cfn_kafka_admin.kafka_resources.topics import LOG, run_batched
+from cfn_kafka_admin.kafka_resources.topics.update import (
+    alter_topics_configs,
+    get_topic_config_changes,
+)
+
+
+def create_kafka_topics(
+    topics: list[dict], cluster_info: dict, existing_topics: set[str] = None
+) -> dict[str, Exception | None]:
+    """
+    Creates all the topics with a single CreateTopics request.
+    Unless FAIL_IF_ALREADY_EXISTS is set, the topics which already exist are not reported as errors.
+
+    :param list[dict] topics: Topics definitions, with Name, PartitionsCount, ReplicationFactor and Settings
+    :param dict cluster_info:
+    :param set[str] existing_topics: When set, filled with the names of the topics which already existed.
+    :return: The error, if any, for each topic
+    """
+    admin_client: AdminClient = get_pooled_admin_client(
+        cluster_info, "TOPICS", "CREATE", "batch"
+    )
+    new_topics: dict[str, NewTopic] = {}
+    for topic in topics:
+        new_topics[topic["Name"]] = NewTopic(
+            topic["Name"],
+            topic["PartitionsCount"],
+            topic.get("ReplicationFactor") or 1,
+            config={
+                key: str(value) for key, value in (topic.get("Settings") or {}).items()
+            },
+        )
+    LOG.info(f"Creating {len(new_topics)} topic(s) in batch")
+    results = run_batched(
+        lambda _topics: admin_client.create_topics(_topics, validate_only=False),
+        new_topics,
+    )
+    if environ.get("FAIL_IF_ALREADY_EXISTS", None) is not None:
+        return results
+    for topic_name, error in results.items():
+        if (
+            isinstance(error, KafkaException)
+            and error.args
+            and error.args[0].code() == KafkaError.TOPIC_ALREADY_EXISTS
+        ):
+            results[topic_name] = None
+            if existing_topics is not None:
+                existing_topics.add(topic_name)
+    return results
+
+
+def update_kafka_topics(
+    topics: list[dict], cluster_info: dict, dry_run: bool = False
+) -> dict[str, Exception | None]:
+    """
+    Updates the topics configuration and partitions with a single request per operation.
+
+    :param list[dict] topics: Topics definitions, with Name, PartitionsCount and Settings
+    :param dict cluster_info:
+    :param bool dry_run: Only logs the changes, without any write to the cluster.
+    :return: The error, if any, for each topic
+    """
+    admin_client: AdminClient = get_pooled_admin_client(
+        cluster_info, "TOPICS", "UPDATE", "batch"
+    )
+    topics_index: dict[str, dict] = {topic["Name"]: topic for topic in topics}
+    results: dict[str, Exception | None] = {name: None for name in topics_index}
+
+    described_configs = admin_client.describe_configs(
+        [ConfigResource(ResourceType.TOPIC, name) for name in topics_index]
+    )
+    to_alter: dict[str, list] = {}
+    for config_resource, _future in described_configs.items():
+        try:
+            topic_configs = _future.result()
+        except Exception as error:
+            results[config_resource.name] = error
+            continue
+        changes = get_topic_config_changes(
+            config_resource.name,
+            topic_configs,
+            topics_index[config_resource.name].get("Settings"),
+        )
+        if changes:
+            to_alter[config_resource.name] = changes
+    if dry_run:
+        LOG.info(f"Dry run: configuration changes for {len(to_alter)} topic(s)")
+    elif to_alter:
+        LOG.info(f"Updating configuration of {len(to_alter)} topic(s) in batch")
+        for topic_name, entries_errors in alter_topics_configs(
+            admin_client, to_alter
+        ).items():
+            results[topic_name] = ValueError(
+                "Failed to update "
+                + ", ".join(
+                    f"{name}: {error}" for name, error in entries_errors.items()
+                )
+            )
+
+    to_describe: list[str] = [name for name, error in results.items() if error is None]
+    if not to_describe:
+        return results
+    described_topics = admin_client.describe_topics(TopicCollection(to_describe))
+    to_partition: dict[str, NewPartitions] = {}
+    for topic_name, _future in described_topics.items():
+        try:
+            current_partitions = len(_future.result().partitions)
+        except Exception as error:
+            results[topic_name] = error
+            continue
+        partitions = topics_index[topic_name]["PartitionsCount"]
+        if partitions < current_partitions:
+            results[topic_name] = ValueError(
+                f"The number of partitions set {partitions} for topic "
+                f"{topic_name} is lower than current partitions count {current_partitions}"
+            )
+        elif partitions > current_partitions:
+            to_partition[topic_name] = NewPartitions(topic_name, partitions)
+    if dry_run:
+        LOG.info(
+            f"Dry run: new partitions for {len(to_partition)} topic(s): {list(to_partition.keys())}"
+        )
+    elif to_partition:
+        LOG.info(f"Creating new partitions for {len(to_partition)} topic(s) in batch")
+        results.update(run_batched(admin_client.create_partitions, to_partition))
+    return results
+
+
+def delete_kafka_topics(
+    topic_names: list[str], cluster_info: dict
+) -> dict[str, Exception | None]:
+    """
+    Deletes all the topics with a single DeleteTopics request. Topics that do not exist are ignored.
+
+    :param list[str] topic_names:
+    :param dict cluster_info:
+    :return: The error, if any, for each topic
+    """
+    admin_client: AdminClient = get_pooled_admin_client(
+        cluster_info, "TOPICS", "DELETE", "batch"
+    )
+    LOG.info(f"Deleting {len(topic_names)} topic(s) in batch")
+    return run_batched(
+        admin_client.delete_topics,
+        {name: name for name in topic_names},
+        (KafkaError.UNKNOWN_TOPIC_OR_PART,),
+    )
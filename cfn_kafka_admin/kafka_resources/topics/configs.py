@@ -0,0 +1,227 @@
+# SPDX-License-Identifier: MPL-2.0
+# Copyright 2021-2024 John Mille<john@ews-network.net>
+
+"""
+Topic configuration diff engine.
+
+Values are normalized per Kafka config type before comparison (booleans, numbers, lists), so that values which
+are equal for Kafka do not trigger an alter. Only the topic level overrides (DYNAMIC_TOPIC_CONFIG) are deleted
+when not in the desired settings: values inherited from the brokers configuration are left untouched.
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, NamedTuple
+
+if TYPE_CHECKING:
+    from confluent_kafka.admin import ConfigEntry
+
+from confluent_kafka.admin import ConfigSource
+
+from cfn_kafka_admin.kafka_resources.topics import LOG
+
+BOOLEAN = "boolean"
+INT = "int"
+LONG = "long"
+DOUBLE = "double"
+LIST = "list"
+STRING = "string"
+
+TOPIC_CONFIG_TYPES: dict[str, str] = {
+    "cleanup.policy": LIST,
+    "compression.type": STRING,
+    "compression.gzip.level": INT,
+    "compression.lz4.level": INT,
+    "compression.zstd.level": INT,
+    "confluent.key.schema.validation": BOOLEAN,
+    "confluent.value.schema.validation": BOOLEAN,
+    "confluent.tier.enable": BOOLEAN,
+    "delete.retention.ms": LONG,
+    "file.delete.delay.ms": LONG,
+    "flush.messages": LONG,
+    "flush.ms": LONG,
+    "follower.replication.throttled.replicas": LIST,
+    "index.interval.bytes": INT,
+    "leader.replication.throttled.replicas": LIST,
+    "local.retention.bytes": LONG,
+    "local.retention.ms": LONG,
+    "max.compaction.lag.ms": LONG,
+    "max.message.bytes": INT,
+    "message.downconversion.enable": BOOLEAN,
+    "message.format.version": STRING,
+    "message.timestamp.after.max.ms": LONG,
+    "message.timestamp.before.max.ms": LONG,
+    "message.timestamp.difference.max.ms": LONG,
+    "message.timestamp.type": STRING,
+    "min.cleanable.dirty.ratio": DOUBLE,
+    "min.compaction.lag.ms": LONG,
+    "min.insync.replicas": INT,
+    "preallocate": BOOLEAN,
+    "remote.storage.enable": BOOLEAN,
+    "retention.bytes": LONG,
+    "retention.ms": LONG,
+    "segment.bytes": INT,
+    "segment.index.bytes": INT,
+    "segment.jitter.ms": LONG,
+    "segment.ms": LONG,
+    "unclean.leader.election.enable": BOOLEAN,
+}
+
+
+class ConfigChange(NamedTuple):
+    """A SET or DELETE change of a topic config"""
+
+    name: str
+    operation: str
+    current_value: str | None
+    new_value: str | None
+    source: str
+
+    def __str__(self):
+        return f"{self.operation} {self.name}: {self.current_value} -> {self.new_value} ({self.source})"
+
+
+def normalize_number(value) -> str:
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    if isinstance(value, (int, float)):
+        return str(value)
+    value = str(value).strip()
+    try:
+        return str(int(value))
+    except ValueError:
+        pass
+    try:
+        float_value = float(value)
+        return str(int(float_value)) if float_value.is_integer() else str(float_value)
+    except ValueError:
+        return value
+
+
+def normalize_config_value(name: str, value) -> str | None:
+    """
+    Normalizes a desired or described topic config value into the string to compare.
+
+    :param str name: The config name, to identify its type
+    :param value: The value, from the settings or from the described ConfigEntry
+    """
+    if value is None:
+        return None
+    config_type = TOPIC_CONFIG_TYPES.get(name)
+    if isinstance(value, bool) or config_type == BOOLEAN:
+        return str(value).strip().lower()
+    if isinstance(value, (list, tuple)) or config_type == LIST:
+        items = value if isinstance(value, (list, tuple)) else str(value).split(",")
+        return ",".join(
+            sorted(str(item).strip() for item in items if str(item).strip())
+        )
+    if config_type == DOUBLE:
+        try:
+            return str(float(value))
+        except ValueError:
+            return str(value).strip()
+    if config_type in (INT, LONG) or isinstance(value, (int, float)):
+        return normalize_number(value)
+    return str(value).strip()
+
+
+def get_config_source(config_entry: ConfigEntry) -> str:
+    return getattr(config_entry.source, "name", str(config_entry.source))
+
+
+def get_inherited_value(config_entry: ConfigEntry) -> str | None:
+    """The value the topic gets when the topic level override is deleted, from the synonyms, if known"""
+    for synonym in (config_entry.synonyms or {}).values():
+        if getattr(synonym, "source", None) != ConfigSource.DYNAMIC_TOPIC_CONFIG:
+            return synonym.value
+    return None
+
+
+def diff_topic_configs(
+    topic_name: str, topic_configs: dict[str, ConfigEntry], settings: dict
+) -> list[ConfigChange]:
+    """
+    Compares the described topic configs to the desired settings, and returns the minimal changeset.
+
+    :param str topic_name:
+    :param dict topic_configs: The described topic configuration entries
+    :param dict settings: The desired topic settings
+    :return: The SET/DELETE changes to apply
+    """
+    if not settings:
+        settings = {}
+    changes: list[ConfigChange] = []
+    for setting_name, setting_value in settings.items():
+        desired_value = normalize_config_value(setting_name, setting_value)
+        config_entry = topic_configs.get(setting_name)
+        if config_entry is None:
+            changes.append(
+                ConfigChange(setting_name, "SET", None, desired_value, "UNKNOWN")
+            )
+            continue
+        if config_entry.is_read_only:
+            LOG.warning(f"{topic_name} - {setting_name} is read-only. Skipping")
+            continue
+        if (
+            not config_entry.is_sensitive
+            and normalize_config_value(setting_name, config_entry.value)
+            == desired_value
+        ):
+            continue
+        changes.append(
+            ConfigChange(
+                setting_name,
+                "SET",
+                config_entry.value,
+                desired_value,
+                get_config_source(config_entry),
+            )
+        )
+    for config_name, config_entry in topic_configs.items():
+        if config_name in settings or config_entry.is_read_only:
+            continue
+        if config_entry.source != ConfigSource.DYNAMIC_TOPIC_CONFIG:
+            continue
+        changes.append(
+            ConfigChange(
+                config_name,
+                "DELETE",
+                config_entry.value,
+                get_inherited_value(config_entry),
+                get_config_source(config_entry),
+            )
+        )
+    for change in changes:
+        LOG.info(f"{topic_name} - {change}")
+    return changes
+
+
+def canonical_topic_settings(settings: dict | None) -> dict[str, str | None]:
+    """Normalized settings, to compare two topic definitions regardless of the values types"""
+    return {
+        name: normalize_config_value(name, value)
+        for name, value in (settings or {}).items()
+    }
+
+
+def canonical_partitions_count(partitions) -> int | None:
+    if partitions is None:
+        return None
+    try:
+        return int(float(str(partitions)))
+    except ValueError:
+        return None
+
+
+def topic_definition_changed(old_topic: dict, new_topic: dict) -> bool:
+    """
+    Compares the PartitionsCount and Settings of two topic definitions, as sent by CloudFormation.
+    The old properties are not type-converted, so both are canonicalized first.
+    """
+    old_partitions = canonical_partitions_count(old_topic.get("PartitionsCount"))
+    new_partitions = canonical_partitions_count(new_topic.get("PartitionsCount"))
+    if old_partitions != new_partitions:
+        return True
+    return canonical_topic_settings(
+        old_topic.get("Settings")
+    ) != canonical_topic_settings(new_topic.get("Settings"))
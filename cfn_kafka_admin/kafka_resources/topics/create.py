@@ -10,7 +10,7 @@ from confluent_kafka.admin import ConfigResource, ResourceType
 from confluent_kafka.cimpl import NewTopic
 from retry import retry
 
-from cfn_kafka_admin.kafka_resources import get_admin_client
+from cfn_kafka_admin.kafka_resources.client_pool import get_pooled_admin_client
 from cfn_kafka_admin.kafka_resources.topics import (
     LOG,
     RETRY_ATTEMPTS,
@@ -48,7 +48,7 @@ def create_new_kafka_topic(
             topic_name, partitions, replication_factor, topic_config
         )
     )
-    admin_client = get_admin_client(cluster_info, "CREATE", topic_name)
+    admin_client = get_pooled_admin_client(cluster_info, "CREATE", topic_name)
 
     if topic_config:
         new_topic = NewTopic(
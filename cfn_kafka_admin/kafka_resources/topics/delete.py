@@ -9,7 +9,7 @@ from confluent_kafka import KafkaError, KafkaException
 from confluent_kafka.admin import ConfigResource, ResourceType
 from retry import retry
 
-from cfn_kafka_admin.kafka_resources import get_admin_client
+from cfn_kafka_admin.kafka_resources.client_pool import get_pooled_admin_client
 from cfn_kafka_admin.kafka_resources.topics import (
     LOG,
     RETRY_ATTEMPTS,
@@ -27,7 +27,7 @@ from cfn_kafka_admin.kafka_resources.topics import (
 )
 def delete_topic(topic_name: str, cluster_info: dict):
     """Function to delete kafka topic"""
-    admin_client = get_admin_client(cluster_info, "DELETE", topic_name)
+    admin_client = get_pooled_admin_client(cluster_info, "DELETE", topic_name)
     try:
         configs = describe_topic_configs(admin_client, topic_name, result_only=True)
         LOG.info(f"Deleting topic: {topic_name}")
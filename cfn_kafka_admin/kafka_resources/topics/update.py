@@ -3,6 +3,7 @@
 
 from __future__ import annotations
 
+from confluent_kafka import KafkaError, KafkaException
 from confluent_kafka.admin import (
     AlterConfigOpType,
     ConfigEntry,
@@ -11,13 +12,17 @@ from confluent_kafka.admin import (
 )
 from confluent_kafka.cimpl import NewPartitions
 
-from cfn_kafka_admin.kafka_resources import get_admin_client
+from cfn_kafka_admin.kafka_resources.client_pool import get_pooled_admin_client
 from cfn_kafka_admin.kafka_resources.topics import (
     LOG,
     describe_topic,
     describe_topic_configs,
+    run_batched,
     wait_for_result,
 )
+from cfn_kafka_admin.kafka_resources.topics.configs import diff_topic_configs
+
+ENTRY_ERROR_CODES = (KafkaError.INVALID_CONFIG, KafkaError.POLICY_VIOLATION)
 
 
 def update_topic_partitions(admin_client, topic_name: str, partitions: int) -> int:
@@ -50,11 +55,108 @@ def update_topic_partitions(admin_client, topic_name: str, partitions: int) -> i
         return topic_current_partitions
 
 
+def get_topic_config_changes(
+    topic_name: str, topic_configs: dict, settings: dict
+) -> list[ConfigEntry]:
+    """
+    Compares the topic current configuration to the desired settings, and returns the incremental
+    config entries to apply.
+
+    :param str topic_name:
+    :param dict topic_configs: The described topic configuration entries
+    :param dict settings: The desired topic settings
+    :return: The SET/DELETE config entries
+    """
+    return [
+        ConfigEntry(
+            change.name,
+            change.new_value if change.operation == "SET" else None,
+            incremental_operation=AlterConfigOpType[change.operation],
+        )
+        for change in diff_topic_configs(topic_name, topic_configs, settings)
+    ]
+
+
+def is_entry_error(error: Exception) -> bool:
+    """Whether the error can be caused by one of the config entries of the resource, rather than the request"""
+    return (
+        isinstance(error, KafkaException)
+        and bool(error.args)
+        and isinstance(error.args[0], KafkaError)
+        and error.args[0].code() in ENTRY_ERROR_CODES
+    )
+
+
+def alter_topics_configs(
+    admin_client, topics_changes: dict[str, list[ConfigEntry]]
+) -> dict[str, dict[str, Exception]]:
+    """
+    Sends all the SET/DELETE entries of all the topics in a single IncrementalAlterConfigs request,
+    with one ConfigResource per topic. Topics which failed with a retriable error are sent again.
+    The broker applies or rejects all the entries of a resource together, so for the topics rejected because of
+    an invalid entry, the entries are sent one by one, without retries, to apply the valid ones and report the error
+    of each invalid entry. For other errors, all the entries of the topic are reported as failed.
+
+    :param admin_client:
+    :param dict topics_changes: The config entries to apply, per topic name
+    :return: The errors per config entry name, per topic name
+    """
+    errors: dict[str, dict[str, Exception]] = {}
+    topics_changes = {
+        name: changes for name, changes in topics_changes.items() if changes
+    }
+    if not topics_changes:
+        return errors
+    results = run_batched(
+        admin_client.incremental_alter_configs,
+        {
+            topic_name: ConfigResource(
+                ResourceType.TOPIC, topic_name, incremental_configs=changes
+            )
+            for topic_name, changes in topics_changes.items()
+        },
+    )
+    for topic_name, error in results.items():
+        if error is None:
+            continue
+        if not is_entry_error(error):
+            LOG.error(f"Error updating topic {topic_name} properties: {error}")
+            errors[topic_name] = {
+                _incremental_config.name: error
+                for _incremental_config in topics_changes[topic_name]
+            }
+            continue
+        LOG.warning(
+            f"{topic_name} - Failed to update all properties at once: {error}. Updating one by one."
+        )
+        for _incremental_config in topics_changes[topic_name]:
+            entry_error = run_batched(
+                admin_client.incremental_alter_configs,
+                {
+                    topic_name: ConfigResource(
+                        ResourceType.TOPIC,
+                        topic_name,
+                        incremental_configs=[_incremental_config],
+                    )
+                },
+                attempts=1,
+            )[topic_name]
+            if entry_error is None:
+                continue
+            LOG.error(
+                f"Error updating topic {topic_name} property "
+                f"{_incremental_config.name}={_incremental_config.value}: {entry_error}"
+            )
+            errors.setdefault(topic_name, {})[_incremental_config.name] = entry_error
+    return errors
+
+
 def update_kafka_topic(
     topic_name: str,
     partitions: int,
     cluster_info: dict,
     settings: dict,
+    dry_run: bool = False,
 ):
     """
     Function to update existing Kafka topic
@@ -63,65 +165,34 @@ def update_kafka_topic(
     :param partitions:
     :param cluster_info:
     :param dict settings:
-    :return:
+    :param bool dry_run: Only logs the changes, without any write to the cluster.
+    :return: The partitions count and the topic configs
     """
-    topic_config_resource = ConfigResource(ResourceType.TOPIC, topic_name)
-    admin_client = get_admin_client(cluster_info, "UPDATE", topic_name)
+    admin_client = get_pooled_admin_client(cluster_info, "UPDATE", topic_name)
     topic_configs = describe_topic_configs(admin_client, topic_name, result_only=True)
-    incremental_configs: list = []
-    for config_name, config_value in topic_configs.items():
-        if config_value.is_default and config_name not in settings.keys():
-            LOG.debug(
-                f"{topic_name} - {config_name} value is default ({config_value.value}) and "
-                f"{config_name} not in settings {settings.keys()}"
-            )
-            continue
-        elif not config_value.is_default and config_name not in settings.keys():
-            LOG.info(
-                f"{topic_name} - {config_name} value is not default ({config_value.value}) and "
-                f"{config_name} not in settings {settings.keys()}. Resetting to default value"
-            )
-            default_entry = ConfigEntry(
-                config_name,
-                None,
-                incremental_operation=AlterConfigOpType["DELETE"],
-            )
-            incremental_configs.append(default_entry)
-            continue
-        for setting_name, setting_value in settings.items():
-            if not setting_name == config_name:
-                continue
-            if str(setting_value) != config_value.value:
-                LOG.info(
-                    f"Value for {setting_name} is different(current->new): {config_value}->{setting_value}"
-                )
-                new_config = ConfigEntry(
-                    config_name,
-                    str(setting_value),
-                    incremental_operation=AlterConfigOpType["SET"],
-                )
-                incremental_configs.append(new_config)
-    for _incremental_config in incremental_configs:
-        try:
-            wait_for_result(
-                admin_client.incremental_alter_configs(
-                    [
-                        ConfigResource(
-                            ResourceType.TOPIC,
-                            topic_name,
-                            incremental_configs=[_incremental_config],
-                        )
-                    ]
-                )
-            )
-        except Exception as error:
-            LOG.error(
-                f"Error updating topic {topic_name} property {_incremental_config.name}={_incremental_config.value}: {error}"
-            )
-            LOG.exception(error)
-    partitions = update_topic_partitions(admin_client, topic_name, partitions)
+    incremental_configs = get_topic_config_changes(topic_name, topic_configs, settings)
+    if dry_run:
+        current_partitions = len(
+            describe_topic(admin_client, topic_name, result_only=True).partitions
+        )
+        LOG.info(
+            f"{topic_name} - Dry run: {len(incremental_configs)} config change(s), "
+            f"partitions {current_partitions} -> {partitions}"
+        )
+        return current_partitions, topic_configs
+    entries_errors = alter_topics_configs(
+        admin_client, {topic_name: incremental_configs}
+    ).get(topic_name)
+    if entries_errors:
+        raise ValueError(
+            f"Failed to update topic {topic_name}: "
+            + ", ".join(f"{name}: {error}" for name, error in entries_errors.items())
+        )
+    new_partitions = update_topic_partitions(admin_client, topic_name, partitions)
+    if not incremental_configs:
+        return new_partitions, topic_configs
     new_topic_configs = describe_topic_configs(
         admin_client, topic_name, result_only=True
     )
     LOG.debug(new_topic_configs)
-    return partitions, new_topic_configs
+    return new_partitions, new_topic_configs
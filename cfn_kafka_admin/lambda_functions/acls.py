@@ -1,27 +1,76 @@
 # SPDX-License-Identifier: MPL-2.0
 # Copyright 2021-2024 John Mille<john@ews-network.net>
 
-"""Main module."""
+"""
+Custom resource to manage Kafka ACLs.
+
+When deleted, an ACLs resource only deletes the policies which are not declared by another ACLs resource of the stack,
+i.e. when the policies moved to another resource after changing ACLs.SplitBy. The current stack template is read
+with cloudformation:GetTemplate, and the policies are retained if it cannot be read.
+"""
 
 from __future__ import annotations
 
 import uuid
+from os import environ
 
 from cfn_resource_provider import ResourceProvider
-from compose_x_common.compose_x_common import keyisset, keypresent
+from compose_x_common.compose_x_common import keypresent
 
 from cfn_kafka_admin.common import setup_logging
 from cfn_kafka_admin.kafka_resources.acls import (
+    AclKey,
+    acl_key_from_dict,
     create_new_acls,
     delete_acls,
     differentiate_old_new_acls,
+    reconcile_acls,
 )
+from cfn_kafka_admin.kafka_resources.client_pool import preconnect_admin_client
 from cfn_kafka_admin.models.admin import EwsKafkaAcl
 
-from .utils import set_client_info
+from .utils import get_stack_template, set_client_info
 
 LOG = setup_logging()
 
+preconnect_admin_client()
+
+ACLS_RECONCILE_MODE = environ.get("ACLS_RECONCILE_MODE", "disabled").lower()
+ACLS_RECONCILE_PRUNE = environ.get("ACLS_RECONCILE_PRUNE", None) is not None
+ACL_RESOURCE_TYPES = ("Custom::KafkaACL", "EWS::Kafka::ACL")
+
+
+def resolve_policy_resource(policy: dict, resources: dict) -> dict | None:
+    """The policy, with the topic name of Fn::GetAtt [topic, Name] as Resource. None if it cannot be resolved"""
+    resource = policy.get("Resource")
+    if isinstance(resource, dict) and "Fn::GetAtt" in resource:
+        get_att = resource["Fn::GetAtt"]
+        title, attribute = (
+            get_att.split(".", 1) if isinstance(get_att, str) else get_att
+        )
+        resource = (resources.get(title) or {}).get("Properties", {}).get(attribute)
+    if not isinstance(resource, str):
+        return None
+    return {**policy, "Resource": resource}
+
+
+def get_template_acls_keys(template: dict, exclude_title: str = None) -> set[AclKey]:
+    """The keys of the ACLs policies declared in the template resources, other than exclude_title"""
+    resources: dict = template.get("Resources") or {}
+    keys: set[AclKey] = set()
+    for title, resource in resources.items():
+        if (
+            title == exclude_title
+            or not isinstance(resource, dict)
+            or resource.get("Type") not in ACL_RESOURCE_TYPES
+        ):
+            continue
+        for policy in (resource.get("Properties") or {}).get("Policies") or []:
+            policy = resolve_policy_resource(policy, resources)
+            if policy:
+                keys.add(acl_key_from_dict(policy))
+    return keys
+
 
 class KafkaACL(ResourceProvider):
     def __init__(self):
@@ -66,31 +115,57 @@ class KafkaACL(ResourceProvider):
             self.physical_resource_id = "could-not-create"
             self.fail(f"Failed to create the ACLs. {str(error)}")
 
+    def reconcile(self):
+        """
+        Compares the live ACLs, described per principal or per resource, to the desired ACLs,
+        and only applies the actual delta.
+        """
+        try:
+            acls_diff = reconcile_acls(
+                self.get("Policies"),
+                self.get_old("Policies", []),
+                self.cluster_info,
+                shard_by=ACLS_RECONCILE_MODE,
+                prune_unmanaged=ACLS_RECONCILE_PRUNE,
+            )
+            LOG.info(
+                f"ACLs reconciled: {len(acls_diff.add)} created, {len(acls_diff.remove)} deleted, "
+                f"{len(acls_diff.unchanged)} unchanged"
+            )
+            self.success()
+        except Exception as error:
+            LOG.exception(error)
+            LOG.error("Failed to reconcile ACLs")
+            self.fail(str(error))
+
     def update(self):
         """
-        :return:
+        When ACLS_RECONCILE_MODE is set to principal or resource, reconciles with the live ACLs.
+        Otherwise, applies the difference between the old and new policies.
         """
         set_client_info(self)
-        old_policies = self.get_old("Policies")
-        for policy in old_policies:
-            if not keyisset("Host", policy):
-                policy.update({"Host": "*"})
+        if ACLS_RECONCILE_MODE in ("principal", "resource"):
+            self.reconcile()
+            return
+        old_policies = self.get_old("Policies", [])
         new_policies = self.get("Policies")
         new_acls, to_delete_acls = differentiate_old_new_acls(
             new_policies, old_policies
         )
-        LOG.info("ACLs deletion")
-        LOG.info(to_delete_acls)
-        LOG.info("ACLs set")
-        LOG.info(new_acls)
+        LOG.info(f"ACLs deletion: {len(to_delete_acls)}")
+        LOG.debug(to_delete_acls)
+        LOG.info(f"ACLs set: {len(new_acls)}")
+        LOG.debug(new_acls)
         try:
-            to_delete_acls(to_delete_acls, self.cluster_info)
+            if to_delete_acls:
+                delete_acls(to_delete_acls, self.cluster_info)
         except Exception as error:
             LOG.error("Failed to delete old ACLs - Moving on")
             LOG.error(error)
             LOG.error(to_delete_acls)
         try:
-            create_new_acls(new_acls, self.cluster_info)
+            if new_acls:
+                create_new_acls(new_acls, self.cluster_info)
             self.success()
             LOG.info("Successfully created new ACLs")
         except Exception as error:
@@ -98,19 +173,45 @@ class KafkaACL(ResourceProvider):
             LOG.error("Failed to create new ACLs")
             self.fail(str(error))
 
+    def get_undeclared_policies(self, policies: list[dict]) -> list[dict]:
+        """
+        The policies which are not declared by another ACLs resource of the stack, and can be deleted.
+        None of them if the stack template cannot be read.
+        """
+        try:
+            declared_keys = get_template_acls_keys(
+                get_stack_template(self.stack_id), self.logical_resource_id
+            )
+        except Exception as error:
+            LOG.exception(error)
+            LOG.warning("Could not read the stack template. Retaining the ACLs")
+            return []
+        undeclared = [
+            policy
+            for policy in policies
+            if acl_key_from_dict(policy) not in declared_keys
+        ]
+        if len(undeclared) < len(policies):
+            LOG.info(
+                f"{len(policies) - len(undeclared)} ACLs declared by other resources are retained"
+            )
+        return undeclared
+
     def delete(self):
         """
-        Method to delete the ACLs resource
-        :return:
+        Deletes the ACLs of the resource, but the ones declared by another ACLs resource of the stack.
         """
+        policies = self.get_undeclared_policies(self.get("Policies") or [])
+        if not policies:
+            self.success("No ACL to delete")
+            return
         set_client_info(self)
         try:
-            delete_acls(self.get("Policies"), self.cluster_info)
+            delete_acls(policies, self.cluster_info)
             self.success("ACLs deleted")
         except Exception as error:
-            self.fail(
-                f"Failed to delete topic {self.get_attribute('Name')}. {str(error)}"
-            )
+            LOG.exception(error)
+            self.fail(f"Failed to delete ACLs. {str(error)}")
 
 
 def lambda_handler(event, context):
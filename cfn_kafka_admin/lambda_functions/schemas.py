@@ -8,6 +8,7 @@ from __future__ import annotations
 import json
 import logging
 import re
+from typing import Callable
 
 from aws_cfn_custom_resource_resolve_parser import handle
 from boto3.session import Session
@@ -15,6 +16,16 @@ from cfn_resource_provider import ResourceProvider
 from kafka_schema_registry_admin.kafka_schema_registry_admin import SchemaRegistry
 
 from cfn_kafka_admin.models.admin import EwsKafkaSchema
+from cfn_kafka_admin.schema_registry import (
+    AUTH_EXCEPTIONS,
+    REGISTRY_CLIENTS,
+    SUBJECTS_CACHE,
+    CachedRegistry,
+    get_latest_subject_version,
+    get_schema_fingerprint,
+    register_subject_version,
+    registry_client_key,
+)
 
 LOG = logging.getLogger(__name__)
 LOG.setLevel(logging.INFO)
@@ -66,6 +77,9 @@ class KafkaSchema(ResourceProvider):
 
     def __init__(self):
         self.cluster_info = {}
+        self.registry_url = None
+        self.registry_key = None
+        self.new_registry_client = False
         super().__init__()
         self.request_schema = EwsKafkaSchema.schema()
 
@@ -83,6 +97,44 @@ class KafkaSchema(ResourceProvider):
             return self.get(param)
 
     def set_registry(self):
+        """
+        Returns the cached registry client for the registry URL and credentials properties,
+        or creates a new one, resolving the secrets.
+        """
+        self.registry_key = registry_client_key(
+            self.get("RegistryUrl"),
+            self.get("RegistryUserInfo"),
+            self.get("RegistryUsername"),
+            self.get("RegistryPassword"),
+        )
+        self.new_registry_client = False
+        cached = REGISTRY_CLIENTS.get(self.registry_key, self.new_registry)
+        self.registry_url = cached.registry_url
+        return cached.registry
+
+    def invalidate_registry(self, error: Exception):
+        """Drops the cached registry client when the registry rejected its credentials, i.e. rotated secrets"""
+        if self.registry_key and isinstance(error, AUTH_EXCEPTIONS):
+            LOG.warning("Registry credentials rejected. Dropping the cached client")
+            REGISTRY_CLIENTS.invalidate(self.registry_key)
+
+    def run_with_registry(self, operation: Callable[[SchemaRegistry], None]) -> None:
+        """
+        Runs the operation with the registry client. The cache key is computed before the secrets are resolved,
+        so a cached client keeps the credentials of rotated secrets. When the registry rejects the credentials
+        of a cached client, the operation is retried once with a new client, resolving the secrets again.
+        """
+        registry = self.set_registry()
+        try:
+            operation(registry)
+        except AUTH_EXCEPTIONS as error:
+            if self.new_registry_client:
+                raise
+            self.invalidate_registry(error)
+            LOG.warning("Retrying with a new registry client")
+            operation(self.set_registry())
+
+    def new_registry(self) -> CachedRegistry:
         if self.get("RegistryUserInfo"):
             user_info = self.try_replace_from_secret("RegistryUserInfo")
             username = user_info.split(":")[0]
@@ -91,66 +143,99 @@ class KafkaSchema(ResourceProvider):
             username = self.try_replace_from_secret("RegistryUsername")
             password = self.try_replace_from_secret("RegistryPassword")
         registry_url = self.try_replace_from_secret("RegistryUrl")
+        if self.status == "FAILED":
+            raise ValueError(self.reason)
         LOG.info(registry_url)
         registry = SchemaRegistry(
             registry_url,
             **{"basic_auth.username": username, "basic_auth.password": password},
         )
-        return registry
+        self.new_registry_client = True
+        return CachedRegistry(registry, registry_url)
+
+    def create_schema(self, registry: SchemaRegistry) -> None:
+        subject = self.get("Subject")
+        serializer = self.get("Serializer")
+        compatibility = self.get("CompatibilityMode")
+        schema_def = import_definition(self.get("Definition"))
+        latest = get_latest_subject_version(registry, self.registry_url, subject)
+        if latest and latest.fingerprint == get_schema_fingerprint(
+            schema_def, serializer
+        ):
+            LOG.info(f"{subject} latest version is already the same schema")
+            schema_id = latest.schema_id
+        else:
+            schema_id = register_subject_version(
+                registry, self.registry_url, subject, schema_def, serializer
+            )
+        if not latest or latest.compatibility != compatibility:
+            registry.put_compatibility_subject_config(
+                subject_name=subject, compatibility=compatibility
+            )
+            SUBJECTS_CACHE.set_compatibility(self.registry_url, subject, compatibility)
+        self.set_attribute("Id", schema_id)
+        self.physical_resource_id = subject
+        self.success("Schema version created")
 
     def create(self):
         """
         Creates a new Schema / Version in the Schema Registry
         """
         try:
-            registry = self.set_registry()
-            subject = self.get("Subject")
-            serializer = self.get("Serializer")
-            compatibility = self.get("CompatibilityMode")
-            schema_def = import_definition(self.get("Definition"))
-            schema = registry.post_subject_schema_version(
-                subject, schema_def, schema_type=serializer
-            )
-            registry.put_compatibility_subject_config(
-                subject_name=subject, compatibility=compatibility
-            )
-            self.set_attribute("Id", schema.json()["id"])
-            self.physical_resource_id = subject
-            self.success("Schema version created")
+            self.run_with_registry(self.create_schema)
         except Exception as error:
             LOG.exception(error)
+            self.invalidate_registry(error)
+            if self.registry_url:
+                SUBJECTS_CACHE.invalidate(self.registry_url, self.get("Subject"))
             self.physical_resource_id = "could-not-create"
             self.fail(str(error))
 
+    def update_schema(self, registry: SchemaRegistry) -> None:
+        subject = self.get("Subject")
+        serializer = self.get("Serializer")
+        schema_def = import_definition(self.get("Definition"))
+        latest = get_latest_subject_version(registry, self.registry_url, subject)
+        if latest and latest.fingerprint == get_schema_fingerprint(
+            schema_def, serializer
+        ):
+            self.set_attribute("Id", latest.schema_id)
+            self.success("Schema is already the latest version")
+            return
+        compatible = registry.post_compatibility_subject_versions(
+            subject_name=subject,
+            definition=schema_def,
+            schema_type=serializer,
+        ).json()["is_compatible"]
+        if not compatible:
+            print(schema_def)
+            self.fail(f"Schema for {subject} is not compatible with the latest version")
+            return
+        schema_id = register_subject_version(
+            registry, self.registry_url, subject, schema_def, serializer
+        )
+        self.set_attribute("Id", schema_id)
+        self.success("New schema version created")
+
     def update(self):
         """
         Updates the schema definition to create a new version. First, checks that the new definition is compatible.
         """
         try:
-            registry = self.set_registry()
-            subject = self.get("Subject")
-            serializer = self.get("Serializer")
-            schema_def = import_definition(self.get("Definition"))
-            compatible = registry.post_compatibility_subject_versions(
-                subject_name=subject,
-                definition=schema_def,
-                schema_type=serializer,
-            ).json()["is_compatible"]
-            if not compatible:
-                print(schema_def)
-                self.fail(
-                    f"Schema for {subject} is not compatible with the latest version"
-                )
-                return
-            schema = registry.post_subject_schema_version(
-                subject, schema_def, schema_type=serializer
-            )
-            self.set_attribute("Id", schema.json()["id"])
-            self.success("New schema version created")
+            self.run_with_registry(self.update_schema)
         except Exception as error:
             LOG.exception(error)
+            self.invalidate_registry(error)
+            if self.registry_url:
+                SUBJECTS_CACHE.invalidate(self.registry_url, self.get("Subject"))
             self.fail(str(error))
 
+    def delete_subject(self, registry: SchemaRegistry) -> None:
+        subject = self.get("Subject")
+        SUBJECTS_CACHE.invalidate(self.registry_url, subject)
+        registry.delete_subject(subject, permanent=False)
+        self.success("Schema successfully deleted")
+
     def delete(self):
         """
         Deletes the schema subject from the registry
@@ -166,11 +251,9 @@ class KafkaSchema(ResourceProvider):
             self.success("Deleting failed create resource. Nothing to do")
             return
         try:
-            registry = self.set_registry()
-            subject = self.get("Subject")
-            registry.delete_subject(subject, permanent=False)
-            self.success("Schema successfully deleted")
+            self.run_with_registry(self.delete_subject)
         except Exception as error:
+            self.invalidate_registry(error)
             self.fail(str(error))
 
 
@@ -0,0 +1,236 @@
+# SPDX-License-Identifier: MPL-2.0
+# Copyright 2021-2024 John Mille<john@ews-network.net>
+
+"""
+Custom resource to manage a set of Kafka topics with batched requests.
+
+Topics removed from a set, or the topics of a deleted set, can still be declared by another resource of the stack,
+i.e. moved to another set when the number of sets changed. These are never deleted: the current stack template is
+read with cloudformation:GetTemplate, and the topics are retained if it cannot be read.
+"""
+
+from __future__ import annotations
+
+import re
+import uuid
+from os import environ
+
+from cfn_kafka_admin.common import setup_logging
+from cfn_kafka_admin.kafka_resources.topics.batch import (
+    create_kafka_topics,
+    delete_kafka_topics,
+    update_kafka_topics,
+)
+from cfn_kafka_admin.kafka_resources.topics.configs import topic_definition_changed
+from cfn_kafka_admin.models.admin import EwsKafkaTopicSet
+
+from .topics import KafkaTopic
+from .utils import set_client_info
+
+LOG = setup_logging(__name__)
+
+
+def format_errors(errors: dict[str, Exception | None]) -> str:
+    return ", ".join(
+        f"{name}: {str(error)}" for name, error in errors.items() if error is not None
+    )
+
+
+def apply_default_settings(properties: dict) -> None:
+    """Merges the set DefaultSettings into the Settings of each topic, the topic Settings taking precedence"""
+    default_settings = properties.get("DefaultSettings")
+    if not default_settings:
+        return
+    for topic in properties.get("Topics", []):
+        topic["Settings"] = {**default_settings, **(topic.get("Settings") or {})}
+
+
+class KafkaTopicSet(KafkaTopic):
+    """
+    Class for the Custom::KafkaTopicSet resource.
+    Inherits the properties type conversion from KafkaTopic.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.request_schema = EwsKafkaTopicSet.schema()
+
+    def convert_property_types(self):
+        self.heuristic_convert_property_types(self.properties)
+        for topic in self.properties.get("Topics", []):
+            for prop in ["PartitionsCount", "ReplicationFactor"]:
+                if isinstance(topic.get(prop), str):
+                    try:
+                        topic[prop] = int(topic[prop])
+                    except Exception as error:
+                        self.fail(
+                            f"Failed to get topic information - {topic.get('Name')} {prop} - {str(error)}"
+                        )
+        apply_default_settings(self.properties)
+
+    def get_canonical_old_properties(self) -> dict | None:
+        old_properties = super().get_canonical_old_properties()
+        if old_properties is not None:
+            apply_default_settings(old_properties)
+        return old_properties
+
+    @property
+    def topics_names(self) -> list[str]:
+        return [topic["Name"] for topic in self.get("Topics")]
+
+    def set_topics_attributes(self):
+        self.set_attribute("Names", ",".join(self.topics_names))
+        self.set_attribute("BootstrapServers", self.get("BootstrapServers"))
+
+    def delete_created_topics(self, topics_names: list[str]) -> str:
+        """
+        Deletes the topics created by a failed create, as the delete of the failed resource is skipped.
+        The topics which existed before are left untouched.
+
+        :return: The deletion errors, to add to the failure reason
+        """
+        if not topics_names:
+            return ""
+        LOG.warning(f"Deleting the topics created by the failed create: {topics_names}")
+        try:
+            errors = delete_kafka_topics(topics_names, self.cluster_info)
+        except Exception as error:
+            LOG.exception(error)
+            errors = {name: error for name in topics_names}
+        if not any(errors.values()):
+            return ""
+        return f". Failed to delete the created topics: {format_errors(errors)}"
+
+    def create(self):
+        """
+        Creates all the topics in a single request, retrying only the ones that failed.
+        If some topics cannot be created, the ones created by this request are deleted.
+        """
+        set_client_info(self)
+        for topic in self.get("Topics"):
+            if not topic["PartitionsCount"] >= 1:
+                self.fail(
+                    f"{topic['Name']} - The number of partitions must be a strictly positive value >= 1"
+                )
+                return
+        existing_topics: set[str] = set()
+        try:
+            errors = create_kafka_topics(
+                self.get("Topics"), self.cluster_info, existing_topics
+            )
+        except Exception as error:
+            LOG.exception(error)
+            self.physical_resource_id = "could-not-create"
+            self.fail(f"Failed to create the topics set, {str(error)}")
+            return
+        if any(errors.values()):
+            self.physical_resource_id = "could-not-create"
+            self.fail(
+                f"Failed to create topics: {format_errors(errors)}"
+                + self.delete_created_topics(
+                    [
+                        name
+                        for name, error in errors.items()
+                        if error is None and name not in existing_topics
+                    ]
+                )
+            )
+            return
+        self.physical_resource_id = str(uuid.uuid4())
+        self.set_topics_attributes()
+        self.success(f"Created {len(errors)} topics")
+
+    def update(self):
+        """
+        Creates the topics added to the set, updates the existing ones, and deletes the removed ones
+        only if RemovedTopicsPolicy is set to Delete, and they are not declared by another resource of the stack.
+        """
+        old_properties = self.get_canonical_old_properties() or {}
+        old_names = {topic["Name"] for topic in self.get_old("Topics", [])}
+        new_topics = [
+            topic for topic in self.get("Topics") if topic["Name"] not in old_names
+        ]
+        existing_topics = [
+            topic for topic in self.get("Topics") if topic["Name"] in old_names
+        ]
+        if old_properties.get("BootstrapServers") == self.get("BootstrapServers"):
+            canonical_old_topics = {
+                topic["Name"]: topic for topic in old_properties.get("Topics", [])
+            }
+            existing_topics = [
+                topic
+                for topic in existing_topics
+                if topic_definition_changed(canonical_old_topics[topic["Name"]], topic)
+            ]
+        removed_names = [name for name in old_names if name not in self.topics_names]
+        if not new_topics and not existing_topics and not removed_names:
+            LOG.info("No topic properties changed. Skipping.")
+            self.set_topics_attributes()
+            self.success(f"Topics set of {len(self.topics_names)} topics unchanged.")
+            return
+        set_client_info(self)
+        errors: dict = {}
+        try:
+            if new_topics:
+                errors.update(create_kafka_topics(new_topics, self.cluster_info))
+            if existing_topics:
+                errors.update(update_kafka_topics(existing_topics, self.cluster_info))
+            if removed_names and self.get("RemovedTopicsPolicy") == "Delete":
+                to_delete = self.get_undeclared_topics(removed_names)
+                if to_delete:
+                    errors.update(delete_kafka_topics(to_delete, self.cluster_info))
+            elif removed_names:
+                LOG.info(f"Topics removed from the set are retained: {removed_names}")
+        except Exception as error:
+            LOG.exception(error)
+            self.fail(str(error))
+            return
+        if any(errors.values()):
+            self.fail(f"Failed to update topics: {format_errors(errors)}")
+            return
+        self.set_topics_attributes()
+        self.success(f"Topics set of {len(self.topics_names)} topics updated.")
+
+    def delete(self):
+        """
+        Deletes the topics of the set, but the ones declared by another resource of the stack.
+        """
+        if self.physical_resource_id and re.match(
+            r"(.*)could-not-create(.*)$", self.physical_resource_id
+        ):
+            LOG.warning("Deleting failed create resource.")
+            self.success("Deleting non-working resource")
+            return
+        topics_names = self.get_undeclared_topics(self.topics_names)
+        if not topics_names:
+            self.success("No topic to delete")
+            return
+        set_client_info(self)
+        try:
+            errors = delete_kafka_topics(topics_names, self.cluster_info)
+        except Exception as error:
+            LOG.exception(error)
+            errors = {"*": error}
+        if not any(errors.values()):
+            self.success(f"Deleted {len(topics_names)} topics")
+        elif environ.get("DELETE_FAIL_ON_ERROR", None) is None:
+            self.success(
+                f"Failed to delete topics. But ignoring failure. {format_errors(errors)}"
+            )
+        else:
+            self.fail(f"Failed to delete topics. {format_errors(errors)}")
+
+
+def lambda_handler(event, context):
+    """
+    AWS Lambda Function handler for topics sets management
+
+    :param dict event:
+    :param dict context:
+    """
+    provider = KafkaTopicSet()
+    provider.handle(event, context)
+
+
+if __name__ == "__main__":
+    print(KafkaTopicSet().request_schema)
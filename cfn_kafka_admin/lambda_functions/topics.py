@@ -6,24 +6,33 @@
 from __future__ import annotations
 
 import re
+from copy import deepcopy
 from os import environ
 
+import jsonschema
 from aws_cfn_custom_resource_resolve_parser import handle
-from cfn_resource_provider import ResourceProvider
+from cfn_resource_provider import ResourceProvider, default_injecting_validator
 from cfn_resource_provider.resource_provider import is_int
 from compose_x_common.compose_x_common import keypresent
 from confluent_kafka import KafkaError, KafkaException
 
 from cfn_kafka_admin.common import setup_logging
+from cfn_kafka_admin.kafka_resources.client_pool import preconnect_admin_client
+from cfn_kafka_admin.kafka_resources.topics.configs import topic_definition_changed
 from cfn_kafka_admin.kafka_resources.topics.create import create_new_kafka_topic
 from cfn_kafka_admin.kafka_resources.topics.delete import delete_topic
 from cfn_kafka_admin.kafka_resources.topics.update import update_kafka_topic
 from cfn_kafka_admin.models.admin import EwsKafkaTopic
 
-from .utils import set_client_info
+from .utils import get_stack_template, set_client_info
 
 LOG = setup_logging(__name__)
 
+preconnect_admin_client()
+
+TOPIC_RESOURCE_TYPES = ("Custom::KafkaTopic", "EWS::Kafka::Topic")
+TOPIC_SET_RESOURCE_TYPE = "Custom::KafkaTopicSet"
+
 INT_RE = re.compile(r"(^[1-9]+\d*$|^0$)")
 FLOAT_RE = re.compile(r"(^\d+\.\d+$|^\.\d+$)")
 
@@ -38,6 +47,27 @@ def is_float(number: str) -> bool:
     return True
 
 
+def get_template_topics_names(template: dict, exclude_title: str = None) -> set[str]:
+    """The names of the topics declared in the template resources, other than exclude_title"""
+    names: set[str] = set()
+    for title, resource in (template.get("Resources") or {}).items():
+        if title == exclude_title or not isinstance(resource, dict):
+            continue
+        properties: dict = resource.get("Properties") or {}
+        if resource.get("Type") in TOPIC_RESOURCE_TYPES:
+            topics = [properties]
+        elif resource.get("Type") == TOPIC_SET_RESOURCE_TYPE:
+            topics = properties.get("Topics") or []
+        else:
+            continue
+        names.update(
+            topic["Name"]
+            for topic in topics
+            if isinstance(topic, dict) and isinstance(topic.get("Name"), str)
+        )
+    return names
+
+
 class KafkaTopic(ResourceProvider):
     def __init__(self):
         """
@@ -47,6 +77,26 @@ class KafkaTopic(ResourceProvider):
         super().__init__()
         self.request_schema = EwsKafkaTopic.schema()
 
+    def get_undeclared_topics(self, topics_names: list[str]) -> list[str]:
+        """
+        The topics which are not declared by another resource of the stack, and can be deleted.
+        None of them if the stack template cannot be read.
+        """
+        try:
+            declared_names = get_template_topics_names(
+                get_stack_template(self.stack_id), self.logical_resource_id
+            )
+        except Exception as error:
+            LOG.exception(error)
+            LOG.warning(
+                f"Could not read the stack template. Retaining the topics {topics_names}"
+            )
+            return []
+        retained = [name for name in topics_names if name in declared_names]
+        if retained:
+            LOG.info(f"Topics declared by other resources are retained: {retained}")
+        return [name for name in topics_names if name not in declared_names]
+
     def heuristic_convert_property_types(self, properties):
         """
         heuristic type conversion of string values in `properties`.
@@ -139,10 +189,49 @@ class KafkaTopic(ResourceProvider):
             self.physical_resource_id = "could-not-create"
             self.fail(f"Failed to create the topic {self.get('Name')}, {str(error)}")
 
+    def get_canonical_old_properties(self) -> dict | None:
+        """
+        Returns the old properties with the same type conversion and schema defaults as the new ones,
+        so that both can be compared. None if the old properties are not valid anymore.
+        """
+        old_properties = deepcopy(self.old_properties)
+        self.heuristic_convert_property_types(old_properties)
+        try:
+            default_injecting_validator.validate(old_properties, self.request_schema)
+        except jsonschema.ValidationError as error:
+            LOG.warning(f"Old properties are not valid: {error.message}")
+            return None
+        return old_properties
+
+    def is_noop_update(self) -> bool:
+        """
+        True when the update does not change the topic, i.e. only properties such as the ServiceToken
+        or the credentials changed.
+        """
+        old_properties = self.get_canonical_old_properties()
+        if old_properties is None:
+            return False
+        for prop in ["Name", "BootstrapServers"]:
+            if old_properties.get(prop) != self.get(prop):
+                return False
+        return not topic_definition_changed(old_properties, self.properties)
+
+    def set_topic_attributes(self):
+        self.physical_resource_id = self.get("Name")
+        self.set_attribute("Name", self.get("Name"))
+        self.set_attribute("Partitions", self.get("PartitionsCount"))
+        self.set_attribute("BootstrapServers", self.get("BootstrapServers"))
+
     def update(self):
         """
+        Updates the topic partitions and settings. Skips all calls to the cluster when these did not change.
         :return:
         """
+        if self.is_noop_update():
+            LOG.info(f"{self.get('Name')} - No topic properties changed. Skipping.")
+            self.set_topic_attributes()
+            self.success(reason=f"Topic {self.get('Name')} unchanged.")
+            return
         set_client_info(self)
         try:
             update_kafka_topic(
@@ -151,10 +240,7 @@ class KafkaTopic(ResourceProvider):
                 self.cluster_info,
                 settings=self.get("Settings"),
             )
-            self.physical_resource_id = self.get("Name")
-            self.set_attribute("Name", self.get("Name"))
-            self.set_attribute("Partitions", self.get("PartitionsCount"))
-            self.set_attribute("BootstrapServers", self.get("BootstrapServers"))
+            self.set_topic_attributes()
             self.success(
                 reason="Topic {} successfully updated.".format(self.get("Name"))
             )
@@ -163,7 +249,8 @@ class KafkaTopic(ResourceProvider):
 
     def delete(self):
         """
-        Method to delete the Topic resource
+        Method to delete the Topic resource. The topic is retained if declared by another resource of the stack,
+        i.e. when the topic moved to a Custom::KafkaTopicSet.
         :return:
         """
         LOG.info("Delete: topic attribute name: {}".format(self.get("Name")))
@@ -178,6 +265,12 @@ class KafkaTopic(ResourceProvider):
             LOG.warning("Deleting failed create resource.")
             self.success("Deleting non-working resource")
             return
+        if not self.get_undeclared_topics([self.get("Name")]):
+            self.success(
+                f"Topic {self.get('Name')} retained: declared by another resource, "
+                "or the stack template could not be read."
+            )
+            return
         set_client_info(self)
         try:
             delete_topic(
@@ -201,12 +294,18 @@ class KafkaTopic(ResourceProvider):
 
 def lambda_handler(event, context):
     """
-    AWS Lambda Function handler for topics management
+    AWS Lambda Function handler for topics management.
+    Custom::KafkaTopicSet resources are handled by the same function.
 
     :param dict event:
     :param dict context:
     """
-    provider = KafkaTopic()
+    if event.get("ResourceType") == "Custom::KafkaTopicSet":
+        from .topic_sets import KafkaTopicSet
+
+        provider = KafkaTopicSet()
+    else:
+        provider = KafkaTopic()
     provider.handle(event, context)
 
 
@@ -11,11 +11,25 @@ if TYPE_CHECKING:
 import logging
 
 from aws_cfn_custom_resource_resolve_parser import handle
+from boto3.session import Session
+from cfn_flip import load
 
 LOG = logging.getLogger(__name__)
 LOG.setLevel(logging.INFO)
 
 
+def get_stack_template(stack_id: str) -> dict:
+    """The current template of the stack. During an update cleanup, the updated template"""
+    template_body = (
+        Session()
+        .client("cloudformation")
+        .get_template(StackName=stack_id)["TemplateBody"]
+    )
+    if isinstance(template_body, dict):
+        return template_body
+    return load(template_body)[0]
+
+
 def cfn_resolve_string(cfn_resource: ResourceProvider):
     for key, value in cfn_resource.cluster_info.items():
         if isinstance(value, str) and value.find("resolve:secretsmanager") >= 0:
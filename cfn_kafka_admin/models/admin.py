@@ -31,6 +31,10 @@ class S3Store(BaseModel):
         regex=r"^(([a-zA-Z0-9]|[a-zA-Z0-9][a-zA-Z0-9\-]{0,61}[a-zA-Z0-9])\.)*([A-Za-z0-9]|[A-Za-z0-9][A-Za-z0-9\-]{0,61}[A-Za-z0-9])\Z"
     )
     PrefixPath: constr(regex=r"^[^/](.*)/$") | None = ""
+    ContentAddressed: bool | None = False
+    """
+    When true, schemas are stored under a key based on the hash of their content, and only uploaded if not already present.
+    """
 
 
 class CompatibilityMode(Enum):
@@ -275,6 +279,13 @@ class TopicsSettings(BaseModel):
     """
 
 
+class TopicSetTopic(BaseModel):
+    Name: Name
+    PartitionsCount: PartitionsCount
+    ReplicationFactor: ReplicationFactor | None = None
+    Settings: TopicsSettings | None = None
+
+
 class PatternType(Enum):
     """
     Pattern type for resource value
@@ -408,6 +419,10 @@ class Schemas(BaseModel):
     """
     Metadata to automatically add to AVRO schemas.
     """
+    WaveSize: conint(ge=0) | None = 0
+    """
+    When set, each resource depends on the resource WaveSize before it, so that at most WaveSize resources are created or updated at once
+    """
 
 
 class EwsKafkaParameters(BaseModel):
@@ -430,6 +445,40 @@ class EwsKafkaParameters(BaseModel):
     """
 
 
+class RemovedTopicsPolicy(Enum):
+    """
+    Whether topics removed from the set on update are deleted from the cluster. For safety, defaulting to Retain
+    """
+
+    Retain = "Retain"
+    Delete = "Delete"
+
+
+class EwsKafkaTopicSet(BaseModel):
+    """
+    Resource to create a set of Kafka topics in your cluster with batched requests.
+    """
+
+    Topics: list[TopicSetTopic] = Field(..., min_items=1)
+    DefaultSettings: TopicsSettings | None = None
+    """
+    Settings of all the topics of the set, unless overridden in the topic Settings
+    """
+    RemovedTopicsPolicy: RemovedTopicsPolicy | None = "Retain"
+    """
+    Whether topics removed from the set on update are deleted from the cluster. For safety, defaulting to Retain
+    """
+    BootstrapServers: BootstrapServers | None = None
+    SecurityProtocol: SecurityProtocol | None = "PLAINTEXT"
+    SASLMechanism: SASLMechanism | None = "PLAIN"
+    SASLUsername: SASLUsername | None = None
+    SASLPassword: SASLPassword | None = None
+    ClientConfig: dict[str, Any] | None = None
+    """
+    Client configuration as per the librdkafka settings.
+    """
+
+
 class EwsKafkaTopic(BaseModel):
     """
     Resource to create Kafka topics in your cluster.
@@ -463,6 +512,10 @@ class AclsModel(BaseModel):
     __root__: EwsKafkaAcl
 
 
+class TopicSetModel(BaseModel):
+    __root__: EwsKafkaTopicSet
+
+
 class Topics(BaseModel):
     Topics: list[EwsKafkaTopic] | None = None
     ReplicationFactor: ReplicationFactor | None = None
@@ -475,6 +528,23 @@ class Topics(BaseModel):
     """
     Whether to import existing topics on Create. Fails if set to false
     """
+    TopicSetsCount: conint(ge=0) | None = 0
+    """
+    When set, topics are grouped into TopicSetsCount Custom::KafkaTopicSet resources, by hash of the topic name. Changing it moves topics between sets
+    """
+    WaveSize: conint(ge=0) | None = 0
+    """
+    When set, each resource depends on the resource WaveSize before it, so that at most WaveSize resources are created or updated at once
+    """
+
+
+class SplitBy(Enum):
+    """
+    When set, renders one ACL resource per principal, or per principal and resource name prefix, instead of a single ACLs resource
+    """
+
+    Principal = "Principal"
+    PrincipalResourcePrefix = "PrincipalResourcePrefix"
 
 
 class ACLs(BaseModel):
@@ -483,6 +553,10 @@ class ACLs(BaseModel):
     """
     Name or ARN of the Lambda function to use for Custom::KafkaACL
     """
+    SplitBy: SplitBy | None = None
+    """
+    When set, renders one ACL resource per principal, or per principal and resource name prefix, instead of a single ACLs resource
+    """
 
 
 class Model(BaseModel):
@@ -0,0 +1,253 @@
+#  SPDX-License-Identifier: MPL-2.0
+#  Copyright 2020-2024 John Mille <john@compose-x.io>
+
+"""
+Module-level caches of the Schema Registry clients, and of the latest schema version of the subjects,
+kept across warm Lambda invocations.
+
+The clients are keyed by a hash of the registry URL and credentials properties, before the secrets are resolved,
+so that reusing a client also skips resolving the secrets again. A client keeps its HTTP connections open,
+and is replaced once older than its lifetime, or when the registry rejects its credentials, i.e. rotated secrets.
+The operation is then retried once with the new client.
+
+The schemas are compared by fingerprint, the sha256 of their type and canonical definition, so that registering
+a definition which is already the latest version of the subject can be skipped, along with its compatibility check.
+On a cache miss, the latest version is fetched from the registry. Entries expire after the TTL, so that versions
+registered by other clients are eventually seen.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from time import monotonic
+from typing import TYPE_CHECKING, Callable
+
+if TYPE_CHECKING:
+    from kafka_schema_registry_admin.kafka_schema_registry_admin import SchemaRegistry
+
+from kafka_schema_registry_admin.client_wrapper.errors import (
+    ForbiddenException,
+    NotFoundException,
+    UnauthorizedException,
+)
+
+from cfn_kafka_admin.common import setup_logging
+
+LOG = setup_logging(__name__)
+
+SUBJECTS_CACHE_TTL = int(os.environ.get("SUBJECTS_CACHE_TTL_SECONDS", 300))
+REGISTRY_CLIENT_TTL = int(os.environ.get("REGISTRY_CLIENT_TTL_SECONDS", 900))
+AUTH_EXCEPTIONS = (UnauthorizedException, ForbiddenException)
+DEFAULT_SCHEMA_TYPE = "AVRO"
+
+
+def canonical_definition(definition: str | dict) -> str:
+    """
+    The definition without whitespaces and with sorted keys, when JSON, as used by AVRO and JSON schemas.
+    Other definitions, such as PROTOBUF, are only stripped.
+    """
+    if isinstance(definition, dict):
+        return json.dumps(definition, sort_keys=True, separators=(",", ":"))
+    try:
+        return json.dumps(json.loads(definition), sort_keys=True, separators=(",", ":"))
+    except json.JSONDecodeError:
+        return definition.strip()
+
+
+def get_schema_fingerprint(definition: str | dict, schema_type: str = None) -> str:
+    """The sha256 of the schema type and canonical definition"""
+    return hashlib.sha256(
+        f"{schema_type or DEFAULT_SCHEMA_TYPE}\0{canonical_definition(definition)}".encode(
+            "utf-8"
+        )
+    ).hexdigest()
+
+
+def registry_client_key(registry_url, *credentials) -> str:
+    """Hash of the registry URL and credentials properties, used as the clients cache key"""
+    return hashlib.sha256(
+        json.dumps([registry_url, *credentials], default=str).encode("utf-8")
+    ).hexdigest()
+
+
+class CachedRegistry:
+    """A Schema Registry client, with the registry URL it was created for"""
+
+    def __init__(self, registry: SchemaRegistry, registry_url: str):
+        self.registry = registry
+        self.registry_url = registry_url
+        self.created_at = monotonic()
+
+    @property
+    def age(self) -> float:
+        return monotonic() - self.created_at
+
+    def close(self) -> None:
+        try:
+            self.registry.client.session.close()
+        except Exception as error:
+            LOG.debug(f"Registry client close error: {error}")
+
+
+class RegistryClientsCache:
+    """
+    Cache of the Schema Registry clients, keyed by registry_client_key().
+    """
+
+    def __init__(self, ttl: int = REGISTRY_CLIENT_TTL):
+        self.ttl = ttl
+        self.clients: dict[str, CachedRegistry] = {}
+        self._lock = threading.Lock()
+
+    def get(
+        self, client_key: str, new_registry: Callable[[], CachedRegistry]
+    ) -> CachedRegistry:
+        """Returns the cached client, or creates and caches a new one with new_registry()"""
+        with self._lock:
+            cached = self.clients.get(client_key)
+            if cached and cached.age > self.ttl:
+                self.evict(client_key)
+                cached = None
+            if not cached:
+                cached = new_registry()
+                self.clients[client_key] = cached
+                LOG.info(f"New registry client {client_key[:8]}")
+            return cached
+
+    def evict(self, client_key: str) -> None:
+        cached = self.clients.pop(client_key, None)
+        if cached:
+            cached.close()
+
+    def invalidate(self, client_key: str) -> None:
+        with self._lock:
+            self.evict(client_key)
+
+    def clear(self) -> None:
+        with self._lock:
+            for client_key in list(self.clients):
+                self.evict(client_key)
+
+
+REGISTRY_CLIENTS = RegistryClientsCache()
+
+
+class CachedSubject:
+    """The latest schema version and the compatibility level of a subject, as last known"""
+
+    def __init__(self):
+        self.fingerprint: str | None = None
+        self.schema_id: int | None = None
+        self.compatibility: str | None = None
+        self.updated_at = monotonic()
+
+    @property
+    def age(self) -> float:
+        return monotonic() - self.updated_at
+
+
+class SubjectsCache:
+    """
+    Cache of the subjects, keyed by registry URL and subject name.
+    """
+
+    def __init__(self, ttl: int = SUBJECTS_CACHE_TTL):
+        self.ttl = ttl
+        self.subjects: dict[tuple[str, str], CachedSubject] = {}
+        self._lock = threading.Lock()
+
+    def get(self, registry_url: str, subject: str) -> CachedSubject | None:
+        with self._lock:
+            cached = self.subjects.get((registry_url, subject))
+            if cached and cached.age > self.ttl:
+                del self.subjects[(registry_url, subject)]
+                return None
+            return cached
+
+    def get_or_set(self, registry_url: str, subject: str) -> CachedSubject:
+        cached = self.get(registry_url, subject)
+        if cached is None:
+            cached = CachedSubject()
+            with self._lock:
+                self.subjects[(registry_url, subject)] = cached
+        return cached
+
+    def set_latest_version(
+        self, registry_url: str, subject: str, fingerprint: str, schema_id: int
+    ) -> CachedSubject:
+        cached = self.get_or_set(registry_url, subject)
+        cached.fingerprint = fingerprint
+        cached.schema_id = schema_id
+        cached.updated_at = monotonic()
+        return cached
+
+    def set_compatibility(
+        self, registry_url: str, subject: str, compatibility: str
+    ) -> None:
+        cached = self.get_or_set(registry_url, subject)
+        cached.compatibility = compatibility
+
+    def invalidate(self, registry_url: str, subject: str) -> None:
+        with self._lock:
+            self.subjects.pop((registry_url, subject), None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.subjects.clear()
+
+
+SUBJECTS_CACHE = SubjectsCache()
+
+
+def get_latest_subject_version(
+    registry: SchemaRegistry, registry_url: str, subject: str
+) -> CachedSubject | None:
+    """
+    The latest version of the subject, from the cache or else from the registry.
+
+    :return: The cached subject, or None if the subject does not exist.
+    """
+    cached = SUBJECTS_CACHE.get(registry_url, subject)
+    if cached and cached.fingerprint:
+        return cached
+    try:
+        latest: dict = registry.get_subject_version_id(subject, "latest").json()
+    except NotFoundException:
+        return None
+    return SUBJECTS_CACHE.set_latest_version(
+        registry_url,
+        subject,
+        get_schema_fingerprint(latest["schema"], latest.get("schemaType")),
+        latest["id"],
+    )
+
+
+def register_subject_version(
+    registry: SchemaRegistry,
+    registry_url: str,
+    subject: str,
+    definition: str,
+    schema_type: str,
+) -> int:
+    """
+    Registers the definition with the subject, and caches it as the latest version when it is a new version.
+    A definition already registered as an older version is returned as-is by the registry, with its version.
+
+    :return: The schema ID
+    """
+    schema: dict = registry.post_subject_schema_version(
+        subject, definition, schema_type=schema_type
+    ).json()
+    if "version" in schema:
+        SUBJECTS_CACHE.invalidate(registry_url, subject)
+    else:
+        SUBJECTS_CACHE.set_latest_version(
+            registry_url,
+            subject,
+            get_schema_fingerprint(definition, schema_type),
+            schema["id"],
+        )
+    return schema["id"]
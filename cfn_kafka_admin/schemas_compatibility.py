@@ -0,0 +1,209 @@
+# SPDX-License-Identifier: MPL-2.0
+# Copyright 2020-2024 John Mille <john@ews-network.net>
+
+"""
+Checks the compatibility of the rendered schemas with their previous versions, before deploying.
+
+The previous versions are read from previously rendered templates, including their nested stacks templates,
+or from directories of exported versions, with one ``<subject>/<version>.json`` (or ``.avsc``) file per version.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+from typing import NamedTuple
+
+import boto3
+from cfn_flip import load
+
+from cfn_kafka_admin.avro_compatibility import AvroSchemaError, check_compatibility
+from cfn_kafka_admin.schema_registry import get_schema_fingerprint
+
+SCHEMA_RESOURCE_TYPES = ("Custom::KafkaSchema", "EWS::Kafka::Schema")
+NESTED_STACK_TYPE = "AWS::CloudFormation::Stack"
+SUB_NAME = re.compile(r"\$\{([^}.]+)\.Name}")
+S3_URI = re.compile(r"^s3://(?P<bucket>[a-z0-9-.]+)/(?P<key>\S+)$")
+EXPORTED_EXTENSIONS = (".json", ".avsc")
+
+
+class TemplateSchema(NamedTuple):
+    subject: str
+    serializer: str
+    compatibility: str
+    definition: str
+
+
+class CompatibilityResult(NamedTuple):
+    subject: str
+    compatibility: str
+    versions_count: int
+    errors: list[str]
+
+
+def load_template_file(file_path: str) -> dict:
+    with open(file_path) as template_fd:
+        return load(template_fd.read())[0]
+
+
+def get_subject(subject, resources: dict) -> str | None:
+    """The subject name, resolving the topics names in Fn::Sub from the template resources"""
+    if isinstance(subject, str):
+        return subject
+    if not isinstance(subject, dict) or not isinstance(subject.get("Fn::Sub"), str):
+        return None
+    names: dict = {}
+    for title in SUB_NAME.findall(subject["Fn::Sub"]):
+        name = resources.get(title, {}).get("Properties", {}).get("Name")
+        if not isinstance(name, str):
+            return None
+        names[title] = name
+    return SUB_NAME.sub(lambda match: names[match.group(1)], subject["Fn::Sub"])
+
+
+def get_s3_definition(s3_uri: str, s3_client=None) -> str:
+    parts = S3_URI.match(s3_uri)
+    if not parts:
+        raise ValueError(f"The S3 URI {s3_uri} is not valid")
+    if s3_client is None:
+        s3_client = boto3.session.Session().client("s3")
+    return (
+        s3_client.get_object(Bucket=parts.group("bucket"), Key=parts.group("key"))[
+            "Body"
+        ]
+        .read()
+        .decode("utf-8")
+    )
+
+
+def get_template_schemas(
+    template: dict,
+    template_dir: str = None,
+    s3_definitions: dict[str, str] = None,
+    s3_client=None,
+) -> dict[str, TemplateSchema]:
+    """
+    The schemas of the template, and of its nested stacks templates found in template_dir, by subject.
+
+    :param dict template: The template
+    :param str template_dir: Directory of the nested stacks templates files. Nested stacks are ignored if not set.
+    :param dict s3_definitions: Definitions already known, by S3 URI. The others are downloaded.
+    :param s3_client: S3 client to download the definitions with
+    """
+    resources: dict = template.get("Resources", {})
+    schemas: dict[str, TemplateSchema] = {}
+    for title, resource in resources.items():
+        properties: dict = resource.get("Properties", {})
+        if resource.get("Type") == NESTED_STACK_TYPE and template_dir:
+            nested_path = os.path.join(template_dir, str(properties.get("TemplateURL")))
+            if os.path.isfile(nested_path):
+                schemas.update(
+                    get_template_schemas(
+                        load_template_file(nested_path),
+                        template_dir,
+                        s3_definitions,
+                        s3_client,
+                    )
+                )
+            continue
+        if resource.get("Type") not in SCHEMA_RESOURCE_TYPES:
+            continue
+        subject = get_subject(properties.get("Subject"), resources)
+        definition = properties.get("Definition")
+        if isinstance(definition, dict):
+            definition = json.dumps(definition)
+        if not subject or not isinstance(definition, str):
+            print(f"Schema {title} subject or definition cannot be resolved. Skipping")
+            continue
+        if S3_URI.match(definition):
+            if s3_definitions and definition in s3_definitions:
+                definition = s3_definitions[definition]
+            else:
+                definition = get_s3_definition(definition, s3_client)
+        schemas[subject] = TemplateSchema(
+            subject,
+            properties.get("Serializer", "AVRO"),
+            properties.get("CompatibilityMode", "NONE"),
+            definition,
+        )
+    return schemas
+
+
+def get_version_number(file_name: str) -> int:
+    try:
+        return int(os.path.splitext(file_name)[0])
+    except ValueError:
+        return -1
+
+
+def load_exported_versions(directory: str) -> dict[str, list[str]]:
+    """The definitions in the ``<subject>/<version>.json`` files of the directory, by subject, oldest first"""
+    versions: dict[str, list[str]] = {}
+    for subject in sorted(os.listdir(directory)):
+        subject_dir = os.path.join(directory, subject)
+        if not os.path.isdir(subject_dir):
+            continue
+        for file_name in sorted(os.listdir(subject_dir), key=get_version_number):
+            if file_name.endswith(EXPORTED_EXTENSIONS):
+                with open(os.path.join(subject_dir, file_name)) as definition_fd:
+                    versions.setdefault(subject, []).append(definition_fd.read())
+    return versions
+
+
+def load_previous_versions(paths: list[str], s3_client=None) -> dict[str, list[str]]:
+    """
+    The previous definitions, by subject and oldest first, from the templates and exported versions directories,
+    given oldest first. Consecutive identical definitions are only kept once.
+    """
+    versions: dict[str, list[str]] = {}
+    for path in paths:
+        if os.path.isdir(path):
+            source = load_exported_versions(path)
+        else:
+            source = {
+                subject: [schema.definition]
+                for subject, schema in get_template_schemas(
+                    load_template_file(path),
+                    os.path.dirname(path),
+                    s3_client=s3_client,
+                ).items()
+            }
+        for subject, definitions in source.items():
+            subject_versions = versions.setdefault(subject, [])
+            for definition in definitions:
+                if not subject_versions or get_schema_fingerprint(
+                    subject_versions[-1]
+                ) != get_schema_fingerprint(definition):
+                    subject_versions.append(definition)
+    return versions
+
+
+def check_schemas_compatibility(
+    schemas: dict[str, TemplateSchema], previous_versions: dict[str, list[str]]
+) -> list[CompatibilityResult]:
+    """
+    Checks the AVRO schemas with a compatibility mode against their previous versions.
+    The other schemas, and the new subjects, are not checked.
+    """
+    results: list[CompatibilityResult] = []
+    for subject, schema in sorted(schemas.items()):
+        previous_definitions = previous_versions.get(subject)
+        if (
+            schema.serializer != "AVRO"
+            or schema.compatibility == "NONE"
+            or not previous_definitions
+        ):
+            continue
+        try:
+            errors = check_compatibility(
+                schema.definition, previous_definitions, schema.compatibility
+            )
+        except AvroSchemaError as error:
+            errors = [str(error)]
+        results.append(
+            CompatibilityResult(
+                subject, schema.compatibility, len(previous_definitions), errors
+            )
+        )
+    return results
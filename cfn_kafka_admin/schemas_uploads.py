@@ -0,0 +1,133 @@
+# SPDX-License-Identifier: MPL-2.0
+# Copyright 2020-2024 John Mille <john@ews-network.net>
+
+"""
+Uploads the schemas definitions to S3.
+
+The definitions are collected while rendering, each returning its S3 URI straight away, and uploaded once the
+rendering is done. Definitions with the same content are uploaded once, and the uploads share a single S3 client,
+on a bounded thread pool.
+"""
+
+from __future__ import annotations
+
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple
+
+import boto3
+from botocore.exceptions import ClientError
+
+DEFAULT_UPLOAD_WORKERS = 8
+
+
+class SchemaArtifact(NamedTuple):
+    """A schema definition to upload to S3"""
+
+    bucket_name: str
+    key: str
+    definition: str
+    skip_if_exists: bool
+
+    @property
+    def s3_uri(self) -> str:
+        return f"s3://{self.bucket_name}/{self.key}"
+
+
+def upload_schema_definition(
+    bucket_name: str,
+    key: str,
+    definition: str,
+    skip_if_exists: bool = False,
+    s3_client=None,
+) -> str:
+    """
+    Uploads the schema definition to S3, and returns the S3 URI.
+    With skip_if_exists, the upload is skipped when the object ETag is the MD5 of the definition.
+    """
+    if s3_client is None:
+        s3_client = boto3.session.Session().client("s3")
+    s3_uri = f"s3://{bucket_name}/{key}"
+    if skip_if_exists:
+        md5_digest = hashlib.md5(definition.encode("utf-8")).hexdigest()
+        try:
+            s3_object = s3_client.head_object(Bucket=bucket_name, Key=key)
+            if s3_object["ETag"].strip('"') == md5_digest:
+                print(f"Schema already present at {s3_uri}")
+                return s3_uri
+        except ClientError as error:
+            if error.response.get("Error", {}).get("Code") not in ("404", "NoSuchKey"):
+                raise
+    s3_client.put_object(
+        Bucket=bucket_name,
+        Key=key,
+        Body=definition.encode("utf-8"),
+        ContentType="application/json",
+    )
+    print(f"Uploaded schema to {s3_uri}")
+    return s3_uri
+
+
+class SchemasUploader:
+    """
+    Collects the schemas definitions to upload, and uploads them in parallel.
+    Definitions already uploaded by a previous upload(), with the same key and content, are not uploaded again.
+    """
+
+    def __init__(self, max_workers: int = DEFAULT_UPLOAD_WORKERS, s3_client=None):
+        self.max_workers = max(max_workers, 1)
+        self.s3_client = s3_client
+        self.artifacts: dict[tuple[str, str], SchemaArtifact] = {}
+        self.definitions_keys: dict[tuple[str, str], str] = {}
+        self.uploaded: set[SchemaArtifact] = set()
+
+    def get_s3_client(self):
+        if self.s3_client is None:
+            self.s3_client = boto3.session.Session().client("s3")
+        return self.s3_client
+
+    def add(
+        self,
+        bucket_name: str,
+        key: str,
+        definition: str,
+        skip_if_exists: bool = False,
+    ) -> str:
+        """
+        Adds the definition to upload, and returns its S3 URI. When the same definition was already added
+        to the bucket, returns the S3 URI of the definition already added instead.
+        """
+        key = self.definitions_keys.setdefault((bucket_name, definition), key)
+        artifact = SchemaArtifact(bucket_name, key, definition, skip_if_exists)
+        self.artifacts[(bucket_name, key)] = artifact
+        return artifact.s3_uri
+
+    def upload(self) -> list[str]:
+        """
+        Uploads the definitions added since the last upload, through a single S3 client on a bounded thread pool.
+
+        :return: The S3 URIs of the definitions uploaded
+        """
+        pending: list[SchemaArtifact] = [
+            artifact
+            for artifact in self.artifacts.values()
+            if artifact not in self.uploaded
+        ]
+        self.artifacts = {}
+        self.definitions_keys = {}
+        if not pending:
+            return []
+        s3_client = self.get_s3_client()
+        with ThreadPoolExecutor(
+            max_workers=min(self.max_workers, len(pending))
+        ) as executor:
+            s3_uris = list(
+                executor.map(
+                    lambda artifact: upload_schema_definition(
+                        *artifact, s3_client=s3_client
+                    ),
+                    pending,
+                )
+            )
+        self.uploaded.update(pending)
+        return s3_uris
@@ -0,0 +1,154 @@
+# SPDX-License-Identifier: MPL-2.0
+# Copyright 2020-2024 John Mille <john@ews-network.net>
+
+"""
+Compact render of the templates.
+
+- The connection properties values move to the Connection mapping, when shorter.
+- The settings common to all the topics of a Custom::KafkaTopicSet become the set DefaultSettings.
+- The JSON is minified.
+"""
+
+from __future__ import annotations
+
+import json
+from typing import NamedTuple
+
+CONNECTION_PROPERTIES = (
+    "BootstrapServers",
+    "SecurityProtocol",
+    "SASLMechanism",
+    "SASLUsername",
+    "SASLPassword",
+    "RegistryUrl",
+    "RegistryUsername",
+    "RegistryPassword",
+    "RegistryUserInfo",
+)
+TOPIC_SET_TYPE = "Custom::KafkaTopicSet"
+CONNECTION_MAPPING = "Connection"
+
+
+class CompactReport(NamedTuple):
+    """Template size before and after compacting, and the bytes saved per category"""
+
+    original_size: int
+    compact_size: int
+    savings: dict[str, int]
+
+    def __add__(self, other: CompactReport) -> CompactReport:
+        return CompactReport(
+            self.original_size + other.original_size,
+            self.compact_size + other.compact_size,
+            {
+                category: self.savings.get(category, 0) + other.savings.get(category, 0)
+                for category in {**self.savings, **other.savings}
+            },
+        )
+
+    def __str__(self) -> str:
+        lines = [
+            f"{category}: {saved} bytes ({saved / max(self.original_size, 1):.1%})"
+            for category, saved in self.savings.items()
+        ]
+        lines.append(
+            f"Total: {self.original_size} -> {self.compact_size} bytes "
+            f"({(self.original_size - self.compact_size) / max(self.original_size, 1):.1%} saved)"
+        )
+        return "\n".join(lines)
+
+
+def dump_template(template, minified: bool = False) -> str:
+    """The template JSON, minified or as written by Template.to_json()"""
+    if minified:
+        return json.dumps(template, sort_keys=True, separators=(",", ":"))
+    return json.dumps(template, indent=1, sort_keys=True, separators=(",", ": "))
+
+
+def hoist_connection_properties(template: dict) -> None:
+    """
+    Replaces the connection properties values with a reference, when this makes the minified template smaller.
+    The values are set in the Connection mapping rather than parameters, so that changing them updates the resources.
+    Values using dynamic references are left as-is, as these are not supported in mappings.
+    """
+    resources: dict = template.get("Resources", {})
+    occurrences: dict[tuple[str, str], list[dict]] = {}
+    for resource in resources.values():
+        properties = resource.get("Properties", {})
+        for name in CONNECTION_PROPERTIES:
+            value = properties.get(name)
+            if isinstance(value, str) and "{{resolve:" not in value:
+                occurrences.setdefault((name, value), []).append(properties)
+    mapping: dict = template.get("Mappings", {}).get(CONNECTION_MAPPING, {})
+    for (name, value), resources_properties in sorted(occurrences.items()):
+        key = name
+        index = 1
+        while key in mapping:
+            index += 1
+            key = f"{name}{index}"
+        definition: dict = {key: {"Value": value}}
+        reference: dict = {"Fn::FindInMap": [CONNECTION_MAPPING, key, "Value"]}
+        saved_bytes = len(resources_properties) * (
+            len(dump_template(value, minified=True))
+            - len(dump_template(reference, minified=True))
+        ) - len(dump_template(definition, minified=True))
+        if saved_bytes <= 0:
+            continue
+        mapping.update(definition)
+        for properties in resources_properties:
+            properties[name] = reference
+    if mapping:
+        template.setdefault("Mappings", {})[CONNECTION_MAPPING] = mapping
+
+
+def get_common_settings(topics: list[dict]) -> dict:
+    """The settings with the same value for all the topics"""
+    common_settings: dict = dict(topics[0].get("Settings") or {})
+    for topic in topics[1:]:
+        settings = topic.get("Settings") or {}
+        common_settings = {
+            name: value
+            for name, value in common_settings.items()
+            if name in settings and settings[name] == value
+        }
+    return common_settings
+
+
+def hoist_topic_sets_default_settings(template: dict) -> None:
+    """Moves the settings common to all the topics of a set to the set DefaultSettings"""
+    for resource in template.get("Resources", {}).values():
+        if resource["Type"] != TOPIC_SET_TYPE:
+            continue
+        properties = resource["Properties"]
+        topics: list = properties.get("Topics", [])
+        if len(topics) < 2 or properties.get("DefaultSettings"):
+            continue
+        default_settings = get_common_settings(topics)
+        if not default_settings:
+            continue
+        properties["DefaultSettings"] = default_settings
+        for topic in topics:
+            for name in default_settings:
+                del topic["Settings"][name]
+            if not topic["Settings"]:
+                del topic["Settings"]
+
+
+def compact_template(template: dict) -> CompactReport:
+    """
+    Compacts the template in place, which is then to write with dump_template(template, minified=True)
+
+    :return: The bytes saved per category, compared to Template.to_json()
+    """
+    original_size = len(dump_template(template))
+    size = len(dump_template(template, minified=True))
+    savings: dict[str, int] = {"Minified JSON": original_size - size}
+    for category, compact_function in (
+        ("Connection properties", hoist_connection_properties),
+        ("Topic sets default settings", hoist_topic_sets_default_settings),
+    ):
+        compact_function(template)
+        new_size = len(dump_template(template, minified=True))
+        savings[category] = size - new_size
+        size = new_size
+    return CompactReport(original_size, size, savings)
@@ -0,0 +1,304 @@
+# SPDX-License-Identifier: MPL-2.0
+# Copyright 2020-2024 John Mille <john@ews-network.net>
+
+"""
+Splits a rendered template into nested stacks, under the CloudFormation resources count and template size limits.
+
+Resources referencing each other, such as a topic and its schemas, or a topics set and its schemas, are grouped
+and always placed in the same shard. Groups are assigned to a shard from the hash of their main resource title,
+so that, for a given number of shards, changing a topic only changes the template of its shard.
+
+Unless fixed, the number of shards is the smallest power of two for which all shards are within the limits.
+Changing the number of shards moves resources to other shards: about half of them when it doubles. CloudFormation
+deletes a moved resource from its previous nested stack and creates it in the new one, which, with the Delete
+DeletionPolicy, deletes the topic, schema or ACLs. So the number of shards must be fixed when any resource has the
+Delete DeletionPolicy.
+
+Resources of the dependant types (the ACLs) are sharded separately, and may only depend on the other resources
+with DependsOn, which becomes a dependency between the nested stacks.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+from typing import NamedTuple
+
+from troposphere import Template
+from troposphere.cloudformation import Stack
+
+CFN_MAX_RESOURCES = 500
+CFN_MAX_TEMPLATE_BYTES = 1_000_000
+DEFAULT_SHARD_MAX_RESOURCES = 400
+DEFAULT_SHARD_MAX_BYTES = 800_000
+SUB_VARIABLE = re.compile(r"\$\{([^!}][^}]*)}")
+
+
+class ShardableTemplate(Template):
+    """Template without the resources count limit, which applies to each of its shards instead"""
+
+    def add_resource(self, resource):
+        return self._update(self.resources, resource)
+
+
+class ResourcesGroup(NamedTuple):
+    """Resources which must be in the same shard"""
+
+    key: str
+    titles: list[str]
+    size: int
+
+
+class ShardedTemplate(NamedTuple):
+    """The parent template, and the shards templates indexed by the title of their nested stack"""
+
+    parent: Template
+    shards: dict[str, dict]
+
+
+def get_references(value, references: set[str] = None) -> set[str]:
+    """Logical IDs referenced with Ref, Fn::GetAtt or Fn::Sub in the value"""
+    if references is None:
+        references = set()
+    if isinstance(value, dict):
+        for key, item in value.items():
+            if key == "Ref" and isinstance(item, str):
+                references.add(item)
+            elif key == "Fn::GetAtt" and isinstance(item, list) and item:
+                references.add(item[0])
+            elif key == "Fn::Sub":
+                pattern = item if isinstance(item, str) else item[0]
+                references.update(
+                    variable.split(".")[0] for variable in SUB_VARIABLE.findall(pattern)
+                )
+                if isinstance(item, list) and len(item) > 1:
+                    get_references(item[1], references)
+            else:
+                get_references(item, references)
+    elif isinstance(value, list):
+        for item in value:
+            get_references(item, references)
+    return references
+
+
+def get_depends_on(resource: dict) -> list[str]:
+    depends_on = resource.get("DependsOn", [])
+    return [depends_on] if isinstance(depends_on, str) else list(depends_on)
+
+
+def get_resource_size(title: str, resource: dict) -> int:
+    """Bytes of the resource in the template JSON, as written by Template.to_json()"""
+    resource_json = json.dumps(
+        resource, indent=1, sort_keys=True, separators=(",", ": ")
+    )
+    return len(resource_json) + 2 * resource_json.count("\n") + len(title) + 8
+
+
+def get_shard_index(key: str, shards_count: int) -> int:
+    key_hash = hashlib.sha256(key.encode("utf-8")).digest()
+    return int.from_bytes(key_hash[:8], "big") % shards_count
+
+
+def group_resources(resources: dict[str, dict]) -> list[ResourcesGroup]:
+    """
+    Groups the resources referencing each other. The key of the group is the title of its main resource,
+    the one which does not reference the others.
+    """
+    parents: dict[str, str] = {title: title for title in resources}
+
+    def find(title: str) -> str:
+        while parents[title] != title:
+            parents[title] = parents[parents[title]]
+            title = parents[title]
+        return title
+
+    referencing: set[str] = set()
+    for title, resource in resources.items():
+        for reference in get_references(resource) | set(get_depends_on(resource)):
+            if reference in resources and reference != title:
+                parents[find(title)] = find(reference)
+                referencing.add(title)
+    groups: dict[str, list[str]] = {}
+    for title in resources:
+        groups.setdefault(find(title), []).append(title)
+    return [
+        ResourcesGroup(
+            min(
+                (title for title in titles if title not in referencing),
+                default=min(titles),
+            ),
+            titles,
+            sum(get_resource_size(title, resources[title]) for title in titles),
+        )
+        for titles in groups.values()
+    ]
+
+
+def assign_groups(
+    groups: list[ResourcesGroup],
+    max_resources: int,
+    max_bytes: int,
+    shards_count: int = None,
+) -> list[list[ResourcesGroup]]:
+    """
+    Assigns the groups to the shards, doubling the number of shards until all are within the limits.
+
+    :param list[ResourcesGroup] groups:
+    :param int max_resources: Maximum number of resources per shard
+    :param int max_bytes: Maximum size of the shard template
+    :param int shards_count: Fixed number of shards. Computed when not set.
+    """
+    for group in groups:
+        if len(group.titles) > max_resources or group.size > max_bytes:
+            raise ValueError(
+                f"Resources {', '.join(group.titles)} must be in the same shard, but are {group.size} bytes "
+                f"and {len(group.titles)} resources, over the {max_bytes} bytes / {max_resources} resources limits"
+            )
+    count = shards_count or 1
+    while True:
+        shards: list[list[ResourcesGroup]] = [[] for _ in range(count)]
+        for group in groups:
+            shards[get_shard_index(group.key, count)].append(group)
+        if all(
+            sum(len(group.titles) for group in shard) <= max_resources
+            and sum(group.size for group in shard) <= max_bytes
+            for shard in shards
+        ):
+            return shards
+        if shards_count:
+            raise ValueError(
+                f"The resources do not fit in {shards_count} shards of up to {max_resources} resources "
+                f"and {max_bytes} bytes"
+            )
+        count *= 2
+
+
+def get_deleted_titles(resources: dict[str, dict]) -> list[str]:
+    """Titles of the resources deleted with their nested stack, or when moved to another one"""
+    return sorted(
+        title
+        for title, resource in resources.items()
+        if resource.get("DeletionPolicy", "Delete") == "Delete"
+    )
+
+
+def get_shard_file_name(shard_title: str, template_format: str = "json") -> str:
+    return f"{shard_title}.{template_format}"
+
+
+def shard_template(
+    template: Template,
+    dependant_types: tuple = (),
+    max_resources: int = DEFAULT_SHARD_MAX_RESOURCES,
+    max_bytes: int = DEFAULT_SHARD_MAX_BYTES,
+    shards_count: int = None,
+    template_format: str = "json",
+    template_url_prefix: str = "",
+) -> ShardedTemplate:
+    """
+    Splits the template resources into shards templates, and creates the parent template with one
+    AWS::CloudFormation::Stack per shard.
+
+    :param Template template: The rendered template
+    :param tuple dependant_types: Resource types to shard separately, which depend on the other resources
+    :param int max_resources: Maximum number of resources per shard
+    :param int max_bytes: Maximum size of the shard template
+    :param int shards_count: Fixed number of shards, per resource kind. Computed when not set, only if no resource
+      has the Delete DeletionPolicy, as changing the number of shards would delete these.
+    :param str template_format: Format of the shards templates files, for their TemplateURL
+    :param str template_url_prefix: Prefix of the shards TemplateURL. When empty, the TemplateURL are the files
+      names, to upload with `aws cloudformation package`
+    """
+    if max_resources > CFN_MAX_RESOURCES or max_bytes > CFN_MAX_TEMPLATE_BYTES:
+        raise ValueError(
+            f"The shards limits cannot be over the CloudFormation limits of {CFN_MAX_RESOURCES} resources "
+            f"and {CFN_MAX_TEMPLATE_BYTES} bytes"
+        )
+    resources: dict[str, dict] = {
+        title: resource.to_dict() for title, resource in template.resources.items()
+    }
+    deleted_titles = get_deleted_titles(resources)
+    if not shards_count and deleted_titles:
+        raise ValueError(
+            f"{len(deleted_titles)} resources have the Delete DeletionPolicy, i.e. {', '.join(deleted_titles[:5])}. "
+            "Changing the number of shards would move them to other nested stacks, deleting them. "
+            "Set a fixed number of shards with enough room to grow, and keep it"
+        )
+    shards_resources: dict[str, dict[str, dict]] = {}
+    for prefix, kind_resources in (
+        (
+            "TopicsShard",
+            {
+                title: resource
+                for title, resource in resources.items()
+                if resource["Type"] not in dependant_types
+            },
+        ),
+        (
+            "AclsShard",
+            {
+                title: resource
+                for title, resource in resources.items()
+                if resource["Type"] in dependant_types
+            },
+        ),
+    ):
+        if not kind_resources:
+            continue
+        shards = assign_groups(
+            group_resources(kind_resources), max_resources, max_bytes, shards_count
+        )
+        for shard_index, shard in enumerate(shards):
+            if not shard:
+                continue
+            titles = sorted(title for group in shard for title in group.titles)
+            shards_resources[f"{prefix}{shard_index:04d}"] = {
+                title: resources[title] for title in titles
+            }
+
+    resources_shards: dict[str, str] = {
+        title: shard_title
+        for shard_title, shard_resources in shards_resources.items()
+        for title in shard_resources
+    }
+    parent = Template(template.description)
+    shards_templates: dict[str, dict] = {}
+    for shard_title, shard_resources in shards_resources.items():
+        stack_depends_on: set[str] = set()
+        for title, resource in shard_resources.items():
+            for reference in get_references(resource):
+                if resources_shards.get(reference, shard_title) != shard_title:
+                    raise ValueError(
+                        f"{title} references {reference}, which is in another shard. Only DependsOn is supported"
+                    )
+            depends_on = get_depends_on(resource)
+            if not depends_on:
+                continue
+            stack_depends_on.update(
+                resources_shards[name]
+                for name in depends_on
+                if resources_shards.get(name, shard_title) != shard_title
+            )
+            local_depends_on = [
+                name
+                for name in depends_on
+                if resources_shards.get(name, shard_title) == shard_title
+            ]
+            if local_depends_on:
+                resource["DependsOn"] = local_depends_on
+            else:
+                del resource["DependsOn"]
+        shard_template_dict: dict = {"Resources": shard_resources}
+        if template.description:
+            shard_template_dict["Description"] = (
+                f"{template.description} - {shard_title}"
+            )
+        shards_templates[shard_title] = shard_template_dict
+        stack_props: dict = {
+            "TemplateURL": f"{template_url_prefix}{get_shard_file_name(shard_title, template_format)}"
+        }
+        if stack_depends_on:
+            stack_props["DependsOn"] = sorted(stack_depends_on)
+        parent.add_resource(Stack(shard_title, **stack_props))
+    return ShardedTemplate(parent, shards_templates)
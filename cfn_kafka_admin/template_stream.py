@@ -0,0 +1,176 @@
+# SPDX-License-Identifier: MPL-2.0
+# Copyright 2020-2024 John Mille <john@ews-network.net>
+
+"""
+Streaming JSON template writer.
+
+Writes each resource to the output file as soon as it is rendered, instead of building the troposphere
+objects of the whole template in memory and serializing it at the end. Properties are validated with
+troposphere for the first resource or property of each class, then only their names are checked.
+List properties given as generators, such as the ACL policies, are written item by item.
+"""
+
+from __future__ import annotations
+
+import json
+from types import GeneratorType
+from typing import IO, NamedTuple
+
+from troposphere import BaseAWSObject, encode_to_dict
+
+RESOURCE_ATTRIBUTES = (
+    "Condition",
+    "CreationPolicy",
+    "DeletionPolicy",
+    "DependsOn",
+    "Metadata",
+    "UpdatePolicy",
+    "UpdateReplacePolicy",
+)
+
+
+class StreamedResource(NamedTuple):
+    """Reference to a resource already written to the output"""
+
+    title: str
+    resource_type: str
+
+
+def get_required_properties(object_class: type[BaseAWSObject]) -> set[str]:
+    return {name for name, (_, required) in object_class.props.items() if required}
+
+
+def is_custom_resource(object_class: type[BaseAWSObject]) -> bool:
+    """Custom resources accept any property, as for troposphere"""
+    resource_type = getattr(object_class, "resource_type", None) or ""
+    return (
+        resource_type == "AWS::CloudFormation::CustomResource"
+        or resource_type.startswith("Custom::")
+    )
+
+
+class TemplateStreamWriter:
+    """
+    Writes the template resources to the output file as they are added.
+    The output is the same JSON as Template.to_json(), other than the resources order.
+    """
+
+    def __init__(self, output_fd: IO, description: str = None, indent: int = 1):
+        self.output_fd = output_fd
+        self.indent = indent
+        self.validated_classes: dict[type, set[str]] = {}
+        self.resources_count: int = 0
+        self.closed: bool = False
+        self.output_fd.write("{\n")
+        if description:
+            self.output_fd.write(
+                f'{" " * indent}"Description": {json.dumps(description)},\n'
+            )
+        self.output_fd.write(f'{" " * indent}"Resources": {{')
+
+    def validate_properties(
+        self, object_class: type[BaseAWSObject], properties: dict, title: str = None
+    ) -> None:
+        """
+        Validates all the properties with troposphere for the first object of the class.
+        For the next ones, only checks that the properties are known and the required ones are set.
+        Lists items are validated on their own, with new_property(), so lists are validated as empty.
+        """
+        required = self.validated_classes.get(object_class)
+        if required is None:
+            object_class(
+                title,
+                **{
+                    name: [] if isinstance(value, (list, GeneratorType)) else value
+                    for name, value in properties.items()
+                },
+            ).to_dict()
+            self.validated_classes[object_class] = get_required_properties(object_class)
+            return
+        unknown = (
+            properties.keys() - object_class.props.keys() - set(RESOURCE_ATTRIBUTES)
+        )
+        if unknown and not is_custom_resource(object_class):
+            raise AttributeError(
+                f"{object_class.__name__} object does not support attribute(s) {', '.join(sorted(unknown))}"
+            )
+        missing = required - properties.keys()
+        if missing:
+            raise ValueError(
+                f"Resource {', '.join(sorted(missing))} required in type {object_class.__name__} ({title})"
+            )
+
+    def dumps(self, value, level: int) -> str:
+        """JSON of the value, as indented by Template.to_json() at the given nesting level"""
+        return json.dumps(
+            value, indent=self.indent, sort_keys=True, separators=(",", ": ")
+        ).replace("\n", "\n" + " " * (self.indent * level))
+
+    def write_items(self, items, level: int) -> None:
+        """Writes the list items one by one, at the given nesting level"""
+        prefix = "\n" + " " * (self.indent * (level + 1))
+        count = 0
+        self.output_fd.write("[")
+        for item in items:
+            self.output_fd.write(
+                ("," if count else "")
+                + prefix
+                + self.dumps(encode_to_dict(item), level + 1)
+            )
+            count += 1
+        self.output_fd.write(
+            ("\n" + " " * (self.indent * level) if count else "") + "]"
+        )
+
+    def write_resource(
+        self, resource_class: type[BaseAWSObject], title: str, properties: dict
+    ) -> StreamedResource:
+        """
+        Validates and writes the resource to the output.
+
+        :param resource_class: The troposphere class of the resource
+        :param str title: The resource logical ID
+        :param dict properties: The resource properties and attributes, as given to the resource class
+        :return: Reference to the resource written
+        """
+        if self.closed:
+            raise ValueError("Cannot add resources to a template already written")
+        self.validate_properties(resource_class, properties, title)
+        resource: dict = {"Type": resource_class.resource_type}
+        resource_properties: dict = {}
+        streamed: dict = {}
+        for name, value in properties.items():
+            if name in RESOURCE_ATTRIBUTES:
+                resource[name] = encode_to_dict(value)
+            elif isinstance(value, GeneratorType):
+                streamed[name] = value
+                resource_properties[name] = f"<streamed:{name}>"
+            else:
+                resource_properties[name] = encode_to_dict(value)
+        resource["Properties"] = resource_properties
+
+        self.output_fd.write(
+            ("," if self.resources_count else "")
+            + "\n"
+            + " " * (self.indent * 2)
+            + json.dumps(title)
+            + ": "
+        )
+        resource_json = self.dumps(resource, 2)
+        for name, items in streamed.items():
+            head, resource_json = resource_json.split(
+                json.dumps(f"<streamed:{name}>"), 1
+            )
+            self.output_fd.write(head)
+            self.write_items(items, 4)
+        self.output_fd.write(resource_json)
+        self.resources_count += 1
+        return StreamedResource(title, resource_class.resource_type)
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self.output_fd.write(
+            ("\n" + " " * self.indent if self.resources_count else "") + "}\n}"
+        )
+        self.closed = True
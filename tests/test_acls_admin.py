@@ -17,6 +17,7 @@ from cfn_kafka_admin.kafka_resources import get_admin_client
 from cfn_kafka_admin.kafka_resources.acls import (
     create_new_acls,
     delete_acls,
+    reconcile_acls,
     set_binding_filter_from_dict,
     set_binding_from_dict,
 )
@@ -136,3 +137,39 @@ def test_create_delete_acls(compose_path):
         acls_list = list_acls(cluster_settings)
         print(acls_list)
         assert not acls_list
+
+
+def test_reconcile_acls(compose_path):
+    with DockerCompose(
+        path.abspath(compose_path),
+        compose_file_name="docker-compose.yaml",
+        wait=True,
+        pull=True,
+    ) as kafka:
+        connection, sr_url = get_connection_details(kafka)
+        cluster_settings = {"bootstrap.servers": connection}
+        old_acls: list[dict] = [
+            {
+                "Resource": f"topic-{count}",
+                "PatternType": "LITERAL",
+                "Principal": "User:toto",
+                "ResourceType": "TOPIC",
+                "Action": "READ",
+                "Effect": "ALLOW",
+            }
+            for count in range(0, 4)
+        ]
+        create_new_acls(old_acls, cluster_settings)
+        # Drift: one of the managed ACLs was deleted outside of the stack
+        delete_acls(old_acls[:1], cluster_settings)
+        new_acls = old_acls[:3]
+        acls_diff = reconcile_acls(new_acls, old_acls, cluster_settings)
+        assert len(acls_diff.add) == 1
+        assert len(acls_diff.remove) == 1
+        assert len(acls_diff.unchanged) == 2
+        bindings: list[AclBinding] = [set_binding_from_dict(_acl) for _acl in new_acls]
+        acls_list = list_acls(cluster_settings)
+        assert len(acls_list) == len(bindings)
+        assert all(elem in bindings for elem in acls_list)
+        acls_diff = reconcile_acls(new_acls, new_acls, cluster_settings)
+        assert not acls_diff.add and not acls_diff.remove
@@ -0,0 +1,147 @@
+"""Tests the chunked, bounded concurrency ACLs requests"""
+
+from concurrent.futures import Future
+from threading import Timer
+from time import monotonic
+
+import pytest
+
+from cfn_kafka_admin.kafka_resources import acls
+from cfn_kafka_admin.kafka_resources.acls import run_chunked_acls_requests
+
+
+def test_run_chunked_acls_requests():
+    requests: list[list] = []
+    max_pending: list[int] = [0]
+    pending: list[Future] = []
+
+    def operation(items: list) -> dict:
+        requests.append(items)
+        futures: dict = {}
+        for item in items:
+            _future = Future()
+            futures[item] = _future
+            pending.append(_future)
+            if item != "binding-13":
+                Timer(0.01, _future.set_result, (None,)).start()
+        max_pending[0] = max(
+            max_pending[0], len({id(_f) for _f in pending if not _f.done()})
+        )
+        return futures
+
+    items = [f"binding-{count}" for count in range(0, 25)]
+    futures = run_chunked_acls_requests(
+        operation, items, chunk_size=4, max_in_flight=2, timeout=1
+    )
+    assert [len(_request) for _request in requests] == [4, 4, 4, 4, 4, 4, 1]
+    assert max_pending[0] <= 8
+    assert set(futures.keys()) == set(items)
+    assert not futures["binding-13"].done()
+    assert all(_f.done() for _k, _f in futures.items() if _k != "binding-13")
+
+
+def test_timeout_bounds_the_whole_call():
+    requests: list[list] = []
+
+    def operation(items: list) -> dict:
+        requests.append(items)
+        futures: dict = {}
+        for item in items:
+            _future = Future()
+            futures[item] = _future
+            Timer(0.2, _future.set_result, (None,)).start()
+        return futures
+
+    items = [f"binding-{count}" for count in range(0, 10)]
+    start = monotonic()
+    futures = run_chunked_acls_requests(
+        operation, items, chunk_size=1, max_in_flight=1, timeout=0.5
+    )
+    assert monotonic() - start < 0.8
+    assert len(requests) == 3
+    assert all(_future.done() for _future in list(futures.values())[:2])
+    assert set(items) - set(futures.keys()) == set(items[3:])
+
+
+def test_timeout_reports_the_pending_chunk(monkeypatch):
+    stuck: Future = Future()
+    slow: Future = Future()
+    Timer(0.2, slow.set_result, (None,)).start()
+    errors: list[str] = []
+    monkeypatch.setattr(acls.LOG, "error", errors.append)
+    in_flight = acls.wait_for_chunks(
+        [{"binding-0": slow}, {"binding-1": stuck}], monotonic() + 1
+    )
+    assert in_flight == [{"binding-1": stuck}]
+    assert acls.wait_for_chunks(in_flight, monotonic() + 0.1) == []
+    assert errors == [
+        "ACLs requests timed out. 1 bindings not confirmed in 1 request(s)"
+    ]
+
+
+def test_reconcile_reports_already_present_acls(monkeypatch):
+    present = {
+        "Resource": "topic-a",
+        "Principal": "User:app",
+        "ResourceType": "TOPIC",
+        "Action": "READ",
+        "Effect": "ALLOW",
+    }
+    missing = {**present, "Action": "WRITE"}
+    created: list = []
+    reports: list[acls.AclsReport] = []
+
+    class AdminClient:
+        def describe_acls(self, _filter) -> Future:
+            _future = Future()
+            _future.set_result([acls.set_binding_from_dict(present)])
+            return _future
+
+        def create_acls(self, bindings: list) -> dict:
+            created.extend(bindings)
+            futures: dict = {}
+            for binding in bindings:
+                futures[binding] = Future()
+                futures[binding].set_result(None)
+            return futures
+
+    create_acls_chunked = acls.create_acls_chunked
+    monkeypatch.setattr(acls, "get_pooled_admin_client", lambda *args: AdminClient())
+    monkeypatch.setattr(
+        acls,
+        "create_acls_chunked",
+        lambda *args: reports.append(create_acls_chunked(*args)) or reports[-1],
+    )
+    acls_diff = acls.reconcile_acls([present, missing], [], {})
+    assert acls_diff.add == {acls.acl_key_from_dict(missing)}
+    assert created == [acls.set_binding_from_dict(missing)]
+    assert reports[0].already_present == [acls.acl_key_from_dict(present)]
+    assert reports[0].succeeded == [acls.acl_key_from_dict(missing)]
+
+
+def test_reconcile_raises_on_failed_deletion(monkeypatch):
+    stale = {
+        "Resource": "topic-a",
+        "Principal": "User:app",
+        "ResourceType": "TOPIC",
+        "Action": "WRITE",
+        "Effect": "ALLOW",
+    }
+
+    class AdminClient:
+        def describe_acls(self, _filter) -> Future:
+            _future = Future()
+            _future.set_result([acls.set_binding_from_dict(stale)])
+            return _future
+
+        def delete_acls(self, filters: list) -> dict:
+            futures: dict = {}
+            for _filter in filters:
+                futures[_filter] = Future()
+                futures[_filter].set_exception(PermissionError("Not authorized"))
+            return futures
+
+    monkeypatch.setattr(acls, "get_pooled_admin_client", lambda *args: AdminClient())
+    with pytest.raises(acls.AclsOperationFailed, match="Not authorized") as error:
+        acls.reconcile_acls([], [stale], {})
+    assert list(error.value.report.failed) == [acls.acl_key_from_dict(stale)]
@@ -0,0 +1,61 @@
+"""Tests the ACLs diff between old and new policies"""
+
+from cfn_kafka_admin.kafka_resources.acls import (
+    acl_key_from_dict,
+    diff_acls,
+    differentiate_old_new_acls,
+)
+
+
+def set_policy(index: int, principal: str = "User:toto") -> dict:
+    return {
+        "Resource": f"topic-{index}",
+        "PatternType": "LITERAL",
+        "Principal": principal,
+        "ResourceType": "TOPIC",
+        "Action": "READ",
+        "Effect": "ALLOW",
+    }
+
+
+def test_acl_key_normalizes_defaults():
+    policy = {
+        "Effect": "ALLOW",
+        "Action": "DESCRIBE",
+        "ResourceType": "CLUSTER",
+        "Principal": "User:toto",
+        "Resource": "kafka-cluster",
+    }
+    equivalent = {
+        "Resource": "kafka-cluster",
+        "PatternType": "LITERAL",
+        "Principal": "User:toto",
+        "ResourceType": "BROKER",
+        "Action": "DESCRIBE",
+        "Effect": "ALLOW",
+        "Host": "*",
+    }
+    assert acl_key_from_dict(policy) == acl_key_from_dict(equivalent)
+
+
+def test_diff_acls():
+    old_policies = [set_policy(0), set_policy(1), set_policy(2)]
+    new_policies = [set_policy(1), set_policy(2), set_policy(3), set_policy(3)]
+    new_policies[0]["Host"] = "*"
+    acls_diff = diff_acls(new_policies, old_policies)
+    assert acls_diff.add == {acl_key_from_dict(set_policy(3))}
+    assert acls_diff.remove == {acl_key_from_dict(set_policy(0))}
+    assert len(acls_diff.unchanged) == 2
+
+    new_acls, to_delete_acls = differentiate_old_new_acls(new_policies, old_policies)
+    assert [_acl["Resource"] for _acl in new_acls] == ["topic-3"]
+    assert [_acl["Resource"] for _acl in to_delete_acls] == ["topic-0"]
+
+
+def test_diff_acls_100k_bindings():
+    old_policies = [set_policy(count) for count in range(0, 100_000)]
+    new_policies = [set_policy(count) for count in range(1_000, 101_000)]
+    acls_diff = diff_acls(new_policies, old_policies)
+    assert len(acls_diff.add) == 1_000
+    assert len(acls_diff.remove) == 1_000
+    assert len(acls_diff.unchanged) == 99_000
@@ -0,0 +1,230 @@
+"""Tests rendering one ACL resource per principal, or per principal and resource prefix"""
+
+from concurrent.futures import Future
+
+import pytest
+import yaml
+
+from cfn_kafka_admin.cfn_kafka_admin import KafkaStack, get_topic_set_index
+from cfn_kafka_admin.kafka_resources import acls as kafka_acls
+from cfn_kafka_admin.lambda_functions import acls
+
+PRINCIPALS = ["User:app-a", "User:app-b"]
+TOPICS = ["orders.created", "orders.updated", "payments.created"]
+
+
+def set_definition(tmp_path, principals: list, split_by: str = None) -> str:
+    acls: dict = {
+        "FunctionName": "acls-fn",
+        "Policies": [
+            {
+                "Resource": topic,
+                "Principal": principal,
+                "ResourceType": "TOPIC",
+                "Action": "READ",
+                "Effect": "ALLOW",
+            }
+            for principal in principals
+            for topic in TOPICS
+        ],
+    }
+    if split_by:
+        acls["SplitBy"] = split_by
+    definition_path = tmp_path / "definition.yaml"
+    definition_path.write_text(
+        yaml.dump(
+            {
+                "Globals": {"BootstrapServers": "broker:9092"},
+                "Topics": {
+                    "FunctionName": "topics-fn",
+                    "ReplicationFactor": 3,
+                    "Topics": [{"Name": name, "PartitionsCount": 3} for name in TOPICS],
+                },
+                "ACLs": acls,
+            }
+        )
+    )
+    return str(definition_path)
+
+
+def render_template(
+    definition_path: str, split_by: str = None, topic_sets_count=0
+) -> dict:
+    stack = KafkaStack([definition_path])
+    stack.render_topics(topic_sets_count)
+    stack.render_acls(split_by)
+    return stack.template.to_dict()["Resources"]
+
+
+def render_acls(definition_path: str, split_by: str = None, topic_sets_count=0) -> dict:
+    return {
+        title: resource
+        for title, resource in render_template(
+            definition_path, split_by, topic_sets_count
+        ).items()
+        if resource["Type"] == "Custom::KafkaACL"
+    }
+
+
+def get_policies(acls: dict) -> list:
+    return sorted(
+        (policy["Principal"], str(policy["Resource"]))
+        for acl in acls.values()
+        for policy in acl["Properties"]["Policies"]
+    )
+
+
+@pytest.mark.parametrize(
+    "split_by, resources_count",
+    [("Principal", 2), ("PrincipalResourcePrefix", 4)],
+)
+def test_split_acls(tmp_path, split_by, resources_count):
+    definition_path = set_definition(tmp_path, PRINCIPALS)
+    single = render_acls(definition_path)
+    assert list(single) == ["ACLs"]
+    split = render_acls(definition_path, split_by)
+    assert len(split) == resources_count
+    assert get_policies(split) == get_policies(single)
+    for acl in split.values():
+        assert (
+            len({policy["Principal"] for policy in acl["Properties"]["Policies"]}) == 1
+        )
+
+
+def test_split_acls_stable_titles(tmp_path):
+    first = render_acls(set_definition(tmp_path, PRINCIPALS, "Principal"))
+    changed = render_acls(
+        set_definition(tmp_path, ["User:app-c"] + PRINCIPALS[::-1], "Principal")
+    )
+    assert set(first) < set(changed)
+    for title, acl in first.items():
+        assert changed[title] == acl
+
+
+def test_split_acls_depend_on_their_topic_sets(tmp_path):
+    definition_path = set_definition(tmp_path, PRINCIPALS)
+    split = render_acls(definition_path, "PrincipalResourcePrefix", topic_sets_count=2)
+    for acl in split.values():
+        resources = {policy["Resource"] for policy in acl["Properties"]["Policies"]}
+        expected = {
+            f"TopicSet{get_topic_set_index(resource, 2):04d}" for resource in resources
+        }
+        assert set(acl["DependsOn"]) == expected
+
+
+def test_split_resources_are_deleted_with_their_policies(tmp_path):
+    single = render_acls(set_definition(tmp_path, PRINCIPALS))
+    assert single["ACLs"]["DeletionPolicy"] == "Retain"
+    first = render_acls(set_definition(tmp_path, PRINCIPALS, "Principal"))
+    removed = render_acls(set_definition(tmp_path, PRINCIPALS[:1], "Principal"))
+    assert len(removed) == len(first) - 1
+    for acl in first.values():
+        assert acl["DeletionPolicy"] == "Delete"
+
+
+@pytest.fixture
+def deleted(monkeypatch) -> list:
+    deleted_policies: list = []
+    monkeypatch.setattr(
+        acls,
+        "delete_acls",
+        lambda policies, cluster_info: deleted_policies.extend(policies),
+    )
+    monkeypatch.setattr(acls, "set_client_info", lambda provider: None)
+    return deleted_policies
+
+
+def delete_acl_resource(
+    title: str, resources: dict, status: str = "SUCCESS"
+) -> acls.KafkaACL:
+    """Deletes the ACL resource, with the policies resolved as sent by CloudFormation"""
+    policies = [
+        acls.resolve_policy_resource(policy, resources)
+        for policy in resources[title]["Properties"]["Policies"]
+    ]
+    provider = acls.KafkaACL()
+    provider.set_request(
+        {
+            "RequestType": "Delete",
+            "ResponseURL": "https://localhost",
+            "StackId": "arn:aws:cloudformation:eu-west-1:000000000000:stack/kafka/id",
+            "RequestId": "request",
+            "ResourceType": "Custom::KafkaACL",
+            "LogicalResourceId": title,
+            "PhysicalResourceId": "acl-id",
+            "ResourceProperties": {
+                "BootstrapServers": "broker:9092",
+                "Policies": policies,
+            },
+        },
+        None,
+    )
+    provider.delete()
+    assert provider.status == status, provider.reason
+    return provider
+
+
+def test_removed_principal_acls_are_deleted(tmp_path, monkeypatch, deleted):
+    first = render_template(set_definition(tmp_path, PRINCIPALS, "Principal"))
+    template = {
+        "Resources": render_template(
+            set_definition(tmp_path, PRINCIPALS[:1], "Principal")
+        )
+    }
+    monkeypatch.setattr(acls, "get_stack_template", lambda stack_id: template)
+    (removed_title,) = set(first) - set(template["Resources"])
+    provider = delete_acl_resource(removed_title, first)
+    assert deleted == provider.get("Policies")
+    assert {policy["Principal"] for policy in deleted} == {PRINCIPALS[1]}
+    assert {policy["Resource"] for policy in deleted} == set(TOPICS)
+
+
+def test_acls_moved_to_another_resource_are_retained(tmp_path, monkeypatch, deleted):
+    first = render_template(set_definition(tmp_path, PRINCIPALS, "Principal"))
+    template = {"Resources": render_template(set_definition(tmp_path, PRINCIPALS))}
+    monkeypatch.setattr(acls, "get_stack_template", lambda stack_id: template)
+    for title, resource in first.items():
+        if resource["Type"] == "Custom::KafkaACL":
+            delete_acl_resource(title, first)
+    assert deleted == []
+
+
+def test_acls_retained_when_template_cannot_be_read(tmp_path, monkeypatch, deleted):
+    def get_stack_template(stack_id):
+        raise PermissionError("cloudformation:GetTemplate")
+
+    monkeypatch.setattr(acls, "get_stack_template", get_stack_template)
+    first = render_template(set_definition(tmp_path, PRINCIPALS, "Principal"))
+    title = next(
+        title
+        for title, resource in first.items()
+        if resource["Type"] == "Custom::KafkaACL"
+    )
+    delete_acl_resource(title, first)
+    assert deleted == []
+
+
+def test_failed_acls_deletion_fails_the_resource(tmp_path, monkeypatch):
+    class AdminClient:
+        def delete_acls(self, filters: list) -> dict:
+            futures: dict = {}
+            for _filter in filters:
+                futures[_filter] = Future()
+                futures[_filter].set_exception(PermissionError("Not authorized"))
+            return futures
+
+    monkeypatch.setattr(
+        kafka_acls, "get_pooled_admin_client", lambda *args: AdminClient()
+    )
+    monkeypatch.setattr(acls, "set_client_info", lambda provider: None)
+    first = render_template(set_definition(tmp_path, PRINCIPALS, "Principal"))
+    template = {
+        "Resources": render_template(
+            set_definition(tmp_path, PRINCIPALS[:1], "Principal")
+        )
+    }
+    monkeypatch.setattr(acls, "get_stack_template", lambda stack_id: template)
+    (removed_title,) = set(first) - set(template["Resources"])
+    provider = delete_acl_resource(removed_title, first, status="FAILED")
+    assert provider.reason.startswith("Failed to delete ACLs.")
+    assert "Not authorized" in provider.reason
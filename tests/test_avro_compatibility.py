@@ -0,0 +1,228 @@
+"""Tests the offline AVRO schemas compatibility checks"""
+
+import json
+import sys
+
+import pytest
+import yaml
+
+from cfn_kafka_admin import cli
+from cfn_kafka_admin.avro_compatibility import (
+    READING_ERRORS,
+    AvroSchemaError,
+    check_compatibility,
+    get_reading_errors,
+)
+from cfn_kafka_admin.schemas_compatibility import (
+    TemplateSchema,
+    check_schemas_compatibility,
+    get_template_schemas,
+    load_previous_versions,
+)
+
+from .test_schemas_uploads import LocalS3
+
+
+def record(*fields: dict, name: str = "com.example.Order") -> str:
+    return json.dumps({"type": "record", "name": name, "fields": list(fields)})
+
+
+ID = {"name": "id", "type": "int"}
+ID_LONG = {"name": "id", "type": "long"}
+NOTE = {"name": "note", "type": ["null", "string"], "default": None}
+NOTE_REQUIRED = {"name": "note", "type": "string"}
+STATUS = {
+    "name": "status",
+    "type": {"type": "enum", "name": "Status", "symbols": ["NEW", "DONE"]},
+}
+STATUS_MORE = {
+    "name": "status",
+    "type": {"type": "enum", "name": "Status", "symbols": ["NEW", "DONE", "LOST"]},
+}
+
+
+@pytest.mark.parametrize(
+    "reader, writer, compatible",
+    [
+        (record(ID, NOTE), record(ID), True),
+        (record(ID, NOTE_REQUIRED), record(ID), False),
+        (record(ID), record(ID, NOTE_REQUIRED), True),
+        (record(ID_LONG), record(ID), True),
+        (record(ID), record(ID_LONG), False),
+        (record(ID, STATUS_MORE), record(ID, STATUS), True),
+        (record(ID, STATUS), record(ID, STATUS_MORE), False),
+        (record(ID, name="com.example.Other"), record(ID), False),
+        (record(ID, name="other.Order"), record(ID), True),
+        ('["null", "string"]', '"string"', True),
+        ('"string"', '["null", "string"]', False),
+        (
+            '{"type": "array", "items": "long"}',
+            '{"type": "array", "items": "int"}',
+            True,
+        ),
+        (
+            '{"type": "fixed", "name": "F", "size": 4}',
+            '{"type": "fixed", "name": "F", "size": 8}',
+            False,
+        ),
+    ],
+)
+def test_reading(reader, writer, compatible):
+    assert not get_reading_errors(reader, writer) == compatible
+
+
+def test_recursive_and_named_references():
+    node = {
+        "type": "record",
+        "name": "Node",
+        "namespace": "com.example",
+        "fields": [
+            {"name": "value", "type": "int"},
+            {"name": "next", "type": ["null", "Node"], "default": None},
+        ],
+    }
+    with_label = {
+        **node,
+        "fields": node["fields"] + [{"name": "label", "type": "string"}],
+    }
+    assert get_reading_errors(json.dumps(node), json.dumps(with_label)) == []
+    errors = get_reading_errors(json.dumps(with_label), json.dumps(node))
+    assert errors == [
+        "/label: the reader field has no default and is not in the writer"
+    ]
+
+
+def test_compatibility_modes():
+    v1 = record(ID)
+    v2 = record(ID, NOTE_REQUIRED)
+    v3 = record(ID, NOTE)
+    assert check_compatibility(v3, [v1, v2], "BACKWARD_TRANSITIVE") == []
+    assert check_compatibility(v3, [v1, v2], "FORWARD") == [
+        "FORWARD with previous version -1: /note[0]: the reader string cannot read the writer null"
+    ]
+    assert check_compatibility(v3, [v1], "FULL") == []
+    assert len(check_compatibility(v3, [v1, v2], "FULL_TRANSITIVE")) == 1
+    assert check_compatibility(v2, [v1], "BACKWARD") != []
+    assert check_compatibility(v2, [v1], "FORWARD") == []
+    assert check_compatibility(v1, [v2, v3], "BACKWARD") == []
+    assert check_compatibility(v1, [v2, v3], "FORWARD_TRANSITIVE") != []
+    assert check_compatibility(v2, [v1], "NONE") == []
+    with pytest.raises(AvroSchemaError):
+        check_compatibility("not json", [v1], "BACKWARD")
+
+
+def test_results_cached_by_fingerprints():
+    reader = record(ID_LONG)
+    writer = record(ID)
+    errors = get_reading_errors(reader, writer)
+    reformatted = json.dumps(json.loads(writer), indent=4)
+    assert get_reading_errors(reader, reformatted) is errors
+    assert len([key for key in READING_ERRORS if READING_ERRORS[key] is errors]) == 1
+
+
+def test_check_rendered_against_previous_template_and_exports(tmp_path):
+    previous_template = tmp_path / "previous.json"
+    previous_template.write_text(
+        json.dumps(
+            {
+                "Resources": {
+                    "Orders": {
+                        "Type": "Custom::KafkaTopic",
+                        "Properties": {"Name": "orders"},
+                    },
+                    "OrdersAVROvalueSchema": {
+                        "Type": "Custom::KafkaSchema",
+                        "Properties": {
+                            "Subject": {"Fn::Sub": "${Orders.Name}-value"},
+                            "Serializer": "AVRO",
+                            "CompatibilityMode": "BACKWARD",
+                            "Definition": record(ID, NOTE),
+                        },
+                    },
+                }
+            }
+        )
+    )
+    exported = tmp_path / "exported" / "orders-value"
+    exported.mkdir(parents=True)
+    (exported / "1.avsc").write_text(record(ID))
+    (exported / "2.avsc").write_text(record(ID, NOTE))
+    previous = load_previous_versions(
+        [str(tmp_path / "exported"), str(previous_template)]
+    )
+    assert previous == {"orders-value": [record(ID), record(ID, NOTE)]}
+    schemas = get_template_schemas(json.loads(previous_template.read_text()))
+    assert schemas["orders-value"].compatibility == "BACKWARD"
+
+    new_schemas = {
+        "orders-value": TemplateSchema(
+            "orders-value", "AVRO", "BACKWARD_TRANSITIVE", record(ID, NOTE_REQUIRED)
+        ),
+        "new-value": TemplateSchema("new-value", "AVRO", "BACKWARD", record(ID)),
+    }
+    results = check_schemas_compatibility(new_schemas, previous)
+    assert [(result.subject, result.versions_count) for result in results] == [
+        ("orders-value", 2)
+    ]
+    assert len(results[0].errors) == 2
+
+
+def test_cli_checks_before_uploading_to_fixed_s3_keys(tmp_path, monkeypatch):
+    local_s3 = LocalS3()
+    monkeypatch.setattr("boto3.session.Session", lambda: local_s3)
+    schema_path = tmp_path / "orders.avsc"
+    definition_path = tmp_path / "kafka.yaml"
+    definition_path.write_text(
+        yaml.dump(
+            {
+                "Globals": {"BootstrapServers": "broker:9092"},
+                "Topics": {
+                    "FunctionName": "topics-fn",
+                    "ReplicationFactor": 3,
+                    "Topics": [
+                        {
+                            "Name": "orders",
+                            "PartitionsCount": 3,
+                            "Schema": {
+                                "Value": {
+                                    "Serializer": "AVRO",
+                                    "CompatibilityMode": "BACKWARD",
+                                    "Definition": str(schema_path),
+                                }
+                            },
+                        }
+                    ],
+                },
+                "Schemas": {
+                    "FunctionName": "schemas-fn",
+                    "RegistryUrl": "http://registry:8081",
+                    "RegistryUserInfo": "user:password",
+                    "S3Store": {"BucketName": "bucket", "PrefixPath": "schemas/"},
+                },
+            }
+        )
+    )
+
+    def render(output_name: str, *options: str) -> int:
+        monkeypatch.setattr(
+            sys,
+            "argv",
+            ["cli", "-f", str(definition_path), "-o", str(tmp_path / output_name)]
+            + list(options),
+        )
+        return cli.main()
+
+    schema_path.write_text(record(ID))
+    assert render("previous.json") == 0
+    (stored_key,) = set(local_s3.puts)
+    previous = ["--check-compatibility", str(tmp_path / "previous.json")]
+
+    schema_path.write_text(record(ID, NOTE_REQUIRED))
+    assert render("incompatible.json", *previous) == 1
+    assert not (tmp_path / "incompatible.json").exists()
+    assert local_s3.objects[("bucket", stored_key)] == record(ID).encode()
+
+    schema_path.write_text(record(ID, NOTE))
+    assert render("compatible.json", *previous) == 0
+    assert set(local_s3.puts) == {stored_key}
+    assert local_s3.objects[("bucket", stored_key)] == record(ID, NOTE).encode()
@@ -0,0 +1,39 @@
+"""Tests the AdminClient pool reuse and eviction"""
+
+from cfn_kafka_admin.kafka_resources.client_pool import (
+    AdminClientPool,
+    cluster_config_key,
+    redact_cluster_config,
+)
+
+
+def test_cluster_config_key_redacts_secrets():
+    settings = {
+        "bootstrap.servers": "localhost:1",
+        "sasl.username": "user",
+        "sasl.password": "secret-value",
+        "client.id": "LAMBDA_TOPIC_CREATE",
+    }
+    redacted = redact_cluster_config(settings)
+    assert "client.id" not in redacted
+    assert redacted["sasl.password"] != "secret-value"
+    assert cluster_config_key(settings) == cluster_config_key(
+        {**settings, "client.id": "LAMBDA_ACLs_DELETE"}
+    )
+    assert cluster_config_key(settings) != cluster_config_key(
+        {**settings, "sasl.password": "rotated"}
+    )
+
+
+def test_pool_reuses_and_evicts_clients():
+    pool = AdminClientPool(ttl=600, health_check_after=600)
+    settings = {"bootstrap.servers": "localhost:1"}
+    client = pool.get(settings, "TOPIC", "CREATE", "topic-a")
+    assert pool.get(dict(settings), "TOPIC", "UPDATE", "topic-b") is client
+    assert len(pool.clients) == 1
+    pool.ttl = -1
+    new_client = pool.get(settings, "TOPIC", "DELETE", "topic-a")
+    assert new_client is not client
+    assert len(pool.clients) == 1
+    pool.clear()
+    assert not pool.clients
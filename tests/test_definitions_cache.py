@@ -0,0 +1,90 @@
+"""Tests the on-disk cache of the validated definition files"""
+
+import os
+import shutil
+
+from cfn_kafka_admin import definitions_cache
+from cfn_kafka_admin.cfn_kafka_admin import KafkaStack, load_definition_file
+from cfn_kafka_admin.definitions_cache import DefinitionsCache
+
+DEFINITION = """
+Globals:
+  BootstrapServers: broker:9092
+Topics:
+  FunctionName: topics-fn
+  ReplicationFactor: 3
+  Topics:
+    - Name: topic-a
+      PartitionsCount: 3
+      Settings:
+        cleanup.policy: compact
+ACLs:
+  FunctionName: acls-fn
+  Policies:
+    - Resource: topic-a
+      Principal: User:a
+      ResourceType: TOPIC
+      Action: READ
+      Effect: ALLOW
+"""
+
+
+def test_cached_content_matches_validated_content(tmp_path):
+    file_path = tmp_path / "definition.yaml"
+    file_path.write_text(DEFINITION)
+    cache = DefinitionsCache(str(tmp_path / "cache"))
+    content = load_definition_file(str(file_path), cache)
+    assert len(list(cache.cache_dir.glob("*.bin"))) == 1
+    assert cache.get(cache.get_key(DEFINITION)) == content
+    assert load_definition_file(str(file_path), cache) == content
+    assert load_definition_file(str(file_path)) == content
+
+    cold_stack = KafkaStack([str(file_path)], cache=cache)
+    warm_stack = KafkaStack([str(file_path)], cache=cache)
+    for stack in (cold_stack, warm_stack):
+        stack.render_topics()
+        stack.render_acls()
+    assert cold_stack.template.to_json() == warm_stack.template.to_json()
+
+
+def test_key_depends_on_content():
+    assert DefinitionsCache.get_key(DEFINITION) == DefinitionsCache.get_key(DEFINITION)
+    assert DefinitionsCache.get_key(DEFINITION) != DefinitionsCache.get_key(
+        DEFINITION.replace("topic-a", "topic-b")
+    )
+
+
+def test_lru_eviction(tmp_path):
+    cache = DefinitionsCache(str(tmp_path), max_size=1)
+    for index in range(3):
+        cache.set(f"key-{index}", {"Index": index, "Padding": "x" * 1024})
+        os.utime(cache.get_entry_path(f"key-{index}"), (index, index))
+    entry_size = cache.get_entry_path("key-0").stat().st_size
+    cache.max_size = entry_size * 2
+    cache.get("key-0")
+    assert cache.evict() == 1
+    assert cache.get("key-1") is None
+    assert cache.get("key-0") == {"Index": 0, "Padding": "x" * 1024}
+    assert cache.get("key-2") is not None
+
+
+def test_schema_version_depends_on_all_the_specs(tmp_path, monkeypatch):
+    specs_dir = tmp_path / "specs"
+    shutil.copytree(definitions_cache.SPECS_DIR, specs_dir)
+    models_path = tmp_path / "admin.py"
+    shutil.copy(definitions_cache.MODELS_PATH, models_path)
+    monkeypatch.setattr(definitions_cache, "SPECS_DIR", specs_dir)
+    monkeypatch.setattr(definitions_cache, "MODELS_PATH", models_path)
+
+    def get_schema_version() -> str:
+        definitions_cache.get_schema_version.cache_clear()
+        return definitions_cache.get_schema_version()
+
+    versions = {get_schema_version()}
+    topic_spec = specs_dir / "ews-kafka-topic.json"
+    topic_spec.write_text(topic_spec.read_text() + "\n")
+    versions.add(get_schema_version())
+    models_path.write_text(models_path.read_text() + "\n")
+    versions.add(get_schema_version())
+    definitions_cache.get_schema_version.cache_clear()
+    assert len(versions) == 3
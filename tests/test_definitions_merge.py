@@ -0,0 +1,93 @@
+"""Tests the incremental merge of the definition files"""
+
+from cfn_kafka_admin.cfn_kafka_admin import (
+    DefinitionsMerger,
+    Model,
+    merge_contents,
+    validate_definition_content,
+)
+
+
+def set_topic(name: str, partitions: int = 3) -> dict:
+    return {"Name": name, "PartitionsCount": partitions}
+
+
+def set_policy(resource: str, principal: str = "User:toto") -> dict:
+    return {
+        "Resource": resource,
+        "Principal": principal,
+        "ResourceType": "TOPIC",
+        "Action": "READ",
+        "Effect": "ALLOW",
+    }
+
+
+def set_files_contents(files_count: int, topics_per_file: int) -> list:
+    contents: list = [
+        {
+            "Globals": {"BootstrapServers": "broker:9092"},
+            "Schemas": {"RegistryUrl": "http://registry:8081"},
+        }
+    ]
+    for file_index in range(files_count):
+        contents.append(
+            {
+                "Topics": {
+                    "FunctionName": f"topics-{file_index}",
+                    "ReplicationFactor": 3,
+                    "Topics": [
+                        set_topic(f"topic-{file_index}-{index}")
+                        for index in range(topics_per_file)
+                    ],
+                },
+                "ACLs": {
+                    "FunctionName": "acls",
+                    "Policies": [
+                        set_policy(f"topic-{file_index}-{index}")
+                        for index in range(topics_per_file)
+                    ],
+                },
+            }
+        )
+    return contents
+
+
+def test_merger_matches_merge_contents():
+    contents = set_files_contents(5, 4)
+    contents.append(
+        {
+            "Schemas": {"CompatibilityMode": "BACKWARD"},
+            "Topics": {
+                "ReplicationFactor": 3,
+                "Topics": [
+                    set_topic("topic-1-1", 12),
+                    set_topic("new-topic"),
+                    set_topic("topic-0-0", 6),
+                    set_topic("new-topic", 9),
+                ],
+            },
+            "ACLs": {"Policies": [set_policy("topic-1-1"), set_policy("new-topic")]},
+        }
+    )
+    contents.append({"Topics": {"FunctionName": "ignored-without-topics"}})
+
+    final_content = {"Globals": {}, "Topics": {}, "ACLs": {}}
+    merger = DefinitionsMerger()
+    for content in contents:
+        final_content = merge_contents(final_content, content, extend_all=True)
+        merger.merge(validate_definition_content(content), validated=True)
+    assert merger.content == final_content
+    assert Model.parse_obj(merger.content) == Model.parse_obj(final_content)
+
+
+def test_merger_1000_files_20k_topics():
+    contents = [
+        validate_definition_content(content)
+        for content in set_files_contents(1_000, 20)
+    ]
+    merger = DefinitionsMerger()
+    for content in contents:
+        merger.merge(content, validated=True)
+    merged = merger.content
+    assert len(merged["Topics"]["Topics"]) == 20_000
+    assert len(merged["ACLs"]["Policies"]) == 20_000
@@ -0,0 +1,114 @@
+"""Tests rendering again the template after definition files changed, as with --watch"""
+
+import json
+import os
+import sys
+
+import pytest
+import yaml
+
+from cfn_kafka_admin import cli
+from cfn_kafka_admin.cfn_kafka_admin import KafkaStack
+
+
+def set_definition(topics: list, partitions: int = 3) -> dict:
+    return {
+        "Topics": {
+            "FunctionName": "topics-fn",
+            "ReplicationFactor": 3,
+            "Topics": [
+                {"Name": name, "PartitionsCount": partitions} for name in topics
+            ],
+        },
+        "ACLs": {
+            "FunctionName": "acls-fn",
+            "Policies": [
+                {
+                    "Resource": name,
+                    "Principal": "User:app",
+                    "ResourceType": "TOPIC",
+                    "Action": "READ",
+                    "Effect": "ALLOW",
+                }
+                for name in topics
+            ],
+        },
+    }
+
+
+def render(stack: KafkaStack, topic_sets_count: int) -> str:
+    stack.render_topics(topic_sets_count)
+    stack.render_acls()
+    return stack.template.to_json()
+
+
+@pytest.mark.parametrize("topic_sets_count", [0, 2])
+def test_reload_files_matches_full_render(tmp_path, topic_sets_count):
+    globals_path = tmp_path / "globals.yaml"
+    globals_path.write_text(yaml.dump({"Globals": {"BootstrapServers": "b:9092"}}))
+    first_path = tmp_path / "first.yaml"
+    first_path.write_text(yaml.dump(set_definition(["topic-a", "topic-b"])))
+    second_path = tmp_path / "second.yaml"
+    second_path.write_text(yaml.dump(set_definition(["topic-c", "topic-d"])))
+    files_paths = [str(globals_path), str(first_path), str(second_path)]
+
+    stack = KafkaStack(files_paths)
+    render(stack, topic_sets_count)
+    unchanged_resources = {
+        title: resource
+        for title, resource in stack.template.resources.items()
+        if title in ("Topica", "Topicb", "TopicSet0001")
+    }
+    assert unchanged_resources
+
+    second_path.write_text(
+        yaml.dump(set_definition(["topic-c", "topic-d", "topic-e"], partitions=6))
+    )
+    stack.reload_files([str(second_path)])
+    assert render(stack, topic_sets_count) == render(
+        KafkaStack(files_paths), topic_sets_count
+    )
+    for title, resource in unchanged_resources.items():
+        assert stack.template.resources[title] is resource
+
+
+def test_watch_renders_changed_schema_files(tmp_path, monkeypatch):
+    schema_path = tmp_path / "orders.avsc"
+    schema_path.write_text(json.dumps({"type": "string"}))
+    definition = set_definition(["orders", "payments"])
+    definition["Topics"]["Topics"][0]["Schema"] = {
+        "Value": {"Serializer": "AVRO", "Definition": str(schema_path)}
+    }
+    definition["Globals"] = {"BootstrapServers": "b:9092"}
+    definition["Schemas"] = {
+        "FunctionName": "schemas-fn",
+        "RegistryUrl": "http://registry:8081",
+        "RegistryUserInfo": "user:password",
+    }
+    definition_path = tmp_path / "definition.yaml"
+    definition_path.write_text(yaml.dump(definition))
+    output_path = tmp_path / "output.json"
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        ["cli", "-f", str(definition_path), "-o", str(output_path), "--watch"],
+    )
+    polls: list = []
+
+    def sleep(interval):
+        polls.append(interval)
+        if len(polls) > 1:
+            raise KeyboardInterrupt
+        schema_path.write_text(json.dumps({"type": "long"}))
+        stat = os.stat(schema_path)
+        os.utime(schema_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000))
+
+    monkeypatch.setattr(cli, "sleep", sleep)
+    assert cli.main() == 0
+    resources = json.loads(output_path.read_text())["Resources"]
+    definitions = [
+        resource["Properties"]["Definition"]
+        for resource in resources.values()
+        if resource["Type"] == "Custom::KafkaSchema"
+    ]
+    assert definitions == [json.dumps({"type": "long"})]
@@ -0,0 +1,93 @@
+"""Tests that the rendered template does not depend on the python hash seed"""
+
+import os
+import subprocess
+import sys
+
+import yaml
+
+DEFINITIONS: list = [
+    {
+        "Globals": {"BootstrapServers": "broker:9092"},
+        "Topics": {
+            "FunctionName": "topics-fn",
+            "ReplicationFactor": 3,
+            "Topics": [
+                {"Name": f"topic-{index}", "PartitionsCount": 3} for index in range(5)
+            ],
+        },
+        "ACLs": {
+            "FunctionName": "acls-fn",
+            "Policies": [
+                {
+                    "Resource": f"topic-{index}",
+                    "Principal": f"User:app-{index % 3}",
+                    "ResourceType": "TOPIC",
+                    "Action": action,
+                    "Effect": "ALLOW",
+                }
+                for index in range(5)
+                for action in ("READ", "WRITE", "DESCRIBE")
+            ],
+        },
+    },
+    {
+        "ACLs": {
+            "FunctionName": "acls-fn",
+            "Policies": [
+                {
+                    "Resource": "grp-",
+                    "Principal": f"User:app-{index}",
+                    "ResourceType": "GROUP",
+                    "PatternType": "PREFIXED",
+                    "Action": "READ",
+                    "Effect": "ALLOW",
+                }
+                for index in range(3)
+            ]
+            + [
+                {
+                    "Resource": "topic-0",
+                    "Principal": "User:app-0",
+                    "ResourceType": "TOPIC",
+                    "Action": "READ",
+                    "Effect": "ALLOW",
+                }
+            ],
+        },
+    },
+]
+
+
+def render(files_paths: list, output_path, hash_seed: str, jobs: int = 1) -> bytes:
+    command = [sys.executable, "-m", "cfn_kafka_admin.cli", "-o", str(output_path)]
+    command += ["--jobs", str(jobs)]
+    for file_path in files_paths:
+        command += ["-f", str(file_path)]
+    subprocess.run(command, check=True, env=dict(os.environ, PYTHONHASHSEED=hash_seed))
+    return output_path.read_bytes()
+
+
+def write_definitions(tmp_path) -> list:
+    files_paths: list = []
+    for index, definition in enumerate(DEFINITIONS):
+        file_path = tmp_path / f"definition-{index}.yaml"
+        file_path.write_text(yaml.dump(definition))
+        files_paths.append(file_path)
+    return files_paths
+
+
+def test_render_is_stable_across_hash_seeds(tmp_path):
+    files_paths = write_definitions(tmp_path)
+    outputs = {
+        render(files_paths, tmp_path / f"template-{seed}.json", seed)
+        for seed in ("0", "1", "42", "1234")
+    }
+    assert len(outputs) == 1
+
+
+def test_parallel_render_matches_serial(tmp_path):
+    files_paths = write_definitions(tmp_path)
+    assert render(files_paths, tmp_path / "serial.json", "0") == render(
+        files_paths, tmp_path / "parallel.json", "0", jobs=2
+    )
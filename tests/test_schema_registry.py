@@ -0,0 +1,222 @@
+"""Tests skipping the registry writes when the schema is already the latest version, and the clients reuse"""
+
+import json
+
+import pytest
+from kafka_schema_registry_admin.client_wrapper.errors import (
+    NotFoundException,
+    UnauthorizedException,
+)
+
+from cfn_kafka_admin.lambda_functions import schemas
+from cfn_kafka_admin.schema_registry import (
+    REGISTRY_CLIENTS,
+    SUBJECTS_CACHE,
+    CachedRegistry,
+    RegistryClientsCache,
+    get_schema_fingerprint,
+    registry_client_key,
+)
+
+REGISTRY_URL = "http://registry:8081"
+SCHEMA = {"type": "record", "name": "test", "fields": [{"name": "a", "type": "int"}]}
+
+
+class RegistryResponse:
+    def __init__(self, content: dict):
+        self.content = content
+
+    def json(self) -> dict:
+        return self.content
+
+
+class LocalRegistry:
+    """In-memory stand-in of the Schema Registry operations used by the provider"""
+
+    def __init__(self):
+        self.versions: dict[str, list[str]] = {}
+        self.calls: list[str] = []
+        self.clients_count = 0
+        self.unauthorized = False
+
+    def get_subject_version_id(self, subject_name, version_id="latest"):
+        self.calls.append("get_latest")
+        if self.unauthorized:
+            raise UnauthorizedException(401, ((), {"error_code": 401}))
+        if subject_name not in self.versions:
+            raise NotFoundException(404, ((), {"error_code": 40401}))
+        versions = self.versions[subject_name]
+        return RegistryResponse(
+            {
+                "subject": subject_name,
+                "id": len(versions),
+                "version": len(versions),
+                "schema": versions[-1],
+            }
+        )
+
+    def post_subject_schema_version(self, subject_name, definition, schema_type=None):
+        self.calls.append("register")
+        versions = self.versions.setdefault(subject_name, [])
+        if definition in versions:
+            version = versions.index(definition) + 1
+            return RegistryResponse(
+                {"subject": subject_name, "id": version, "version": version}
+            )
+        versions.append(definition)
+        return RegistryResponse({"id": len(versions)})
+
+    def post_compatibility_subject_versions(
+        self, subject_name, definition, schema_type=None
+    ):
+        self.calls.append("compatibility")
+        return RegistryResponse({"is_compatible": True})
+
+    def put_compatibility_subject_config(self, subject_name, compatibility):
+        self.calls.append("config")
+
+
+@pytest.fixture
+def registry(monkeypatch) -> LocalRegistry:
+    local_registry = LocalRegistry()
+
+    def new_client(*args, **kwargs) -> LocalRegistry:
+        local_registry.clients_count += 1
+        return local_registry
+
+    monkeypatch.setattr(schemas, "SchemaRegistry", new_client)
+    SUBJECTS_CACHE.clear()
+    REGISTRY_CLIENTS.clear()
+    yield local_registry
+    SUBJECTS_CACHE.clear()
+    REGISTRY_CLIENTS.clear()
+
+
+def run_provider(
+    request_type: str, definition: dict, status: str = "SUCCESS", **properties
+) -> schemas.KafkaSchema:
+    provider = schemas.KafkaSchema()
+    provider.set_request(
+        {
+            "RequestType": request_type,
+            "StackId": "stack",
+            "RequestId": "request",
+            "LogicalResourceId": "Schema",
+            "PhysicalResourceId": "topic-value",
+            "ResourceProperties": {
+                "Subject": "topic-value",
+                "Serializer": "AVRO",
+                "CompatibilityMode": "BACKWARD",
+                "Definition": json.dumps(definition),
+                "RegistryUrl": REGISTRY_URL,
+                **properties,
+            },
+        },
+        None,
+    )
+    getattr(provider, request_type.lower())()
+    assert provider.status == status, provider.reason
+    return provider
+
+
+def test_fingerprint_ignores_keys_order_and_whitespaces():
+    reordered = json.dumps(dict(reversed(list(SCHEMA.items()))), indent=2)
+    assert get_schema_fingerprint(json.dumps(SCHEMA), "AVRO") == (
+        get_schema_fingerprint(reordered, None)
+    )
+    assert get_schema_fingerprint(json.dumps(SCHEMA), "JSON") != (
+        get_schema_fingerprint(json.dumps(SCHEMA), "AVRO")
+    )
+
+
+def test_create_then_unchanged_updates(registry):
+    run_provider("Create", SCHEMA)
+    assert registry.calls == ["get_latest", "register", "config"]
+    registry.calls.clear()
+    provider = run_provider("Update", SCHEMA)
+    assert registry.calls == []
+    assert provider.get_attribute("Id") == 1
+    SUBJECTS_CACHE.clear()
+    run_provider("Update", SCHEMA)
+    assert registry.calls == ["get_latest"]
+
+
+def test_changed_schema_is_checked_and_registered(registry):
+    run_provider("Create", SCHEMA)
+    registry.calls.clear()
+    changed = {**SCHEMA, "doc": "changed"}
+    provider = run_provider("Update", changed)
+    assert registry.calls == ["compatibility", "register"]
+    assert provider.get_attribute("Id") == 2
+    registry.calls.clear()
+    run_provider("Update", changed)
+    assert registry.calls == []
+
+
+def test_older_version_is_not_cached_as_latest(registry):
+    run_provider("Create", SCHEMA)
+    run_provider("Update", {**SCHEMA, "doc": "changed"})
+    registry.calls.clear()
+    run_provider("Update", SCHEMA)
+    assert registry.calls == ["compatibility", "register"]
+    registry.calls.clear()
+    run_provider("Update", SCHEMA)
+    assert registry.calls == ["get_latest", "compatibility", "register"]
+
+
+def test_registry_client_reused_by_url_and_credentials(registry):
+    run_provider("Create", SCHEMA)
+    run_provider("Update", {**SCHEMA, "doc": "changed"})
+    assert registry.clients_count == 1
+    run_provider("Update", SCHEMA, RegistryUsername="user", RegistryPassword="pass")
+    assert registry.clients_count == 2
+    assert len(REGISTRY_CLIENTS.clients) == 2
+
+
+def test_registry_client_dropped_on_auth_error(registry):
+    run_provider("Create", SCHEMA)
+    SUBJECTS_CACHE.clear()
+    registry.unauthorized = True
+    run_provider("Update", SCHEMA, status="FAILED")
+    # The cached client, then the new client of the retry, are rejected
+    assert registry.clients_count == 2
+    assert REGISTRY_CLIENTS.clients == {}
+    registry.unauthorized = False
+    run_provider("Update", SCHEMA)
+    assert registry.clients_count == 3
+
+
+def test_rotated_secret_retried_with_a_new_client(registry, monkeypatch):
+    run_provider("Create", SCHEMA)
+    SUBJECTS_CACHE.clear()
+    registry.unauthorized = True
+
+    def new_client(*args, **kwargs) -> LocalRegistry:
+        registry.clients_count += 1
+        registry.unauthorized = False
+        return registry
+
+    monkeypatch.setattr(schemas, "SchemaRegistry", new_client)
+    provider = run_provider("Update", SCHEMA)
+    assert registry.calls[-2:] == ["get_latest", "get_latest"]
+    assert registry.clients_count == 2
+    assert provider.get_attribute("Id") == 1
+    assert len(REGISTRY_CLIENTS.clients) == 1
+
+
+def test_new_client_not_retried_on_auth_error(registry):
+    registry.unauthorized = True
+    run_provider("Create", SCHEMA, status="FAILED")
+    assert registry.clients_count == 1
+    assert registry.calls == ["get_latest"]
+
+
+def test_registry_client_lifetime():
+    clients = RegistryClientsCache(ttl=60)
+    client_key = registry_client_key(REGISTRY_URL, "user", "pass")
+    first = clients.get(client_key, lambda: CachedRegistry(object(), REGISTRY_URL))
+    assert clients.get(client_key, lambda: None) is first
+    first.created_at -= 61
+    second = clients.get(client_key, lambda: CachedRegistry(object(), REGISTRY_URL))
+    assert second is not first
+    assert client_key != registry_client_key(REGISTRY_URL, "user", "other")
@@ -0,0 +1,94 @@
+"""Tests the caches of the schemas files definitions and of the metadata added to them"""
+
+import json
+import os
+
+import yaml
+
+from cfn_kafka_admin.cfn_kafka_admin import KafkaStack
+
+SCHEMA = {"type": "record", "name": "shared", "fields": [], "doc": "From the file"}
+GLOBAL_METADATA = {"doc": "Global doc", "owner": {"team": "platform"}}
+
+
+def set_definition(tmp_path, topics_count: int = 10) -> str:
+    schema_path = tmp_path / "shared.avsc"
+    schema_path.write_text(json.dumps(SCHEMA))
+    definition_path = tmp_path / "definition.yaml"
+    definition_path.write_text(
+        yaml.dump(
+            {
+                "Globals": {"BootstrapServers": "broker:9092"},
+                "Topics": {
+                    "FunctionName": "topics-fn",
+                    "ReplicationFactor": 3,
+                    "Topics": [
+                        {
+                            "Name": f"topic-{index}",
+                            "PartitionsCount": 3,
+                            "Schema": {
+                                "Value": {
+                                    "Serializer": "AVRO",
+                                    "Definition": str(schema_path),
+                                    "Metadata": (
+                                        {"owner": {"contact": "team@example.com"}}
+                                        if index % 2
+                                        else None
+                                    ),
+                                }
+                            },
+                        }
+                        for index in range(topics_count)
+                    ],
+                },
+                "Schemas": {
+                    "FunctionName": "schemas-fn",
+                    "RegistryUrl": "http://registry:8081",
+                    "RegistryUserInfo": "user:password",
+                    "Metadata": GLOBAL_METADATA,
+                },
+            }
+        )
+    )
+    return str(definition_path)
+
+
+def get_definitions(stack: KafkaStack) -> dict:
+    return {
+        title: json.loads(resource["Properties"]["Definition"])
+        for title, resource in stack.template.to_dict()["Resources"].items()
+        if resource["Type"] == "Custom::KafkaSchema"
+    }
+
+
+def test_metadata_merged_once_per_pair(tmp_path):
+    stack = KafkaStack([set_definition(tmp_path)])
+    stack.render_topics()
+    assert len(stack.schemas_files) == 1
+    assert len(stack.schemas_metadata) == 2
+    assert len(stack.schemas_definitions) == 2
+    assert stack.model.Schemas.Metadata == GLOBAL_METADATA
+    for title, definition in get_definitions(stack).items():
+        index = int(title[len("Topic") :].split("AVRO")[0])
+        assert definition["doc"] == "From the file"
+        if index % 2:
+            assert definition["owner"] == {
+                "team": "platform",
+                "contact": "team@example.com",
+            }
+        else:
+            assert definition["owner"] == {"team": "platform"}
+
+
+def test_schema_file_parsed_again_on_change(tmp_path):
+    stack = KafkaStack([set_definition(tmp_path, topics_count=2)])
+    schema_path = str(tmp_path / "shared.avsc")
+    definition = stack.get_schema_file_definition(schema_path)
+    assert stack.get_schema_file_definition(schema_path) is definition
+    with open(schema_path, "w") as schema_fd:
+        schema_fd.write(json.dumps({**SCHEMA, "name": "changed"}))
+    mtime_ns = os.stat(schema_path).st_mtime_ns + 1_000_000_000
+    os.utime(schema_path, ns=(mtime_ns, mtime_ns))
+    assert (
+        json.loads(stack.get_schema_file_definition(schema_path))["name"] == "changed"
+    )
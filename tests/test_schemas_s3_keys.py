@@ -0,0 +1,25 @@
+"""Tests the content-addressed S3 keys of the schemas definitions"""
+
+from cfn_kafka_admin.cfn_kafka_admin import (
+    canonical_schema_definition,
+    get_content_addressed_key,
+)
+
+
+def test_content_addressed_key_is_stable():
+    definition = '{"type": "record", "name": "test", "fields": []}'
+    reordered = '{"name":"test",  "fields":[], "type":"record"}'
+    assert canonical_schema_definition(definition) == canonical_schema_definition(
+        reordered
+    )
+    key = get_content_addressed_key("schemas/", definition)
+    assert key == get_content_addressed_key("schemas/", reordered)
+    assert key.startswith("schemas/") and key.endswith(".json")
+    assert key != get_content_addressed_key(
+        "schemas/", '{"type": "record", "name": "other", "fields": []}'
+    )
+
+
+def test_non_json_definition_is_kept():
+    assert canonical_schema_definition("not json") == "not json"
+    assert get_content_addressed_key(None, "not json").endswith(".json")
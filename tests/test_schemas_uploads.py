@@ -0,0 +1,117 @@
+"""Tests the deduplicated, parallel uploads of the schemas definitions to S3"""
+
+import hashlib
+import io
+import json
+import threading
+
+import yaml
+from botocore.exceptions import ClientError
+
+from cfn_kafka_admin.cfn_kafka_admin import KafkaStack
+from cfn_kafka_admin.schemas_uploads import SchemasUploader
+
+SHARED_SCHEMA = {"type": "record", "name": "shared", "fields": []}
+
+
+class LocalS3:
+    """In-memory stand-in of the S3 client operations used for the uploads"""
+
+    def __init__(self):
+        self.objects: dict[tuple[str, str], bytes] = {}
+        self.puts: list[str] = []
+        self.lock = threading.Lock()
+
+    def head_object(self, Bucket: str, Key: str) -> dict:
+        if (Bucket, Key) not in self.objects:
+            raise ClientError({"Error": {"Code": "404"}}, "HeadObject")
+        return {"ETag": f'"{hashlib.md5(self.objects[(Bucket, Key)]).hexdigest()}"'}
+
+    def put_object(self, Bucket: str, Key: str, Body: bytes, ContentType: str):
+        with self.lock:
+            self.objects[(Bucket, Key)] = Body
+            self.puts.append(Key)
+
+    def get_object(self, Bucket: str, Key: str) -> dict:
+        return {"Body": io.BytesIO(self.objects[(Bucket, Key)])}
+
+    def client(self, service_name: str):
+        """Stands in for the boto3 Session as well"""
+        return self
+
+
+def test_uploader_dedupes_by_content():
+    local_s3 = LocalS3()
+    uploader = SchemasUploader(max_workers=4, s3_client=local_s3)
+    first_uri = uploader.add("bucket", "a.json", '{"type": "string"}')
+    assert uploader.add("bucket", "b.json", '{"type": "string"}') == first_uri
+    other_uri = uploader.add("bucket", "c.json", '{"type": "long"}')
+    assert other_uri != first_uri
+    assert sorted(uploader.upload()) == [first_uri, other_uri]
+    assert sorted(local_s3.puts) == ["a.json", "c.json"]
+
+    uploader.add("bucket", "a.json", '{"type": "string"}')
+    assert uploader.upload() == []
+    uploader.add("bucket", "a.json", '{"type": "int"}')
+    assert uploader.upload() == [first_uri]
+    assert local_s3.objects[("bucket", "a.json")] == b'{"type": "int"}'
+
+
+def test_uploader_skips_existing_content_addressed():
+    local_s3 = LocalS3()
+    local_s3.objects[("bucket", "existing.json")] = b'{"type": "string"}'
+    uploader = SchemasUploader(s3_client=local_s3)
+    uploader.add("bucket", "existing.json", '{"type": "string"}', skip_if_exists=True)
+    uploader.upload()
+    assert local_s3.puts == []
+
+
+def test_stack_uploads_shared_schema_once(tmp_path):
+    schema_path = tmp_path / "shared.avsc"
+    schema_path.write_text(json.dumps(SHARED_SCHEMA))
+    definition_path = tmp_path / "definition.yaml"
+    definition_path.write_text(
+        yaml.dump(
+            {
+                "Globals": {"BootstrapServers": "broker:9092"},
+                "Topics": {
+                    "FunctionName": "topics-fn",
+                    "ReplicationFactor": 3,
+                    "Topics": [
+                        {
+                            "Name": f"topic-{index}",
+                            "PartitionsCount": 3,
+                            "Schema": {
+                                "Value": {
+                                    "Serializer": "AVRO",
+                                    "Definition": str(schema_path),
+                                }
+                            },
+                        }
+                        for index in range(20)
+                    ],
+                },
+                "Schemas": {
+                    "FunctionName": "schemas-fn",
+                    "RegistryUrl": "http://registry:8081",
+                    "RegistryUserInfo": "user:password",
+                    "S3Store": {
+                        "BucketName": "schemas-bucket",
+                        "PrefixPath": "schemas/",
+                        "ContentAddressed": True,
+                    },
+                },
+            }
+        )
+    )
+    local_s3 = LocalS3()
+    stack = KafkaStack([str(definition_path)], upload_workers=4)
+    stack.schemas_uploader.s3_client = local_s3
+    stack.render_topics()
+    assert len(local_s3.puts) == 1
+    definitions = {
+        resource["Properties"]["Definition"]
+        for resource in stack.template.to_dict()["Resources"].values()
+        if resource["Type"] == "Custom::KafkaSchema"
+    }
+    assert definitions == {f"s3://schemas-bucket/{local_s3.puts[0]}"}
@@ -0,0 +1,77 @@
+"""Tests the compact render of the templates"""
+
+from copy import deepcopy
+
+from cfn_kafka_admin.lambda_functions.topic_sets import apply_default_settings
+from cfn_kafka_admin.template_compact import compact_template, dump_template
+
+BOOTSTRAP_SERVERS = (
+    "b-1.cluster.abcdef.c2.kafka.eu-west-1.amazonaws.com:9096,"
+    "b-2.cluster.abcdef.c2.kafka.eu-west-1.amazonaws.com:9096"
+)
+SASL_PASSWORD = "generated-password-" + "0123456789abcdef" * 6
+
+
+def set_template() -> dict:
+    resources: dict = {}
+    for set_index in range(10):
+        resources[f"TopicSet{set_index:04d}"] = {
+            "Type": "Custom::KafkaTopicSet",
+            "Properties": {
+                "BootstrapServers": BOOTSTRAP_SERVERS,
+                "SASLPassword": SASL_PASSWORD,
+                "SecurityProtocol": "SASL_SSL",
+                "Topics": [
+                    {
+                        "Name": f"topic-{set_index}-{index}",
+                        "PartitionsCount": 6,
+                        "Settings": {
+                            "cleanup.policy": "delete",
+                            "retention.ms": 86400000 * (1 + index % 2),
+                        },
+                    }
+                    for index in range(4)
+                ],
+            },
+        }
+    return {"Description": "test", "Resources": resources}
+
+
+def test_compact_template():
+    template = set_template()
+    original = deepcopy(template)
+    report = compact_template(template)
+    # Mappings values, unlike parameters defaults, are updated with the stack
+    assert template["Mappings"]["Connection"] == {
+        "BootstrapServers": {"Value": BOOTSTRAP_SERVERS},
+        "SASLPassword": {"Value": SASL_PASSWORD},
+    }
+    assert "Parameters" not in template
+    for title, resource in template["Resources"].items():
+        properties = resource["Properties"]
+        assert properties["BootstrapServers"] == {
+            "Fn::FindInMap": ["Connection", "BootstrapServers", "Value"]
+        }
+        assert properties["SASLPassword"] == {
+            "Fn::FindInMap": ["Connection", "SASLPassword", "Value"]
+        }
+        # Shorter than the reference
+        assert properties["SecurityProtocol"] == "SASL_SSL"
+        assert properties["DefaultSettings"] == {"cleanup.policy": "delete"}
+        apply_default_settings(properties)
+        assert (
+            properties["Topics"] == original["Resources"][title]["Properties"]["Topics"]
+        )
+    assert report.original_size == len(dump_template(original))
+    assert report.original_size - report.compact_size == sum(report.savings.values())
+    assert all(saved > 0 for saved in report.savings.values())
+
+
+def test_compact_template_single_topic_set():
+    template = set_template()
+    for resource in template["Resources"].values():
+        del resource["Properties"]["Topics"][1:]
+    compact_template(template)
+    for resource in template["Resources"].values():
+        assert "DefaultSettings" not in resource["Properties"]
+        assert resource["Properties"]["Topics"][0]["Settings"]
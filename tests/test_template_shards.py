@@ -0,0 +1,146 @@
+"""Tests splitting the rendered template into nested stacks"""
+
+import pytest
+import yaml
+from troposphere import Sub, Template
+
+from cfn_kafka_admin.cfn_kafka_admin import KafkaStack
+from cfn_kafka_admin.cfn_resources_definitions.custom import (
+    KafkaTopic,
+    KafkaTopicSchema,
+)
+from cfn_kafka_admin.template_shards import shard_template
+
+SERVICE_TOKEN = "arn:aws:lambda:eu-west-1:000000000000:function:kafka"
+
+
+def set_template(topics_count: int, deletion_policy: str = "Retain") -> Template:
+    template = Template("test")
+    for index in range(topics_count):
+        title = f"Topic{index:03d}"
+        template.add_resource(
+            KafkaTopic(
+                title,
+                DeletionPolicy=deletion_policy,
+                Name=f"topic-{index}",
+                PartitionsCount=1,
+                BootstrapServers="broker:9092",
+                ServiceToken=SERVICE_TOKEN,
+            )
+        )
+        if index % 3 == 0:
+            template.add_resource(
+                KafkaTopicSchema(
+                    f"{title}Schema",
+                    DeletionPolicy=deletion_policy,
+                    Subject=Sub(f"${{{title}.Name}}-value"),
+                    RegistryUrl="http://registry:8081",
+                    Serializer="AVRO",
+                    Definition='{"type": "string"}',
+                    CompatibilityMode="BACKWARD",
+                    ServiceToken=SERVICE_TOKEN,
+                )
+            )
+    return template
+
+
+def get_shards_titles(sharded) -> dict[str, set]:
+    return {
+        shard_title: set(shard["Resources"])
+        for shard_title, shard in sharded.shards.items()
+    }
+
+
+def test_shards_limits_and_groups():
+    template = set_template(100)
+    sharded = shard_template(template, max_resources=20)
+    shards_titles = get_shards_titles(sharded)
+    assert all(len(titles) <= 20 for titles in shards_titles.values())
+    assert set().union(*shards_titles.values()) == set(template.resources)
+    assert set(sharded.parent.resources) == set(sharded.shards)
+    for titles in shards_titles.values():
+        for title in titles:
+            if title.endswith("Schema"):
+                assert title[: -len("Schema")] in titles
+
+
+def test_shards_stable_on_change():
+    sharded = shard_template(set_template(100), max_resources=20)
+    changed = shard_template(set_template(101), max_resources=20)
+    assert len(changed.shards) == len(sharded.shards)
+    changed_shards = [
+        shard_title
+        for shard_title, shard in changed.shards.items()
+        if shard != sharded.shards.get(shard_title)
+    ]
+    assert len(changed_shards) == 1
+    assert "Topic100" in changed.shards[changed_shards[0]]["Resources"]
+
+
+def test_shards_over_limits():
+    with pytest.raises(ValueError):
+        shard_template(set_template(10), max_resources=1)
+    with pytest.raises(ValueError):
+        shard_template(set_template(100), max_resources=20, shards_count=1)
+
+
+def test_shards_count_required_with_delete_policy():
+    with pytest.raises(ValueError, match="Delete DeletionPolicy"):
+        shard_template(set_template(100, "Delete"), max_resources=20)
+    sharded = shard_template(
+        set_template(100, "Delete"), max_resources=40, shards_count=16
+    )
+    grown = shard_template(
+        set_template(150, "Delete"), max_resources=40, shards_count=16
+    )
+    for shard_title, shard in sharded.shards.items():
+        assert set(shard["Resources"]) <= set(grown.shards[shard_title]["Resources"])
+
+
+def test_stack_acls_depend_on_topics_shards(tmp_path):
+    definition_path = tmp_path / "definition.yaml"
+    topics = [f"topic-{index}" for index in range(30)]
+    definition_path.write_text(
+        yaml.dump(
+            {
+                "Globals": {"BootstrapServers": "broker:9092"},
+                "Topics": {
+                    "FunctionName": "topics-fn",
+                    "ReplicationFactor": 3,
+                    "Topics": [{"Name": name, "PartitionsCount": 3} for name in topics],
+                },
+                "ACLs": {
+                    "FunctionName": "acls-fn",
+                    "Policies": [
+                        {
+                            "Resource": name,
+                            "Principal": "User:app",
+                            "ResourceType": "TOPIC",
+                            "Action": "READ",
+                            "Effect": "ALLOW",
+                        }
+                        for name in topics[:5]
+                    ],
+                },
+            }
+        )
+    )
+    stack = KafkaStack([str(definition_path)])
+    stack.enable_sharding()
+    stack.render_topics()
+    stack.render_acls()
+    sharded = stack.get_sharded_template(max_resources=10)
+    acls_shards = [title for title in sharded.shards if title.startswith("Acls")]
+    assert acls_shards == ["AclsShard0000"]
+    acls = sharded.shards["AclsShard0000"]["Resources"]["ACLs"]
+    assert "DependsOn" not in acls
+    assert [policy["Resource"] for policy in acls["Properties"]["Policies"]] == topics[
+        :5
+    ]
+    topics_shards = {
+        shard_title
+        for shard_title, shard in sharded.shards.items()
+        for title in shard["Resources"]
+        if title in {stack.topics_r[name].title for name in topics[:5]}
+    }
+    assert set(sharded.parent.resources["AclsShard0000"].DependsOn) == topics_shards
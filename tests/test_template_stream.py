@@ -0,0 +1,100 @@
+"""Tests writing the template resources as they are rendered, with --stream"""
+
+import io
+import json
+
+import pytest
+import yaml
+
+from cfn_kafka_admin.cfn_kafka_admin import KafkaStack
+from cfn_kafka_admin.cfn_resources_definitions.custom import KafkaTopic
+from cfn_kafka_admin.template_stream import TemplateStreamWriter
+
+
+def set_definition(tmp_path) -> str:
+    definition_path = tmp_path / "definition.yaml"
+    topics = [f"topic-{index}" for index in range(5)]
+    definition_path.write_text(
+        yaml.dump(
+            {
+                "Globals": {"BootstrapServers": "broker:9092"},
+                "Topics": {
+                    "FunctionName": "topics-fn",
+                    "ReplicationFactor": 3,
+                    "Topics": [
+                        {
+                            "Name": name,
+                            "PartitionsCount": 3,
+                            "Settings": {"retention.ms": 86400000},
+                        }
+                        for name in topics
+                    ],
+                },
+                "ACLs": {
+                    "FunctionName": "acls-fn",
+                    "Policies": [
+                        {
+                            "Resource": name,
+                            "Principal": "User:app",
+                            "ResourceType": "TOPIC",
+                            "Action": action,
+                            "Effect": "ALLOW",
+                        }
+                        for name in topics + ["external-topic"]
+                        for action in ("READ", "WRITE")
+                    ],
+                },
+            }
+        )
+    )
+    return str(definition_path)
+
+
+@pytest.mark.parametrize("topic_sets_count", [0, 2])
+def test_stream_matches_template(tmp_path, topic_sets_count):
+    definition_path = set_definition(tmp_path)
+    stack = KafkaStack([definition_path])
+    stack.render_topics(topic_sets_count)
+    stack.render_acls()
+    template_json = stack.template.to_json()
+
+    output = io.StringIO()
+    KafkaStack([definition_path]).stream_template(output, topic_sets_count)
+    streamed = json.loads(output.getvalue())
+    assert streamed == json.loads(template_json)
+    # Only the resources order differs
+    assert (
+        json.dumps(streamed, indent=1, sort_keys=True, separators=(",", ": "))
+        == template_json
+    )
+
+
+def test_stream_validates_properties():
+    writer = TemplateStreamWriter(io.StringIO())
+    properties = {
+        "Name": "topic",
+        "PartitionsCount": 1,
+        "BootstrapServers": "broker:9092",
+        "ServiceToken": "arn:aws:lambda:eu-west-1:000000000000:function:topics",
+    }
+    writer.write_resource(KafkaTopic, "Topic", properties)
+    with pytest.raises(ValueError):
+        writer.write_resource(
+            KafkaTopic,
+            "OtherTopic",
+            {key: value for key, value in properties.items() if key != "Name"},
+        )
+    with pytest.raises(ValueError):
+        TemplateStreamWriter(io.StringIO()).write_resource(
+            KafkaTopic, "Topic", dict(properties, PartitionsCount=-1)
+        )
+
+
+def test_stream_empty_template():
+    output = io.StringIO()
+    writer = TemplateStreamWriter(output, "Description")
+    writer.close()
+    assert json.loads(output.getvalue()) == {
+        "Description": "Description",
+        "Resources": {},
+    }
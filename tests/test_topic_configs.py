@@ -0,0 +1,83 @@
+"""Tests the topic configs diff engine"""
+
+from confluent_kafka.admin import ConfigEntry, ConfigSource
+
+from cfn_kafka_admin.kafka_resources.topics.configs import (
+    diff_topic_configs,
+    normalize_config_value,
+    topic_definition_changed,
+)
+from cfn_kafka_admin.kafka_resources.topics.update import get_topic_config_changes
+
+
+def set_entry(
+    name: str, value: str, source=ConfigSource.DYNAMIC_TOPIC_CONFIG
+) -> ConfigEntry:
+    return ConfigEntry(
+        name,
+        value,
+        source=source,
+        is_default=source == ConfigSource.DEFAULT_CONFIG,
+    )
+
+
+def test_normalize_config_value():
+    assert normalize_config_value("preallocate", True) == "true"
+    assert normalize_config_value("preallocate", "True") == "true"
+    assert normalize_config_value("retention.ms", 1.0) == "1"
+    assert normalize_config_value("retention.ms", "86400000") == "86400000"
+    assert normalize_config_value("min.cleanable.dirty.ratio", "0.5") == "0.5"
+    assert normalize_config_value("min.cleanable.dirty.ratio", 1) == "1.0"
+    assert (
+        normalize_config_value("cleanup.policy", "delete, compact") == "compact,delete"
+    )
+
+
+def test_no_changes_for_equivalent_values():
+    topic_configs = {
+        "preallocate": set_entry("preallocate", "true"),
+        "retention.ms": set_entry("retention.ms", "1"),
+        "cleanup.policy": set_entry("cleanup.policy", "compact,delete"),
+    }
+    settings = {
+        "preallocate": True,
+        "retention.ms": 1.0,
+        "cleanup.policy": ["delete", "compact"],
+    }
+    assert diff_topic_configs("topic", topic_configs, settings) == []
+    assert get_topic_config_changes("topic", topic_configs, settings) == []
+
+
+def test_only_topic_overrides_are_deleted():
+    topic_configs = {
+        "retention.ms": set_entry("retention.ms", "1000"),
+        "min.insync.replicas": set_entry(
+            "min.insync.replicas", "2", ConfigSource.DYNAMIC_BROKER_CONFIG
+        ),
+        "segment.bytes": set_entry(
+            "segment.bytes", "1073741824", ConfigSource.DEFAULT_CONFIG
+        ),
+    }
+    changes = diff_topic_configs("topic", topic_configs, {"segment.bytes": 1073741824})
+    assert [(change.name, change.operation) for change in changes] == [
+        ("retention.ms", "DELETE")
+    ]
+
+
+def test_changed_value_is_set():
+    topic_configs = {"retention.ms": set_entry("retention.ms", "1000")}
+    entries = get_topic_config_changes("topic", topic_configs, {"retention.ms": 2000})
+    assert len(entries) == 1
+    assert entries[0].name == "retention.ms"
+    assert entries[0].value == "2000"
+
+
+def test_topic_definition_changed():
+    old_topic = {"PartitionsCount": "6", "Settings": {"retention.ms": "86400000"}}
+    assert not topic_definition_changed(
+        old_topic, {"PartitionsCount": 6, "Settings": {"retention.ms": 86400000}}
+    )
+    assert topic_definition_changed(
+        old_topic, {"PartitionsCount": 12, "Settings": {"retention.ms": 86400000}}
+    )
+    assert topic_definition_changed(old_topic, {"PartitionsCount": 6})
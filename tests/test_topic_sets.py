@@ -0,0 +1,235 @@
+"""Tests the topics sets assignment, and that the topics still declared in the stack are never deleted"""
+
+from concurrent.futures import Future
+
+import pytest
+import yaml
+from confluent_kafka import KafkaError, KafkaException
+
+from cfn_kafka_admin.cfn_kafka_admin import KafkaStack
+from cfn_kafka_admin.kafka_resources.topics import batch
+from cfn_kafka_admin.lambda_functions import topic_sets, topics
+
+TOPICS = [f"topic-{index:02d}" for index in range(20)]
+
+
+def render_sets(
+    tmp_path,
+    topics: list,
+    deletion_policy: str = "Retain",
+    function_name: str = "topics-fn",
+    topic_sets_count: int = 4,
+) -> dict:
+    definition_path = tmp_path / "definition.yaml"
+    definition_path.write_text(
+        yaml.dump(
+            {
+                "Globals": {"BootstrapServers": "broker:9092"},
+                "Topics": {
+                    "FunctionName": function_name,
+                    "DeletionPolicy": deletion_policy,
+                    "ReplicationFactor": 3,
+                    "Topics": [{"Name": name, "PartitionsCount": 3} for name in topics],
+                },
+            }
+        )
+    )
+    stack = KafkaStack([str(definition_path)])
+    stack.render_topics(topic_sets_count=topic_sets_count)
+    return stack.template.to_dict()["Resources"]
+
+
+def get_sets_topics(resources: dict) -> dict[str, set]:
+    return {
+        title: {topic["Name"] for topic in resource["Properties"]["Topics"]}
+        for title, resource in resources.items()
+    }
+
+
+def test_adding_or_removing_topics_does_not_move_the_others(tmp_path):
+    sets = get_sets_topics(render_sets(tmp_path, TOPICS))
+    assert len(sets) == 4
+    assert set.union(*sets.values()) == set(TOPICS)
+    added = get_sets_topics(render_sets(tmp_path, TOPICS + ["topic-new"]))
+    removed = get_sets_topics(render_sets(tmp_path, TOPICS[1:]))
+    for title, names in sets.items():
+        assert added[title] - {"topic-new"} == names
+        assert removed[title] == names - {TOPICS[0]}
+
+
+@pytest.mark.parametrize("deletion_policy", ["Retain", "Delete"])
+def test_removed_topics_policy_follows_topics_deletion_policy(
+    tmp_path, deletion_policy
+):
+    for resource in render_sets(tmp_path, TOPICS, deletion_policy).values():
+        assert resource["DeletionPolicy"] == deletion_policy
+        assert resource["Properties"]["RemovedTopicsPolicy"] == deletion_policy
+
+
+@pytest.mark.parametrize("topic_sets_count", [0, 4])
+def test_function_arn_is_the_service_token(tmp_path, topic_sets_count):
+    function_arn = "arn:aws:lambda:eu-west-1:000000000000:function:topics-fn"
+    resources = render_sets(
+        tmp_path, TOPICS, function_name=function_arn, topic_sets_count=topic_sets_count
+    )
+    assert resources
+    for resource in resources.values():
+        assert resource["Properties"]["ServiceToken"] == function_arn
+
+
+def set_template(topics: list) -> dict:
+    return {
+        "Type": "Custom::KafkaTopicSet",
+        "Properties": {
+            "Topics": [{"Name": name, "PartitionsCount": 1} for name in topics]
+        },
+    }
+
+
+@pytest.fixture
+def deleted(monkeypatch) -> list:
+    deleted_names: list = []
+
+    def delete_kafka_topics(names, cluster_info):
+        deleted_names.extend(names)
+        return {name: None for name in names}
+
+    monkeypatch.setattr(topic_sets, "delete_kafka_topics", delete_kafka_topics)
+    monkeypatch.setattr(topic_sets, "set_client_info", lambda provider: None)
+    return deleted_names
+
+
+def run_provider(
+    request_type: str, topics: list, old_topics: list = None, status: str = "SUCCESS"
+) -> topic_sets.KafkaTopicSet:
+    properties = {
+        "ServiceToken": "topics-fn",
+        "BootstrapServers": "broker:9092",
+        "RemovedTopicsPolicy": "Delete",
+        "Topics": [{"Name": name, "PartitionsCount": 1} for name in topics],
+    }
+    request = {
+        "RequestType": request_type,
+        "ResponseURL": "https://localhost",
+        "StackId": "arn:aws:cloudformation:eu-west-1:000000000000:stack/kafka/id",
+        "RequestId": "request",
+        "ResourceType": "Custom::KafkaTopicSet",
+        "LogicalResourceId": "TopicSet0001",
+        "PhysicalResourceId": "set-id",
+        "ResourceProperties": properties,
+    }
+    if old_topics is not None:
+        request["OldResourceProperties"] = {
+            **properties,
+            "Topics": [{"Name": name, "PartitionsCount": 1} for name in old_topics],
+        }
+    provider = topic_sets.KafkaTopicSet()
+    provider.set_request(request, None)
+    getattr(provider, request_type.lower())()
+    assert provider.status == status, provider.reason
+    return provider
+
+
+def test_deleted_set_retains_topics_moved_to_another_set(monkeypatch, deleted):
+    template = {
+        "Resources": {
+            "TopicSet0000": set_template(["topic-a"]),
+            "TopicB": {"Type": "Custom::KafkaTopic", "Properties": {"Name": "topic-b"}},
+        }
+    }
+    monkeypatch.setattr(topics, "get_stack_template", lambda stack_id: template)
+    run_provider("Delete", ["topic-a", "topic-b", "topic-c"])
+    assert deleted == ["topic-c"]
+
+
+def test_stack_deletion_deletes_the_set_topics(monkeypatch, deleted):
+    template = {"Resources": {"TopicSet0001": set_template(["a"])}}
+    monkeypatch.setattr(topics, "get_stack_template", lambda stack_id: template)
+    run_provider("Delete", ["topic-a", "topic-b"])
+    assert deleted == ["topic-a", "topic-b"]
+
+
+def test_topics_retained_when_template_cannot_be_read(monkeypatch, deleted):
+    def get_stack_template(stack_id):
+        raise PermissionError("cloudformation:GetTemplate")
+
+    monkeypatch.setattr(topics, "get_stack_template", get_stack_template)
+    run_provider("Delete", ["topic-a"])
+    assert deleted == []
+
+
+def test_removed_topics_moved_to_another_set_are_retained(monkeypatch, deleted):
+    template = {"Resources": {"TopicSet0000": set_template(["topic-b"])}}
+    monkeypatch.setattr(topics, "get_stack_template", lambda stack_id: template)
+    run_provider("Update", ["topic-a"], ["topic-a", "topic-b", "topic-c"])
+    assert deleted == ["topic-c"]
+
+
+def delete_topic_resource(monkeypatch, template: dict) -> list:
+    deleted_names: list = []
+    monkeypatch.setattr(topics, "get_stack_template", lambda stack_id: template)
+    monkeypatch.setattr(topics, "set_client_info", lambda provider: None)
+    monkeypatch.setattr(
+        topics,
+        "delete_topic",
+        lambda name, cluster_info: deleted_names.append(name),
+    )
+    provider = topics.KafkaTopic()
+    provider.set_request(
+        {
+            "RequestType": "Delete",
+            "ResponseURL": "https://localhost",
+            "StackId": "arn:aws:cloudformation:eu-west-1:000000000000:stack/kafka/id",
+            "RequestId": "request",
+            "ResourceType": "Custom::KafkaTopic",
+            "LogicalResourceId": "TopicA",
+            "PhysicalResourceId": "topic-a",
+            "ResourceProperties": {
+                "ServiceToken": "topics-fn",
+                "BootstrapServers": "broker:9092",
+                "Name": "topic-a",
+                "PartitionsCount": 1,
+            },
+        },
+        None,
+    )
+    provider.delete()
+    assert provider.status == "SUCCESS", provider.reason
+    return deleted_names
+
+
+def test_topic_resource_migrated_to_a_set_is_retained(monkeypatch):
+    template = {"Resources": {"TopicSet0000": set_template(["topic-a", "topic-b"])}}
+    assert delete_topic_resource(monkeypatch, template) == []
+
+
+def test_topic_resource_removed_from_the_stack_is_deleted(monkeypatch):
+    template = {"Resources": {"TopicSet0000": set_template(["topic-b"])}}
+    assert delete_topic_resource(monkeypatch, template) == ["topic-a"]
+
+
+def test_failed_create_deletes_the_created_topics(monkeypatch, deleted):
+    errors = {
+        "topic-b": KafkaException(KafkaError(KafkaError.INVALID_CONFIG)),
+        "topic-c": KafkaException(KafkaError(KafkaError.TOPIC_ALREADY_EXISTS)),
+    }
+
+    class AdminClient:
+        def create_topics(self, new_topics: list, validate_only: bool) -> dict:
+            futures: dict = {}
+            for new_topic in new_topics:
+                futures[new_topic.topic] = Future()
+                if new_topic.topic in errors:
+                    futures[new_topic.topic].set_exception(errors[new_topic.topic])
+                else:
+                    futures[new_topic.topic].set_result(None)
+            return futures
+
+    monkeypatch.setattr(batch, "get_pooled_admin_client", lambda *args: AdminClient())
+    provider = run_provider(
+        "Create", ["topic-a", "topic-b", "topic-c"], status="FAILED"
+    )
+    assert provider.physical_resource_id == "could-not-create"
+    assert "topic-b" in provider.reason
+    # topic-c existed before, and is not deleted
+    assert deleted == ["topic-a"]
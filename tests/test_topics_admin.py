@@ -8,6 +8,11 @@ from confluent_kafka import KafkaException
 from testcontainers.compose import DockerCompose
 
 from cfn_kafka_admin.kafka_resources import get_admin_client
+from cfn_kafka_admin.kafka_resources.topics.batch import (
+    create_kafka_topics,
+    delete_kafka_topics,
+    update_kafka_topics,
+)
 from cfn_kafka_admin.kafka_resources.topics.create import create_new_kafka_topic
 from cfn_kafka_admin.kafka_resources.topics.delete import delete_topic
 from cfn_kafka_admin.kafka_resources.topics.update import update_kafka_topic
@@ -171,3 +176,48 @@ def test_delete_non_existing_topic(compose_path):
         delete_topic("dummy-to-delete", cluster_settings)
         topics = list_topics(cluster_settings)
         assert "dummy-to-delete" not in topics
+
+
+def test_create_update_delete_topics_batch(compose_path):
+    with DockerCompose(
+        path.abspath(compose_path),
+        compose_file_name="docker-compose.yaml",
+        wait=True,
+        pull=True,
+    ) as kafka:
+        connection, sr_url = get_connection_details(kafka)
+        cluster_settings = {"bootstrap.servers": connection}
+        topics: list[dict] = [
+            {
+                "Name": f"dummy-batch-{count}",
+                "PartitionsCount": 1,
+                "ReplicationFactor": 1,
+            }
+            for count in range(0, 10)
+        ]
+        topics[0]["Settings"] = {"cleanup.policy": "compact"}
+        errors = create_kafka_topics(topics, cluster_settings)
+        assert not any(errors.values())
+        topics_list = list_topics(cluster_settings)
+        assert all(_topic["Name"] in topics_list for _topic in topics)
+        errors = create_kafka_topics(topics[:2], cluster_settings)
+        assert not any(errors.values())
+
+        topics[1]["PartitionsCount"] = 3
+        topics[2]["Settings"] = {"retention.ms": 3600000}
+        topics[3]["PartitionsCount"] = 0
+        errors = update_kafka_topics(topics, cluster_settings)
+        assert isinstance(errors["dummy-batch-3"], ValueError)
+        assert not any(
+            _error for _name, _error in errors.items() if _name != "dummy-batch-3"
+        )
+        topics_list = list_topics(cluster_settings)
+        assert len(topics_list["dummy-batch-1"].partitions) == 3
+
+        errors = delete_kafka_topics(
+            [_topic["Name"] for _topic in topics] + ["dummy-batch-missing"],
+            cluster_settings,
+        )
+        assert not any(errors.values())
+        topics_list = list_topics(cluster_settings)
+        assert not any(_topic["Name"] in topics_list for _topic in topics)
@@ -0,0 +1,120 @@
+"""Tests the topics configuration changes retries and errors reporting, without a Kafka cluster"""
+
+from concurrent.futures import Future
+
+import pytest
+from confluent_kafka import KafkaError, KafkaException
+from confluent_kafka.admin import AlterConfigOpType, ConfigEntry
+
+from cfn_kafka_admin.kafka_resources import topics
+from cfn_kafka_admin.kafka_resources.topics import update
+
+RETRIABLE = KafkaException(KafkaError(KafkaError.REQUEST_TIMED_OUT, retriable=True))
+INVALID = KafkaException(KafkaError(KafkaError.INVALID_CONFIG))
+
+
+class AdminClient:
+    """Fails the requests of the topics or config entries set in errors, at most the given number of times"""
+
+    def __init__(self, errors: dict):
+        self.errors = errors
+        self.requests: list = []
+
+    def incremental_alter_configs(self, resources: list) -> dict:
+        futures: dict = {}
+        for resource in resources:
+            entries = [entry.name for entry in resource.incremental_configs]
+            self.requests.append((resource.name, entries))
+            future = Future()
+            for key in [resource.name] + entries:
+                error, count = self.errors.get(key, (None, 0))
+                if count:
+                    self.errors[key] = (error, count - 1)
+                    future.set_exception(error)
+                    break
+            else:
+                future.set_result(None)
+            futures[resource] = future
+        return futures
+
+
+def set_entry(name: str) -> ConfigEntry:
+    return ConfigEntry(name, "1", incremental_operation=AlterConfigOpType.SET)
+
+
+@pytest.fixture(autouse=True)
+def no_sleep(monkeypatch):
+    monkeypatch.setattr(topics, "sleep", lambda interval: None)
+
+
+def test_retriable_errors_are_retried():
+    admin_client = AdminClient({"topic-a": (RETRIABLE, 2)})
+    errors = update.alter_topics_configs(
+        admin_client,
+        {
+            "topic-a": [set_entry("retention.ms")],
+            "topic-b": [set_entry("retention.ms")],
+        },
+    )
+    assert errors == {}
+    assert admin_client.requests == [
+        ("topic-a", ["retention.ms"]),
+        ("topic-b", ["retention.ms"]),
+        ("topic-a", ["retention.ms"]),
+        ("topic-a", ["retention.ms"]),
+    ]
+
+
+def test_invalid_entries_are_reported_per_topic():
+    admin_client = AdminClient({"segment.ms": (INVALID, 2)})
+    errors = update.alter_topics_configs(
+        admin_client, {"topic-a": [set_entry("retention.ms"), set_entry("segment.ms")]}
+    )
+    assert list(errors) == ["topic-a"]
+    assert list(errors["topic-a"]) == ["segment.ms"]
+    assert ("topic-a", ["retention.ms"]) in admin_client.requests
+
+
+def test_update_topic_raises_on_failed_config_change(monkeypatch):
+    admin_client = AdminClient({"segment.ms": (INVALID, 2)})
+    monkeypatch.setattr(update, "get_pooled_admin_client", lambda *args: admin_client)
+    monkeypatch.setattr(update, "describe_topic_configs", lambda *args, **kwargs: {})
+    monkeypatch.setattr(
+        update,
+        "get_topic_config_changes",
+        lambda *args: [set_entry("retention.ms"), set_entry("segment.ms")],
+    )
+    monkeypatch.setattr(
+        update,
+        "update_topic_partitions",
+        lambda *args: pytest.fail("partitions updated after a failed config change"),
+    )
+    with pytest.raises(ValueError, match="segment.ms"):
+        update.update_kafka_topic("topic-a", 3, {}, settings={})
+
+
+def test_exhausted_retriable_errors_are_not_sent_one_by_one():
+    admin_client = AdminClient({"topic-a": (RETRIABLE, 100)})
+    errors = update.alter_topics_configs(
+        admin_client, {"topic-a": [set_entry("retention.ms"), set_entry("segment.ms")]}
+    )
+    assert errors == {"topic-a": {"retention.ms": RETRIABLE, "segment.ms": RETRIABLE}}
+    assert (
+        admin_client.requests
+        == [("topic-a", ["retention.ms", "segment.ms"])] * topics.RETRY_ATTEMPTS
+    )
+
+
+def test_invalid_entries_are_sent_once():
+    admin_client = AdminClient(
+        {"segment.ms": (INVALID, 1), "retention.ms": (RETRIABLE, 100)}
+    )
+    errors = update.alter_topics_configs(
+        admin_client, {"topic-a": [set_entry("segment.ms"), set_entry("retention.ms")]}
+    )
+    assert list(errors["topic-a"]) == ["retention.ms"]
+    assert admin_client.requests == [
+        ("topic-a", ["segment.ms", "retention.ms"]),
+        ("topic-a", ["segment.ms"]),
+        ("topic-a", ["retention.ms"]),
+    ]
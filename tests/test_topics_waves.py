@@ -0,0 +1,106 @@
+"""Tests chaining the topics and schemas resources into waves with DependsOn"""
+
+import json
+
+import pytest
+import yaml
+
+from cfn_kafka_admin.cfn_kafka_admin import KafkaStack, get_topic_set_index
+
+TOPICS = [f"topic-{index:02d}" for index in range(10)]
+
+
+def set_definition(tmp_path) -> str:
+    definition_path = tmp_path / "definition.yaml"
+    definition_path.write_text(
+        yaml.dump(
+            {
+                "Globals": {"BootstrapServers": "broker:9092"},
+                "Topics": {
+                    "FunctionName": "topics-fn",
+                    "ReplicationFactor": 3,
+                    "Topics": [
+                        {
+                            "Name": name,
+                            "PartitionsCount": 3,
+                            "Schema": {
+                                "Value": {
+                                    "Serializer": "AVRO",
+                                    "Definition": json.dumps({"type": "string"}),
+                                }
+                            },
+                        }
+                        for name in TOPICS
+                    ],
+                },
+                "Schemas": {
+                    "FunctionName": "schemas-fn",
+                    "RegistryUrl": "http://registry:8081",
+                    "RegistryUserInfo": "user:password",
+                },
+            }
+        )
+    )
+    return str(definition_path)
+
+
+def get_resources(stack: KafkaStack, resource_type: str) -> dict:
+    return {
+        title: resource
+        for title, resource in stack.template.to_dict()["Resources"].items()
+        if resource["Type"] == resource_type
+    }
+
+
+def get_depends_on(resource: dict) -> list:
+    depends_on = resource.get("DependsOn", [])
+    return [depends_on] if isinstance(depends_on, str) else depends_on
+
+
+def test_topics_waves(tmp_path):
+    stack = KafkaStack([set_definition(tmp_path)])
+    stack.render_topics(wave_size=3, schemas_wave_size=4)
+    topics = list(get_resources(stack, "Custom::KafkaTopic"))
+    schemas = list(get_resources(stack, "Custom::KafkaSchema"))
+    for titles, wave_size, resource_type in (
+        (topics, 3, "Custom::KafkaTopic"),
+        (schemas, 4, "Custom::KafkaSchema"),
+    ):
+        resources = get_resources(stack, resource_type)
+        for index, title in enumerate(titles):
+            expected = [titles[index - wave_size]] if index >= wave_size else []
+            assert get_depends_on(resources[title]) == expected
+
+
+def test_topic_sets_waves(tmp_path):
+    stack = KafkaStack([set_definition(tmp_path)])
+    stack.render_topics(topic_sets_count=5, wave_size=2, schemas_wave_size=3)
+    sets = get_resources(stack, "Custom::KafkaTopicSet")
+    assert [get_depends_on(sets[title]) for title in sorted(sets)] == [
+        [],
+        [],
+        ["TopicSet0000"],
+        ["TopicSet0001"],
+        ["TopicSet0002"],
+    ]
+    schemas = get_resources(stack, "Custom::KafkaSchema")
+    titles = list(schemas)
+    for index, title in enumerate(titles):
+        depends_on = get_depends_on(schemas[title])
+        topic_name = schemas[title]["Properties"]["Subject"].removesuffix("-value")
+        assert depends_on[0] == f"TopicSet{get_topic_set_index(topic_name, 5):04d}"
+        assert depends_on[1:] == ([titles[index - 3]] if index >= 3 else [])
+
+
+def test_no_waves(tmp_path):
+    stack = KafkaStack([set_definition(tmp_path)])
+    stack.render_topics()
+    for resource in get_resources(stack, "Custom::KafkaTopic").values():
+        assert "DependsOn" not in resource
+
+
+def test_waves_with_sharding(tmp_path):
+    stack = KafkaStack([set_definition(tmp_path)])
+    stack.enable_sharding()
+    with pytest.raises(ValueError):
+        stack.render_topics(wave_size=2)